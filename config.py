@@ -142,9 +142,18 @@ class Config:
         cls.CACHE_REDIS_PORT = config.get("REDIS_PORT", 6379)
         cls.CACHE_REDIS_DB = config.get("REDIS_DB", 0)
         cls.DEFAULT_TIMEZONE = config.get("DEFAULT_TIMEZONE", "Europe/Helsinki")
+        # Raw view events older than this are deleted once rolled up (0 keeps all).
+        cls.ANALYTICS_RAW_RETENTION_DAYS = config.get("ANALYTICS_RAW_RETENTION_DAYS", 180)
+        # Demo views are queued in-process and inserted in batches; set to
+        # False to insert each view synchronously inside the request.
+        cls.ANALYTICS_BUFFERED_VIEWS = config.get("ANALYTICS_BUFFERED_VIEWS", True)
+        cls.ANALYTICS_VIEW_BATCH_SIZE = config.get("ANALYTICS_VIEW_BATCH_SIZE", 500)
+        cls.ANALYTICS_VIEW_FLUSH_SECONDS = config.get("ANALYTICS_VIEW_FLUSH_SECONDS", 2.0)
+        cls.ANALYTICS_VIEW_QUEUE_SIZE = config.get("ANALYTICS_VIEW_QUEUE_SIZE", 10000)
         cls.TESTING = config.get("TESTING", False)
         cls.ENABLE_EMAIL_WORKER = config.get("ENABLE_EMAIL_WORKER", True)
-        cls.ENABLE_PANIC_THREAD = config.get("ENABLE_PANIC_THREAD", True)
+        # Minimum time between runtime flag version checks (utils.runtime_flags).
+        cls.RUNTIME_FLAGS_CHECK_INTERVAL_MS = config.get("RUNTIME_FLAGS_CHECK_INTERVAL_MS", 1000)
         cls.ENABLE_BACKGROUND_JOBS = config.get("ENABLE_BACKGROUND_JOBS", True)
         cls.DISABLE_BACKGROUND_JOBS = config.get(
             "DISABLE_BACKGROUND_JOBS",
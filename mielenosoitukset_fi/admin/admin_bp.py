@@ -30,13 +30,22 @@ from flask_login import (
     logout_user,
 )
 
-from mielenosoitukset_fi.users.models import User  # Import User model
 from mielenosoitukset_fi.database_manager import DatabaseManager
 from mielenosoitukset_fi.utils.logger import logger
 from mielenosoitukset_fi.utils.wrappers import admin_required, permission_required
 from mielenosoitukset_fi.utils.flashing import flash_message
-from mielenosoitukset_fi.utils.analytics import get_demo_views
-from mielenosoitukset_fi.utils.cache import cache
+from mielenosoitukset_fi.utils import analytics_buckets, demo_scores
+from mielenosoitukset_fi.utils.analytics import view_buffer
+from mielenosoitukset_fi.utils.cache import (
+    CACHE_TAG_PATTERN,
+    PUBLIC_LIST_TAG,
+    cache,
+    invalidate_tags,
+    tiered_cache,
+)
+from mielenosoitukset_fi.utils.demo_identifiers import identifier_cache_stats
+from mielenosoitukset_fi.utils.principal import load_user_principal, principal_cache
+from mielenosoitukset_fi.utils.runtime_flags import PANIC, runtime_flags
 
 from .utils import AdminActParser, log_admin_action_V2, _ADMIN_TEMPLATE_FOLDER
 
@@ -153,75 +162,12 @@ class DemoViewCount:
         return f"Demo ID: {self.id}, Count: {self.views}"
 
 
-def count_per_demo(data):
-    """
-
-    Parameters
-    ----------
-    data :
-
-
-    Returns
-    -------
-
-
-    """
-    demo_count = {}
-    for view in data:
-        demo_id = view.get("demo_id")
-        if demo_id in demo_count:
-            demo_count[demo_id] += 1
-        else:
-            demo_count[demo_id] = 1
-
-    demo_count = [
-        DemoViewCount(demo_id, count) for demo_id, count in demo_count.items()
-    ]
-    return demo_count
-
-
-def _rollup_demo_analytics_on_demand(demo_id: ObjectId):
-    """Build d_analytics doc for a demo from raw analytics if missing."""
-    events = list(
-        mongo["analytics"].find({"demo_id": demo_id}, {"timestamp": 1})
-    )
-    if not events:
-        return None
-
-    rolled = {}
-    max_event_id = None
-    for ev in events:
-        ev_id = ev.get("_id")
-        if ev_id is not None:
-            max_event_id = ev_id if max_event_id is None else max(max_event_id, ev_id)
-        ts = ev.get("timestamp")
-        if not ts:
-            continue
-        if ts.tzinfo is None:
-            ts = ts.replace(tzinfo=timezone.utc)
-        ts_hel = ts.astimezone(HELSINKI_TZ)
-        day_key = ts_hel.strftime("%Y-%m-%d")
-        hour_key = f"{ts_hel.hour:02d}"
-        minute_key = f"{ts_hel.minute:02d}"
-        day_bucket = rolled.setdefault(day_key, {})
-        hour_bucket = day_bucket.setdefault(hour_key, {})
-        hour_bucket[minute_key] = hour_bucket.get(minute_key, 0) + 1
-
-    doc = {"_id": demo_id, "analytics": rolled}
-    mongo["d_analytics"].replace_one({"_id": demo_id}, doc, upsert=True)
-    if max_event_id is not None:
-        mongo["_meta"].update_one(
-            {"_id": "analytics_rollup"},
-            {"$max": {f"on_demand_max_ids.{str(demo_id)}": max_event_id}},
-            upsert=True,
-        )
-    return doc
-
 def get_per_demo_anal(demo_id):
-    analytics = mongo["d_analytics"].find_one({"_id": ObjectId(demo_id)})
-    if analytics:
-        return analytics
-    return _rollup_demo_analytics_on_demand(ObjectId(demo_id))
+    """Return True when ``demo_id`` has bucketed analytics, rolling it up on demand."""
+    demo_id = ObjectId(demo_id)
+    if mongo[analytics_buckets.COLLECTION].find_one({"demo_id": demo_id}, {"_id": 1}):
+        return True
+    return analytics_buckets.rebuild_demo(mongo, demo_id)
 
 
 # User loader function
@@ -239,8 +185,7 @@ def load_user(user_id):
 
 
     """
-    user_doc = mongo.users.find_one({"_id": ObjectId(user_id)})
-    return User.from_db(user_doc) if user_doc else None
+    return load_user_principal(mongo, user_id)
 
 
 # Admin dashboard
@@ -251,9 +196,7 @@ def load_user(user_id):
 @admin_required
 def admin_dashboard():
     """Render the admin dashboard."""
-    # Load current panic mode
-    panic = mongo.panic.find_one({"name": "global"})
-    panic_mode = panic.get("panic", False) if panic else False
+    panic_mode = runtime_flags.get(PANIC)
     _log_admin_event("dashboard_view", panic_mode=panic_mode)
     return render_template(f"{_ADMIN_TEMPLATE_FOLDER}dashboard.html", panic_mode=panic_mode)
 
@@ -264,11 +207,7 @@ def admin_dashboard():
 @admin_required
 def activate_panic():
     """Activate global panic mode."""
-    mongo.panic.update_one(
-        {"name": "global"},
-        {"$set": {"panic": True}},
-        upsert=True
-    )
+    runtime_flags.set(PANIC, True, actor=getattr(current_user, "username", None))
     _log_admin_event("panic_mode_update", panic_mode=True)
     flash_message("Panic mode activated!", "success")
     return redirect(url_for("admin.admin_dashboard"))
@@ -280,11 +219,7 @@ def activate_panic():
 @admin_required
 def deactivate_panic():
     """Deactivate global panic mode."""
-    mongo.panic.update_one(
-        {"name": "global"},
-        {"$set": {"panic": False}},
-        upsert=True
-    )
+    runtime_flags.set(PANIC, False, actor=getattr(current_user, "username", None))
     _log_admin_event("panic_mode_update", panic_mode=False)
     flash_message("Panic mode deactivated!", "success")
     return redirect(url_for("admin.admin_dashboard"))
@@ -296,8 +231,7 @@ def deactivate_panic():
 @admin_required
 def panic_status():
     """Return current panic mode status as JSON."""
-    panic = mongo.panic.find_one({"name": "global"})
-    panic_mode = panic.get("panic", False) if panic else False
+    panic_mode = runtime_flags.get(PANIC)
     _log_admin_event("panic_status_requested", panic_mode=panic_mode)
     return jsonify({"panic_mode": panic_mode})
 
@@ -306,13 +240,27 @@ def panic_status():
 @login_required
 @admin_required
 def clear_cache():
-    """Allow admins to purge the application cache from the dashboard."""
+    """
+    Invalidate cache tags from the dashboard instead of purging the whole cache.
+
+    The ``tags`` form field takes whitespace or comma separated tags such as
+    ``demo:<id>``, ``city:<key>``, ``org:<id>`` or ``list:public`` (the
+    default). Only entries depending on those tags are rebuilt, so the
+    database does not get every cached page's queries at once.
+    """
+    raw_tags = (request.form.get("tags") or "").replace(",", " ").split()
+    tags = raw_tags or [PUBLIC_LIST_TAG]
+    invalid = [tag for tag in tags if not CACHE_TAG_PATTERN.match(tag)]
+    if invalid:
+        _log_admin_event("cache_cleared", status="error", reason="invalid_tags", tags=invalid)
+        flash_message(f"Tuntemattomat välimuistitunnisteet: {', '.join(invalid)}", "danger")
+        return redirect(url_for("admin.admin_dashboard"))
     try:
-        cache.clear()
-        _log_admin_event("cache_cleared", status="success")
-        flash_message("Välimuisti tyhjennettiin.", "success")
+        invalidate_tags(*tags)
+        _log_admin_event("cache_cleared", status="success", tags=tags)
+        flash_message(f"Välimuisti mitätöitiin: {', '.join(tags)}.", "success")
     except Exception as exc:
-        logger.exception("Failed to clear cache via admin dashboard")
+        logger.exception("Failed to invalidate cache tags via admin dashboard")
         _log_admin_event("cache_cleared", status="error", reason=str(exc))
         flash_message("Välimuistin tyhjennys epäonnistui.", "danger")
     return redirect(url_for("admin.admin_dashboard"))
@@ -367,8 +315,6 @@ def _calculate_dashboard_snapshot() -> dict:
     failed_logins_last_hour = login_coll.count_documents({"timestamp": {"$gte": last_hour}, "success": False})
     logins_last_day = login_coll.count_documents({"timestamp": {"$gte": last_day}})
 
-    panic = mongo.panic.find_one({"name": "global"}) or {}
-
     success_rate = 0
     if logins_last_hour:
         success_rate = round(((logins_last_hour - failed_logins_last_hour) / logins_last_hour) * 100)
@@ -389,7 +335,7 @@ def _calculate_dashboard_snapshot() -> dict:
             "last_day": logins_last_day,
             "success_rate": success_rate,
         },
-        "panic_mode": panic.get("panic", False),
+        "panic_mode": runtime_flags.get(PANIC),
         "generated_at": now.replace(tzinfo=timezone.utc).isoformat(),
     }
 
@@ -828,25 +774,27 @@ def _build_analytics_summary(include_past: bool, page: int, per_page: int):
         future_ids = _future_demo_ids()
         match_stage["demo_id"] = {"$in": list(future_ids)} if future_ids else {"$in": []}
 
+    # Daily buckets, not raw events: those are trimmed after the retention window.
+    buckets = mongo[analytics_buckets.COLLECTION]
     base_pipeline = [{"$match": match_stage}] if match_stage else []
     count_pipeline = base_pipeline + [
         {"$group": {"_id": "$demo_id"}},
         {"$count": "total"},
     ]
-    total_count_doc = list(mongo.analytics.aggregate(count_pipeline))
+    total_count_doc = list(buckets.aggregate(count_pipeline))
     total_count = total_count_doc[0]["total"] if total_count_doc else 0
-    total_views_pipeline = base_pipeline + [{"$count": "total_views"}]
-    total_views_doc = list(mongo.analytics.aggregate(total_views_pipeline))
-    total_views = total_views_doc[0]["total_views"] if total_views_doc else 0
+    total_views_pipeline = base_pipeline + [{"$group": {"_id": None, "total_views": {"$sum": "$total"}}}]
+    total_views_doc = list(buckets.aggregate(total_views_pipeline))
+    total_views = int(total_views_doc[0]["total_views"] or 0) if total_views_doc else 0
 
     skip = max((page - 1) * per_page, 0)
     data_pipeline = base_pipeline + [
-        {"$group": {"_id": "$demo_id", "views": {"$sum": 1}}},
+        {"$group": {"_id": "$demo_id", "views": {"$sum": "$total"}}},
         {"$sort": {"views": -1}},
         {"$skip": skip},
         {"$limit": per_page},
     ]
-    grouped = list(mongo.analytics.aggregate(data_pipeline))
+    grouped = list(buckets.aggregate(data_pipeline))
     demo_ids = [doc["_id"] for doc in grouped]
     demo_map = {}
     if demo_ids:
@@ -1051,6 +999,11 @@ def _collect_server_stats() -> dict:
         "disk": {"total_gb": total_gb, "free_gb": free_gb, "used_pct": used_pct},
         "workers": workers,
         "python": __import__("sys").version.split()[0],
+        "view_buffer": view_buffer.stats(),
+        "identifier_cache": identifier_cache_stats(),
+        "tiered_cache": tiered_cache.stats(),
+        "principal_cache": principal_cache.stats(),
+        "runtime_flags": runtime_flags.snapshot(),
     }
 
 
@@ -1243,8 +1196,8 @@ def admin_analytics():
 
 def render_analytics_overview():
     """ """
-    data = get_demo_views()
-    data = count_per_demo(data)
+    views = analytics_buckets.views_per_demo(mongo[analytics_buckets.COLLECTION])
+    data = [DemoViewCount(demo_id, count) for demo_id, count in views.items()]
 
     return render_template(f"{_ADMIN_TEMPLATE_FOLDER}analytics.html", data=data)
 
@@ -1260,89 +1213,50 @@ def demo_analytics(demo_id):
         _log_admin_event("demo_analytics_detail_error", demo_id=demo_id, reason="invalid_id")
         abort(404, "Invalid demo ID")
 
-    anal = get_per_demo_anal(demo_oid)
-    if not anal:
+    if not get_per_demo_anal(demo_oid):
         _log_admin_event("demo_analytics_detail_error", demo_id=demo_id, reason="missing_data")
         abort(404, "No analytics data found")
 
-    analytics = anal.get("analytics", {})
     demo_data = mongo["demonstrations"].find_one({"_id": demo_oid})
     demo = Demonstration.from_dict(demo_data)
-
-    now_utc = datetime.now(timezone.utc)
-    today_str = now_utc.strftime("%Y-%m-%d")
-
-    # --- Initialize variables ---
-    total_views = 0
-    views_today = 0
-    labels = []
-    data = []
+    buckets = mongo[analytics_buckets.COLLECTION]
+    today = analytics_buckets.local_today()
 
     # --- Per minute today ---
-    day_data = analytics.get(today_str, {})
-    for hour in range(24):
-        hour_key = f"{hour:02d}"
-        hour_data = day_data.get(hour_key) or day_data.get(str(hour)) or {}
-        for minute in range(60):
-            minute_key = f"{minute:02d}"
-            count = hour_data.get(minute_key)
-            if count is None:
-                count = hour_data.get(str(minute), 0)
-            total_views += count  # will sum all-time later
-            views_today += count
-            labels.append(f"{hour:02d}:{minute:02d}")
-            data.append(count)
-
-    # --- Add total views from all previous days ---
-    for day_str, day_hours in analytics.items():
-        if day_str != today_str:
-            for hour_data in day_hours.values():
-                total_views += sum(hour_data.values())
-
+    data = analytics_buckets.day_minutes(buckets, demo_oid, today)
+    labels = [f"{minute // 60:02d}:{minute % 60:02d}" for minute in range(len(data))]
+    views_today = sum(data)
+    total_views = analytics_buckets.total_views(buckets, demo_oid)
     avg_views_per_minute = (views_today / 1440) if views_today else 0
 
+    # --- Daily totals for the last 52 weeks: one indexed range read ---
+    monday_today = today - timedelta(days=today.weekday())
+    first_monday = monday_today - timedelta(weeks=51)
+    totals = analytics_buckets.daily_totals(buckets, demo_oid, first_monday, today)
+
     # --- Views per day last 30 days ---
     daily_labels = []
     daily_data = []
     for i in range(29, -1, -1):  # 30 days ago -> today
-        day = now_utc - timedelta(days=i)
-        day_str = day.strftime("%Y-%m-%d")
-        day_views = 0
-        day_hours = analytics.get(day_str, {})
-        for hour_data in day_hours.values():
-            day_views += sum(hour_data.values())
+        day = today - timedelta(days=i)
         daily_labels.append(day.strftime("%d.%m"))
-        daily_data.append(day_views)
+        daily_data.append(totals.get(day.isoformat(), 0))
 
     # --- Views per week last 52 weeks ---
     weekly_labels = []
     weekly_data = []
-
-    def get_monday(date):
-        return date - timedelta(days=date.weekday())
-
-    monday_today = get_monday(now_utc)
-
     for i in range(51, -1, -1):  # 52 weeks ago -> this week
         week_start = monday_today - timedelta(weeks=i)
         week_end = week_start + timedelta(days=6)
-        week_label = f"{week_start.strftime('%d.%m')} - {week_end.strftime('%d.%m')}"
-        weekly_labels.append(week_label)
-
-        week_views = 0
-        for d in range(7):
-            day = week_start + timedelta(days=d)
-            day_str = day.strftime("%Y-%m-%d")
-            day_hours = analytics.get(day_str, {})
-            for hour_data in day_hours.values():
-                week_views += sum(hour_data.values())
-        weekly_data.append(week_views)
+        weekly_labels.append(f"{week_start.strftime('%d.%m')} - {week_end.strftime('%d.%m')}")
+        weekly_data.append(
+            sum(totals.get((week_start + timedelta(days=d)).isoformat(), 0) for d in range(7))
+        )
 
     # --- Render template ---
     _log_admin_event("demo_analytics_detail_view", demo_id=demo_id)
     return render_template(
         f"{_ADMIN_TEMPLATE_FOLDER}per_demo_analytics.html",
-        analytics=anal,
         total_views=total_views,
         views_today=views_today,
         avg_views_per_minute=round(avg_views_per_minute, 2),
@@ -1359,75 +1273,17 @@ def demo_analytics(demo_id):
 from datetime import datetime, timedelta, timezone
 from collections import defaultdict
 from bson.objectid import ObjectId
-import math
-
-def recommend_demos_no_user(top_n=5, weights=None):
-    if weights is None:
-        weights = {"trending": 0.5, "popularity": 0.3, "recency": 0.1, "category": 0.1}
-
-    now_utc = datetime.now(timezone.utc)
-    yesterday_utc = now_utc - timedelta(days=1)
-
-    demo_scores = {}
-    category_trending = defaultdict(int)
-
-    # --- Step 1: Aggregate analytics and build category trending ---
-    for doc in mongo["d_analytics"].find({}, {"analytics": 1}):
-        demo_id = str(doc["_id"])
-        analytics = doc.get("analytics", {})
-
-        trending_views = 0
-        total_views = 0
-
-        for day_str, hours in analytics.items():
-            for hour_str, minutes in hours.items():
-                for minute_str, count in minutes.items():
-                    try:
-                        dt = datetime.strptime(f"{day_str} {hour_str}:{minute_str}", "%Y-%m-%d %H:%M").replace(tzinfo=timezone.utc)
-                        total_views += count
-                        if yesterday_utc <= dt <= now_utc:
-                            trending_views += count
-                    except Exception:
-                        continue
-
-        demo_scores[demo_id] = {"trending": trending_views, "popularity": total_views}
-
-        # Fetch demo tags
-        demo = mongo.demonstrations.find_one({"_id": ObjectId(demo_id)}, {"tags": 1, "created_at": 1})
-        tags = demo.get("tags", []) if demo else []
-        demo_scores[demo_id]["tags"] = tags
-        demo_scores[demo_id]["created_at"] = demo.get("created_at", now_utc - timedelta(days=30)) if demo else now_utc - timedelta(days=30)
-
-        for tag in tags:
-            category_trending[tag] += trending_views
-
-    # Normalize trending and popularity
-    max_trending = max([v["trending"] for v in demo_scores.values()] + [1])
-    max_popularity = max([v["popularity"] for v in demo_scores.values()] + [1])
-    max_category = max(category_trending.values() or [1])
-
-    for demo_id, scores in demo_scores.items():
-        scores["trending"] /= max_trending
-        scores["popularity"] /= max_popularity
-        scores["recency"] = math.exp(-(now_utc - scores["created_at"]).days / 30)
-        scores["category"] = sum(category_trending[tag] for tag in scores["tags"]) / max_category
-
-        scores["final_score"] = sum(scores[k] * weights[k] for k in weights)
-
-    # Sort demos by final score
-    top_demos = sorted(demo_scores.items(), key=lambda x: x[1]["final_score"], reverse=True)[:top_n]
-
-    # Return enriched results
-    results = []
-    for d_id, scores in top_demos:
-        demo = mongo.demonstrations.find_one({"_id": ObjectId(d_id)}, {"title": 1})
-        results.append({
-            "demo_id": d_id,
-            "title": demo.get("title", "Unknown") if demo else "Unknown",
-            "score": scores["final_score"]
-        })
 
-    return results
+def recommend_demos_no_user(top_n=5):
+    """Return the ``top_n`` demos by precomputed recommendation score."""
+    return [
+        {
+            "demo_id": str(doc["demo_id"]),
+            "title": doc.get("title") or "Unknown",
+            "score": doc.get("score", 0),
+        }
+        for doc in demo_scores.top_scores(mongo, top_n)
+    ]
 
 # route that returns the result of the recommend demos thin
 
@@ -1454,7 +1310,6 @@ def api_demos_nousussa():
       - limit: number of demos to return (default 5)
     """
     now_utc = datetime.now(timezone.utc)
-    yesterday_utc = now_utc - timedelta(days=1)
 
     # Get limit from query string, default to 5
     try:
@@ -1463,42 +1318,17 @@ def api_demos_nousussa():
     except ValueError:
         limit = 5
 
-    demo_views = []
-
-    # Fetch all demos analytics
-    for doc in mongo["d_analytics"].find({}, {"analytics": 1, "_id": 1}):
-        demo_id = str(doc["_id"])
-        analytics = doc.get("analytics", {})
-
-        views_last_24h = 0
-
-        for day_str, hours in analytics.items():
-            for hour_str, minutes in hours.items():
-                for minute_str, count in minutes.items():
-                    try:
-                        dt = datetime.strptime(f"{day_str} {hour_str}:{minute_str}", "%Y-%m-%d %H:%M")
-                        dt = dt.replace(tzinfo=timezone.utc)
-                        if yesterday_utc <= dt <= now_utc:
-                            views_last_24h += count
-                    except Exception:
-                        continue
-
-        if views_last_24h > 0:
-            demo_views.append({
-                "demo_id": demo_id,
-                "views_last_24h": views_last_24h
-            })
-
-    # Sort demos descending by views_last_24h
-    demo_views.sort(key=lambda x: x["views_last_24h"], reverse=True)
-
-    # Limit results
-    demo_views = demo_views[:limit]
-
-    # Optionally, fetch demo names/titles
-    for d in demo_views:
-        demo_data = mongo["demonstrations"].find_one({"_id": ObjectId(d["demo_id"])}, {"title": 1})
-        d["title"] = demo_data.get("title") if demo_data else "Unknown"
+    # Scores are refreshed by the demo_scores background job.
+    demo_views = [
+        {
+            "demo_id": str(doc["demo_id"]),
+            "views_last_24h": doc.get("trending_views", 0),
+            "title": doc.get("title") or "Unknown",
+        }
+        for doc in demo_scores.top_scores(
+            mongo, limit, sort_field="trending_views", query={"trending_views": {"$gt": 0}}
+        )
+    ]
 
     _log_admin_event("demos_nousussa_requested", limit=limit, returned=len(demo_views))
     return jsonify({
@@ -1534,34 +1364,14 @@ def analytics_overall_24h():
         cur += timedelta(minutes=interval)
 
     # ── 3️⃣  Aggregate all demos into those buckets ──────────────
-    for doc in mongo["d_analytics"].find({}, {"analytics": 1}):
-        analytics = doc.get("analytics", {})
-
-        # only two days are relevant for a moving 24 h window
-        for day_str in {yesterday.strftime("%Y-%m-%d"), now.strftime("%Y-%m-%d")}:
-            for hour_str, hour_data in analytics.get(day_str, {}).items():
-                for minute_str, count in hour_data.items():
-                    # zero‑pad minutes to guarantee “%M” matches
-                    minute = f"{int(minute_str):02d}"
-                    try:
-                        ts = datetime.strptime(
-                            f"{day_str} {hour_str}:{minute}", "%Y-%m-%d %H:%M"
-                        ).replace(tzinfo=timezone.utc)
-                    except ValueError:
-                        continue
-
-                    if not (yesterday <= ts <= now):
-                        continue
-
-                    # Bucket start for this interval
-                    rounded = ts - timedelta(
-                        minutes=ts.minute % interval,
-                        seconds=ts.second,
-                        microseconds=ts.microsecond
-                    )
-
-                    key = rounded.strftime("%Y-%m-%d %H:%M")
-                    timeline[key] += count
+    # Only the (at most two) Helsinki days overlapping the window are read.
+    for _demo_id, stamp, count in analytics_buckets.iter_window(
+        mongo[analytics_buckets.COLLECTION], yesterday, now
+    ):
+        ts = stamp.astimezone(timezone.utc)
+        # Bucket start for this interval
+        rounded = ts - timedelta(minutes=ts.minute % interval)
+        timeline[rounded.strftime("%Y-%m-%d %H:%M")] += count
 
     # ── 4️⃣  Prepare data for Chart.js ───────────────────────────
     sorted_keys = sorted(timeline.keys())
@@ -1600,34 +1410,12 @@ def analytics_overall_24h_api():
 
     timeline = defaultdict(int)
 
-    # Get all docs from d_analytics collection
-    for doc in mongo["d_analytics"].find({}, {"analytics": 1}):
-        analytics = doc.get("analytics", {})
-
-        for day_str, hours in analytics.items():  # "2024-11-21"
-            for hour_str, minutes in hours.items():  # "17"
-                for minute_str, count in minutes.items():  # "53"
-                    try:
-                        dt_hel = datetime.strptime(
-                            f"{day_str} {hour_str}:{minute_str}", "%Y-%m-%d %H:%M"
-                        )
-                        # attach Helsinki tz info
-                        dt_hel = HELSINKI_TZ.localize(dt_hel)
-
-                        # skip if outside last 24h window
-                        if not (yesterday_hel <= dt_hel <= now_hel):
-                            continue
-
-                        # round down to interval
-                        rounded = dt_hel - timedelta(
-                            minutes=dt_hel.minute % interval,
-                            seconds=dt_hel.second,
-                            microseconds=dt_hel.microsecond
-                        )
-                        key = rounded.strftime("%Y-%m-%d %H:%M")
-                        timeline[key] += count
-                    except Exception:
-                        continue
+    for _demo_id, dt_hel, count in analytics_buckets.iter_window(
+        mongo[analytics_buckets.COLLECTION], yesterday_hel, now_hel
+    ):
+        # round down to interval
+        rounded = dt_hel - timedelta(minutes=dt_hel.minute % interval)
+        timeline[rounded.strftime("%Y-%m-%d %H:%M")] += count
 
     # Prepare output arrays
     sorted_keys = sorted(timeline.keys())
@@ -11,7 +11,11 @@ from itsdangerous import URLSafeTimedSerializer, SignatureExpired, BadSignature
 
 from mielenosoitukset_fi.utils.classes import Demonstration, Organizer
 from mielenosoitukset_fi.utils.s3 import upload_image_fileobj
+from mielenosoitukset_fi.utils.cache import invalidate_demo
+from mielenosoitukset_fi.utils.calendar_data import invalidate_calendar_months
+from mielenosoitukset_fi.utils.demo_summary import with_derived_fields
 from mielenosoitukset_fi.utils.admin.demonstration import collect_tags
+from mielenosoitukset_fi.utils.admin_tasks import sync_demo_tasks
 from mielenosoitukset_fi.utils.database import DEMO_FILTER, stringify_object_ids
 from mielenosoitukset_fi.utils.flashing import flash_message
 from mielenosoitukset_fi.utils.variables import CITY_LIST
@@ -446,10 +450,10 @@ def update_demo(case_id):
     date = request.form.get("date", demo.get("date", ""))
     description = request.form.get("description", demo.get("description", ""))
 
-    mongo.demonstrations.update_one(
-        {"_id": ObjectId(case.demo_id)},
-        {"$set": {"name": name, "date": date, "description": description}}
-    )
+    update = with_derived_fields({"name": name, "date": date, "description": description}, demo)
+    mongo.demonstrations.update_one({"_id": ObjectId(case.demo_id)}, {"$set": update})
+    invalidate_demo(demo, {**demo, **update})
+    invalidate_calendar_months(demo.get("date"), date)
 
     log_admin_action_V2(f"{current_user.username} päivitti demoa: {demo['_id']}", case_id)
     flash_message(_("Demo päivitetty!"), "success")
@@ -637,8 +641,10 @@ def demo_escalate(case_id):
     # Reset demo status
     mongo.demonstrations.update_one(
         {"_id": ObjectId(case.demo_id)},
-        {"$set": {"approved": False, "rejected": False}}
+        {"$set": {"approved": False, "rejected": False, "last_modified": utcnow()}}
     )
+    invalidate_demo(demo)
+    sync_demo_tasks(mongo, case.demo_id)
 
     # Set meta flag
     timestamp = utcnow()
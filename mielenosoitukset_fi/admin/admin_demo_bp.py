@@ -28,12 +28,20 @@ from pymongo import DESCENDING, ReturnDocument
 from flask_babel import _, force_locale, gettext as babel_gettext
 from urllib.parse import quote_plus
 
+from mielenosoitukset_fi.utils import analytics_buckets
 from mielenosoitukset_fi.utils.classes import Demonstration, Organizer, MemberShip, Case
 from mielenosoitukset_fi.utils.demo_cancellation import cancel_demo, queue_cancellation_links_for_demo
+from mielenosoitukset_fi.utils.demo_identifiers import invalidate_demo_identifiers
+from mielenosoitukset_fi.utils.demo_export import record_deleted_demos
+from mielenosoitukset_fi.utils.demo_summary import derived_fields, with_derived_fields
 from mielenosoitukset_fi.utils.s3 import upload_image_fileobj
 from mielenosoitukset_fi.utils.admin.demonstration import collect_tags
+from mielenosoitukset_fi.utils.admin_tasks import sync_demo_tasks
 from mielenosoitukset_fi.utils.database import DEMO_FILTER
+from mielenosoitukset_fi.utils.cache import invalidate_demo
+from mielenosoitukset_fi.utils.calendar_data import invalidate_calendar_months
 from mielenosoitukset_fi.utils.flashing import flash_message
+from mielenosoitukset_fi.utils.permission_filters import demo_permission_filter, restrict_demo_query
 from mielenosoitukset_fi.utils.variables import CITY_LIST
 from mielenosoitukset_fi.utils.cities import normalize_city_key
 from mielenosoitukset_fi.utils.wrappers import admin_required, has_demo_permission, permission_required
@@ -372,6 +380,64 @@ def _demo_text_search_clause(search_query: str):
     }
 
 
+def _demo_control_query(
+    user,
+    *,
+    search_query="",
+    year="",
+    tags=(),
+    missing_tags=(),
+    approved_only=False,
+    show_hidden=False,
+    show_past="all",
+    show_cancelled=False,
+):
+    """
+    Build the ``demo_control`` listing filter.
+
+    Parameters
+    ----------
+    user : User
+        Rows are limited to the demonstrations ``user`` may list.
+    year : str
+        A validated ``YYYY`` year, or empty for every year.
+    show_past : str
+        ``"false"`` hides demonstrations flagged ``in_past``; anything else
+        shows them.
+
+    Returns
+    -------
+    dict
+        The MongoDB filter used for both the count and the page.
+    """
+    clauses = [
+        {"$or": [{"rejected": {"$exists": False}}, {"rejected": False}]},
+    ]
+    if not show_cancelled:
+        clauses.append({"cancelled": {"$ne": True}})
+    if not show_hidden:
+        clauses.append({"$or": [{"hide": {"$exists": False}}, {"hide": False}]})
+    if show_past == "false":
+        clauses.append({"$or": [{"in_past": {"$exists": False}}, {"in_past": False}]})
+    if approved_only:
+        clauses.append({"approved": True})
+    if search_query:
+        clauses.append(_demo_text_search_clause(search_query))
+    if year:
+        clauses.append({"date": {"$regex": f"^{re.escape(year)}-"}})
+    for required_tag in tags:
+        clauses.append({"tags": {"$elemMatch": _tag_exact_filter(required_tag)}})
+    for excluded_tag in missing_tags:
+        clauses.append({"tags": {"$not": {"$elemMatch": _tag_exact_filter(excluded_tag)}}})
+
+    # Permissions: filtered in MongoDB so counts and page sizes stay exact.
+    permission_filter = demo_permission_filter(user, "LIST_DEMOS")
+    if permission_filter:
+        clauses.append(permission_filter)
+
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
 def _json_safe(value):
     if isinstance(value, dict):
         return {k: _json_safe(v) for k, v in value.items()}
@@ -618,7 +684,10 @@ def suggestion_apply(suggestion_id):
 
     # Apply update
     try:
-        mongo.demonstrations.update_one({'_id': ObjectId(demo_id)}, {'$set': update})
+        mongo.demonstrations.update_one({'_id': ObjectId(demo_id)}, {'$set': with_derived_fields(update, demo_doc)})
+        invalidate_calendar_months(demo_doc.get('date'), update.get('date'))
+        invalidate_demo(demo_doc, {**demo_doc, **update})
+        sync_demo_tasks(mongo, demo_id)
         mongo.demo_suggestions.update_one({'_id': ObjectId(suggestion_id)}, {'$set': {'status': 'applied', 'applied_fields': selected, 'applied_by': str(getattr(current_user, '_id', 'unknown')), 'applied_at': utcnow()}})
         flash_message('Ehdotuksen valitut kentät on päivitetty.', 'success')
     except Exception:
@@ -802,7 +871,12 @@ def rollback_demo(history_id):
     })
 
     # Replace current demo
+    old_data["last_modified"] = utcnow()
+    old_data.update(derived_fields(old_data))
     mongo.demonstrations.replace_one({"_id": BsonObjectId(demo_id)}, old_data)
+    invalidate_demo(current_demo, old_data)
+    invalidate_calendar_months(current_demo.get("date"), old_data.get("date"))
+    sync_demo_tasks(mongo, demo_id)
 
     flash_message("Mielenosoitus palautettu valittuun versioon.", "success")
     return redirect(url_for("admin_demo.demo_edit_history", demo_id=demo_id))
@@ -1241,6 +1315,9 @@ def approve_demo_with_token(token):
             {"_id": _require_valid_objectid(demo_id)},
             {"$set": {"approved": True, "rejected": False, "last_modified": utcnow()}}
         )
+        invalidate_calendar_months(demo.get("date"))
+        invalidate_demo({**demo, "approved": True})
+        sync_demo_tasks(mongo, demo_id)
     except Exception:
         logger.exception("Failed to approve demo %s via token %s", demo_id, doc.get("_id"))
         flash_message("Hyväksyntä epäonnistui. Yritä uudelleen.", "error")
@@ -1333,6 +1410,9 @@ def reject_demo_with_token(token):
             {"_id": _require_valid_objectid(demo_id)},
             {"$set": {"approved": False, "rejected": True, "last_modified": utcnow()}}
         )
+        invalidate_calendar_months(demo.get("date"))
+        invalidate_demo(demo)
+        sync_demo_tasks(mongo, demo_id)
     except Exception:
         logger.exception("Failed to reject demo %s via token %s", demo_id, doc.get("_id"))
         flash_message("Hylkäys epäonnistui. Yritä uudelleen.", "error")
@@ -1431,86 +1511,21 @@ def demo_control():
     else:
         show_past_filter = show_past_param
 
-    # --- Build filter clauses ---
-    filter_clauses = [
-        {"$or": [{"rejected": {"$exists": False}}, {"rejected": False}]},
-    ]
-
-    if not show_cancelled:
-        filter_clauses.append({"cancelled": {"$ne": True}})
-
-    if not show_hidden:
-        filter_clauses.append({"$or": [{"hide": {"$exists": False}}, {"hide": False}]})
-
-    if show_past_filter == "false":
-        filter_clauses.append({"$or": [{"in_past": {"$exists": False}}, {"in_past": False}]})
-
-    if approved_only:
-        filter_clauses.append({"approved": True})
-
-    if search_query:
-        filter_clauses.append(_demo_text_search_clause(search_query))
-
-    if year_filter:
-        if year_filter.isdigit() and len(year_filter) == 4:
-            filter_clauses.append({"date": {"$regex": f"^{re.escape(year_filter)}-"}})
-        else:
-            flash_message(_("Vuosisuodatin jätettiin huomiotta, koska sen pitää olla muodossa VVVV."), "warning")
-            year_filter = ""
-
-    for required_tag in _split_admin_filter_tokens(tag_filter):
-        filter_clauses.append({"tags": {"$elemMatch": _tag_exact_filter(required_tag)}})
-
-    for excluded_tag in _split_admin_filter_tokens(missing_tag_filter):
-        filter_clauses.append(
-            {"tags": {"$not": {"$elemMatch": _tag_exact_filter(excluded_tag)}}}
-        )
+    if year_filter and not (year_filter.isdigit() and len(year_filter) == 4):
+        flash_message(_("Vuosisuodatin jätettiin huomiotta, koska sen pitää olla muodossa VVVV."), "warning")
+        year_filter = ""
 
-    # Permissions
-    if not current_user.global_admin:
-        _where = current_user._perm_in("LIST_DEMOS")
-        org_scope_ids = [
-            BsonObjectId(org)
-            for org in _where
-            if str(org) != "global" and BsonObjectId.is_valid(str(org))
-        ]
-        city_scope_keys = (
-            current_user.scoped_city_keys_for("LIST_DEMOS")
-            if hasattr(current_user, "scoped_city_keys_for")
-            else []
-        )
-        city_scope_names = [city for city in CITY_LIST if normalize_city_key(city) in city_scope_keys]
-        permission_filters = [{"editors": current_user.id}]
-        if org_scope_ids:
-            permission_filters.append(
-                {"organizers": {"$elemMatch": {"organization_id": {"$in": org_scope_ids}}}}
-            )
-        if city_scope_keys:
-            permission_filters.append(
-                {
-                    "$or": [
-                        {"city_key": {"$in": city_scope_keys}},
-                        {"city": {"$in": city_scope_names}},
-                    ]
-                }
-            )
-        if "global" not in _where:
-            filter_clauses.append({"$or": permission_filters})
-
-    def build_query(extra=None):
-        clauses = list(filter_clauses)
-        if extra:
-            if isinstance(extra, list):
-                clauses.extend(extra)
-            else:
-                clauses.append(extra)
-        if not clauses:
-            return {}
-        if len(clauses) == 1:
-            return clauses[0]
-        return {"$and": clauses}
-
-    filter_query = build_query()
+    filter_query = _demo_control_query(
+        current_user,
+        search_query=search_query,
+        year=year_filter,
+        tags=_split_admin_filter_tokens(tag_filter),
+        missing_tags=_split_admin_filter_tokens(missing_tag_filter),
+        approved_only=approved_only,
+        show_hidden=show_hidden,
+        show_past=show_past_filter,
+        show_cancelled=show_cancelled,
+    )
 
     # --- Count total documents ---
     total_count = mongo.demonstrations.count_documents(filter_query)
@@ -1541,13 +1556,6 @@ def demo_control():
 
     demos = list(mongo.demonstrations.aggregate(pipeline))
 
-    if not current_user.global_admin:
-        demos = [
-            demo
-            for demo in demos
-            if _user_can_access_demo(demo.get("_id"), "LIST_DEMOS")
-        ]
-
     recommended_lookup = {
         doc.get("demo_id"): True for doc in mongo.recommended_demos.find({}, {"demo_id": 1})
     }
@@ -1835,11 +1843,21 @@ def merge_demos():
     merged_doc["aliases"] = alias_values
     merged_doc["merged_into"] = None
     merged_doc["last_modified"] = utcnow()
+    merged_doc.update(derived_fields(merged_doc))
 
     mongo.demonstrations.replace_one({"_id": primary_doc["_id"]}, merged_doc)
 
     if secondary_ids:
         mongo.demonstrations.delete_many({"_id": {"$in": [ObjectId(d) for d in secondary_ids]}})
+        record_deleted_demos(mongo, *secondary_ids)
+    invalidate_demo_identifiers(primary_id, *secondary_ids, identifiers=[merged_doc.get("slug")])
+    invalidate_demo(original_primary, merged_doc, *(doc_map[demo_id] for demo_id in secondary_ids))
+    invalidate_calendar_months(
+        original_primary.get("date"),
+        merged_doc.get("date"),
+        *(doc_map[demo_id].get("date") for demo_id in secondary_ids),
+    )
+    sync_demo_tasks(mongo, primary_id, *secondary_ids)
 
     backup_payload = {
         "primary_demo_id": primary_id,
@@ -2029,46 +2047,6 @@ def _build_canonical_demo_links(primary_id: str) -> list[str]:
             canonical_links.append(link)
     return canonical_links
 
-def _summarize_analytics_doc(analytics_doc: dict | None) -> dict:
-    """Return high-level counters from the aggregated analytics doc."""
-    summary = {"total": 0, "last_7d": 0, "last_24h": 0}
-    if not isinstance(analytics_doc, dict):
-        return summary
-
-    analytics_map = analytics_doc.get("analytics") or {}
-    if not isinstance(analytics_map, dict):
-        return summary
-
-    now = utcnow()
-    for day_str, hours in analytics_map.items():
-        if not isinstance(hours, dict):
-            continue
-        try:
-            day_base = datetime.strptime(day_str, "%Y-%m-%d")
-        except (TypeError, ValueError):
-            continue
-        for hour_str, minutes in hours.items():
-            if not isinstance(minutes, dict):
-                continue
-            try:
-                hour = int(hour_str)
-            except (TypeError, ValueError):
-                continue
-            for minute_str, count in minutes.items():
-                try:
-                    minute = int(minute_str)
-                    amount = int(count)
-                except (TypeError, ValueError):
-                    continue
-                summary["total"] += max(amount, 0)
-                stamp = day_base.replace(hour=hour, minute=minute)
-                delta = now - stamp
-                if timedelta(0) <= delta <= timedelta(days=1):
-                    summary["last_24h"] += amount
-                if timedelta(0) <= delta <= timedelta(days=7):
-                    summary["last_7d"] += amount
-    return summary
-
 def _coerce_datetime(value):
     """Best-effort conversion of common date representations to datetime."""
     if isinstance(value, datetime):
@@ -2259,8 +2237,9 @@ def demo_command_center(demo_id):
         coerced = _coerce_datetime(recommended_doc.get("recommend_till"))
         if coerced:
             recommended_doc["recommend_till"] = coerced
-    analytics_doc = mongo.d_analytics.find_one({"_id": demo_data["_id"]})
-    analytics_summary = _summarize_analytics_doc(analytics_doc)
+    analytics_summary = analytics_buckets.summarize(
+        mongo[analytics_buckets.COLLECTION], demo_data["_id"]
+    )
 
     stats = {
         "attending": mongo.demo_attending.count_documents(
@@ -2470,7 +2449,6 @@ def demo_command_center(demo_id):
         demo_id=demo_id_str,
         submitter=submitter,
         stats=stats,
-        analytics_doc=analytics_doc or {},
         analytics_summary=analytics_summary,
         audit_logs=audit_logs,
         history_entries=history_entries,
@@ -2752,7 +2730,11 @@ def handle_demo_form(request, is_edit=False, demo_id=None, case_id=None):
                 flash_message(_("Sinulla ei ole oikeutta luoda mielenosoitusta valittuun paikkakuntaan."), "error")
                 abort(403)
             # Insert a new demonstration
+            demonstration_data.update(derived_fields(demonstration_data))
             insert_result = mongo.demonstrations.insert_one(demonstration_data)
+            invalidate_calendar_months(demonstration_data.get("date"))
+            invalidate_demo({**demonstration_data, "_id": insert_result.inserted_id})
+            sync_demo_tasks(mongo, insert_result.inserted_id)
             try:
                 demo_doc = demonstration_data.copy()
                 demo_doc["_id"] = insert_result.inserted_id
@@ -2926,8 +2908,9 @@ def add_demo_editor(demo_id):
     user_id = str(user_doc["_id"])
     result = mongo.demonstrations.update_one(
         {"_id": ObjectId(demo_id)},
-        {"$addToSet": {"editors": user_id}}
+        {"$addToSet": {"editors": user_id}, "$set": {"last_modified": utcnow()}}
     )
+    sync_demo_tasks(mongo, demo_id)
 
     if result.modified_count:
         log_demo_audit_entry(
@@ -2967,8 +2950,9 @@ def remove_demo_editor(demo_id):
 
     result = mongo.demonstrations.update_one(
         {"_id": ObjectId(demo_id)},
-        {"$pull": {"editors": user_id}}
+        {"$pull": {"editors": user_id}, "$set": {"last_modified": utcnow()}}
     )
+    sync_demo_tasks(mongo, demo_id)
     if result.modified_count:
         log_demo_audit_entry(
             demo_id,
@@ -3336,6 +3320,10 @@ def delete_demo():
 
     # Perform deletion
     mongo.demonstrations.delete_one({"_id": ObjectId(demo_id)})
+    record_deleted_demos(mongo, demo_id)
+    invalidate_demo(demo_data)
+    invalidate_calendar_months(demo_data.get("date"))
+    sync_demo_tasks(mongo, demo_id)
 
     success_message = "Mielenosoitus poistettu onnistuneesti."
     if json_mode:
@@ -3925,8 +3913,11 @@ def approve_demo(demo_id):
 
     mongo.demonstrations.update_one(
         {"_id": _require_valid_objectid(demo_id)},
-        {"$set": {"approved": True, "rejected": False}}
+        {"$set": {"approved": True, "rejected": False, "last_modified": utcnow()}}
     )
+    invalidate_calendar_months(demo.get("date"))
+    invalidate_demo({**demo, "approved": True})
+    sync_demo_tasks(mongo, demo_id)
 
     updated_demo = demo.copy()
     updated_demo["approved"] = True
@@ -3977,8 +3968,11 @@ def reject_demo(demo_id):
 
     mongo.demonstrations.update_one(
         {"_id": _require_valid_objectid(demo_id)},
-        {"$set": {"approved": False, "rejected": True}}
+        {"$set": {"approved": False, "rejected": True, "last_modified": utcnow()}}
     )
+    invalidate_calendar_months(demo.get("date"))
+    invalidate_demo(demo)
+    sync_demo_tasks(mongo, demo_id)
     _revoke_tokens_for_demo(demo_id, ["approve"])
 
     updated_demo = demo.copy()
@@ -4076,6 +4070,20 @@ def bulk_cancel_demos():
     results = []
     cancelled_count = 0
 
+    # One query for every requested demo, with the permission check compiled
+    # into a second projection-only query instead of one check per demo.
+    valid_oids = [ObjectId(raw_id) for raw_id in demo_ids if ObjectId.is_valid(str(raw_id))]
+    demos_by_id = {
+        demo["_id"]: demo for demo in mongo.demonstrations.find({"_id": {"$in": valid_oids}})
+    }
+    editable_ids = {
+        demo["_id"]
+        for demo in mongo.demonstrations.find(
+            restrict_demo_query({"_id": {"$in": list(demos_by_id)}}, current_user, "EDIT_DEMO"),
+            {"_id": 1},
+        )
+    }
+
     for raw_id in demo_ids:
         entry = {"demo_id": raw_id}
         try:
@@ -4086,13 +4094,13 @@ def bulk_cancel_demos():
             results.append(entry)
             continue
 
-        demo = mongo.demonstrations.find_one({"_id": demo_oid})
+        demo = demos_by_id.get(demo_oid)
         if not demo:
             entry["status"] = "not_found"
             entry["message"] = _(u"Mielenosoitusta ei löytynyt.")
             results.append(entry)
             continue
-        if not _user_can_access_demo(demo["_id"], "EDIT_DEMO"):
+        if demo_oid not in editable_ids:
             entry["status"] = "forbidden"
             entry["message"] = _(u"Ei oikeutta käsitellä tätä mielenosoitusta.")
             results.append(entry)
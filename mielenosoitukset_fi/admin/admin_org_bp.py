@@ -19,7 +19,10 @@ from flask import Blueprint, abort, redirect, render_template, request, url_for,
 from flask_babel import gettext as _
 from flask_login import current_user, login_required
 from mielenosoitukset_fi.users.models import User
+from mielenosoitukset_fi.utils.admin_tasks import sync_org_suggestion_tasks
+from mielenosoitukset_fi.utils.cache import invalidate_tags, org_tag
 from mielenosoitukset_fi.utils.flashing import flash_message
+from mielenosoitukset_fi.utils.principal import bump_permissions_version
 from mielenosoitukset_fi.utils.validators import valid_email
 from mielenosoitukset_fi.utils.wrappers import admin_required, permission_required
 from .utils import mongo, get_org_name as get_organization_name
@@ -402,6 +405,7 @@ def update_organization(org_id):
             "$set": update_payload
         },
     )
+    invalidate_tags(org_tag(org_id))
     return True
 
 
@@ -636,6 +640,7 @@ def delete_organization(org_id):
 
     if "confirm_delete" in request.form:
         mongo.organizations.delete_one({"_id": ObjectId(org_id)})
+        invalidate_tags(org_tag(org_id))
         flash_message(_("Organisaatio poistettu onnistuneesti."))
         _log_org_event("organization_deleted", org_id=org_id)
 
@@ -795,9 +800,11 @@ def delete_membership() -> Tuple[Response, int]:
         return jsonify({"error": "Membership ID puuttuu"}), 400
 
     # --- Delete membership ---
+    membership = mongo.memberships.find_one({"_id": ObjectId(membership_id)}, {"user_id": 1})
     result = mongo.memberships.delete_one({"_id": ObjectId(membership_id)})
 
     if result.deleted_count == 1:
+        bump_permissions_version(mongo, (membership or {}).get("user_id"))
         _log_org_event("membership_deleted", membership_id=membership_id)
         return jsonify({"message": "Käyttäjä poistettu organisaatiosta"}), 200
 
@@ -850,6 +857,7 @@ def review_suggestion(org_id, suggestion_id):
         {"_id": ObjectId(suggestion_id)},
         update_ops
     )
+    sync_org_suggestion_tasks(mongo, suggestion_id)
 
     # Reload suggestion so we render fresh data
     suggestion = mongo.org_edit_suggestions.find_one({"_id": ObjectId(suggestion_id)})
@@ -913,6 +921,7 @@ def apply_suggestion(org_id, suggestion_id):
             {"_id": ObjectId(org_id)},
             {"$set": update_data}
         )
+        invalidate_tags(org_tag(org_id))
         applied_successfully = True
         flash_message("Organisaation tiedot päivitettiin valittujen kenttien osalta 💖", "success")
         _log_org_event(
@@ -962,6 +971,7 @@ def apply_suggestion(org_id, suggestion_id):
             {"_id": ObjectId(suggestion_id)},
             {"$set": {"status.completed_at": utcnow()}}
         )
+    sync_org_suggestion_tasks(mongo, suggestion_id)
 
     _log_org_event(
         "organization_suggestion_status_update",
@@ -992,6 +1002,7 @@ def get_suggestion_with_expiry_check(suggestion_id):
                 {"$set": {"status.state": "pending"}}
             )
             suggestion["status"]["state"] = "pending"  # keep local copy consistent
+            sync_org_suggestion_tasks(mongo, suggestion_id)
 
     return suggestion
 
@@ -13,7 +13,10 @@ from mielenosoitukset_fi.utils.variables import CITY_LIST
 from mielenosoitukset_fi.utils.wrappers import permission_required, admin_required
 
 from mielenosoitukset_fi.utils.admin.demonstration import collect_tags
+from mielenosoitukset_fi.utils.admin_tasks import sync_demo_tasks
+from mielenosoitukset_fi.utils.cache import invalidate_demo
 from mielenosoitukset_fi.utils.demo_cancellation import cancel_demo
+from mielenosoitukset_fi.utils.demo_summary import with_derived_fields
 from mielenosoitukset_fi.demonstrations.audit import record_demo_change
 from .utils import mongo, _ADMIN_TEMPLATE_FOLDER
 
@@ -629,8 +632,10 @@ def bulk_update_children(demo_id):
         new_child.update(deepcopy(update_fields))
         mongo.demonstrations.update_one(
             {"_id": child["_id"], "parent": parent_id},
-            {"$set": deepcopy(update_fields)},
+            {"$set": with_derived_fields(deepcopy(update_fields), child)},
         )
+        invalidate_demo(child, new_child)
+        sync_demo_tasks(mongo, child["_id"])
         record_demo_change(
             child["_id"],
             child,
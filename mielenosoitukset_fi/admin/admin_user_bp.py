@@ -13,6 +13,7 @@ from mielenosoitukset_fi.utils.city_settings import enabled_city_names
 from mielenosoitukset_fi.utils.validators import valid_email
 from mielenosoitukset_fi.utils.database import stringify_object_ids
 from mielenosoitukset_fi.utils.flashing import flash_message
+from mielenosoitukset_fi.utils.principal import bump_permissions_version
 
 from .utils import get_org_name, mongo, _ADMIN_TEMPLATE_FOLDER
 from flask_babel import _
@@ -153,6 +154,7 @@ def _sync_city_scope_grant(user_id: ObjectId, city_keys: list[str], permissions:
             query,
             {"$set": {"revoked_at": utcnow(), "revoked_by": str(current_user._id)}},
         )
+        bump_permissions_version(mongo, user_id)
         return
 
     existing = mongo.admin_scope_grants.find_one(query)
@@ -172,6 +174,7 @@ def _sync_city_scope_grant(user_id: ObjectId, city_keys: list[str], permissions:
         payload["created_at"] = utcnow()
         payload["granted_by"] = str(current_user._id)
         mongo.admin_scope_grants.insert_one(payload)
+    bump_permissions_version(mongo, user_id)
 
 
 def compare_user_levels(user1, user2):  # Check if the user1 is higher than user2
@@ -284,6 +287,8 @@ def edit_user(user_id):
         # 4️⃣ Päivitä vain jos on muutoksia
         if changes:
             mongo.users.update_one({"_id": ObjectId(user_id)}, {"$set": changes})
+            if "role" in changes or "global_permissions" in changes:
+                bump_permissions_version(mongo, user_id)
             flash_message("Käyttäjä päivitetty onnistuneesti.", "approved")
         else:
             flash_message("Mitään ei muutettu.", "info")
@@ -411,6 +416,7 @@ def save_user(user_id):
 
 
     user.save()
+    bump_permissions_version(mongo, user._id)
 
     if _can_manage_scope_grants(current_user):
         city_scope_keys = request.form.getlist("admin_scope_cities[]")
@@ -25,7 +25,14 @@ from mielenosoitukset_fi.utils.tokens import (
     check_token
 )
 from mielenosoitukset_fi.api.exceptions import ApiException, Message
-from mielenosoitukset_fi.utils.cache import cache, should_skip_cache
+from mielenosoitukset_fi.utils.cache import (
+    PUBLIC_LIST_TAG,
+    cache,
+    cached_json_response,
+    should_skip_cache,
+    tagged_cache_key,
+)
+from mielenosoitukset_fi.utils.keyset import approximate_count, decode_cursor, keyset_page
 from mielenosoitukset_fi.utils.request_ip import get_client_ip
 
 mongo = DatabaseManager().get_instance().get_db()
@@ -135,11 +142,17 @@ import hashlib
 import json
 from flask import request
 
+DEMONSTRATION_LIST_CACHE_TIMEOUT = 300
+
+
 def make_cache_key():
     params = request.args.to_dict(flat=True)
     # sort keys to make order irrelevant
     params_str = json.dumps(params, sort_keys=True)
-    return "demonstrations:" + hashlib.md5(params_str.encode("utf-8")).hexdigest()
+    return tagged_cache_key(
+        "demonstrations:" + hashlib.md5(params_str.encode("utf-8")).hexdigest(),
+        [PUBLIC_LIST_TAG],
+    )
 
 
 def _case_insensitive_contains(value):
@@ -178,83 +191,12 @@ PUBLIC_DEMONSTRATION_LIST_PROJECTION = {
 }
 
 
-@api_bp.route("/demonstrations", methods=["GET"])
-# @token_required(required_scopes=["read"])
-def list_demonstrations():
-    """
-    Retrieve a paginated and filterable list of demonstrations.
-
-    ---
-    ### 🔍 Query Parameters
-
-    - **search** (`str`, optional):  
-      Free text search within the title (case-insensitive).
-
-    - **city** (`str`, optional):  
-      Filter by city name (case-insensitive).
-
-    - **title** (`str`, optional):  
-      Title substring filter (case-insensitive).
-
-    - **tag** (`str`, optional):  
-      Filter by tag (case-insensitive match against the `tags` array).
-
-    - **recurring** (`str`, optional):  
-      Not currently applied; reserved for future use.
-
-    - **in_past** (`bool`, optional, default=`false`):  
-      Include past demonstrations if set to `"true"`.
-
-    - **parent_id** (`str`, optional):  
-      Filter by parent demonstration ID.
-
-    - **organization_id** (`str`, optional):  
-      Filter by organizer organization ID.
-
-    - **include_cancelled** (`bool`, optional, default=`false`):  
-      Include cancelled demonstrations. Automatically enabled when filtering by organization or recurring
-      parent demonstrations.
-
-    - **max_days_till** (`int`, optional):  
-      Include only demonstrations within *N* days from today (inclusive).
-
-    - **page** (`int`, optional, default=`1`):  
-      Pagination page number.
-
-    - **per_page** (`int`, optional, default=`20`):  
-      Number of items per page.
-
-    ---
-    ### 🧾 Returns
-    JSON response:
-    ```json
-    {
-        "page": 1,
-        "per_page": 20,
-        "total": 133,
-        "total_pages": 7,
-        "next_url": "...",
-        "prev_url": null,
-        "results": [ ... list of demonstration objects ... ]
-    }
-    ```
-    """
+def _demonstration_list_payload():
+    """Query one page of ``list_demonstrations`` for the current request arguments."""
 
     # --- Extract & normalize query parameters ---
     def get_param(name: str, default: str = ""):
         return request.args.get(name, default).strip().casefold()
-    cache_key = make_cache_key()
-    use_cache = bool(cache) and not should_skip_cache(public_only=False)
-
-    cached_response = cache.get(cache_key) if use_cache else None
-
-    if cached_response:
-        response_to_return = deepcopy(cached_response)
-        return jsonify(response_to_return), 200
-
-        
-    
-    
 
     search = get_param("search")
     raw_city = request.args.get("city", "").strip()
@@ -329,6 +271,9 @@ def list_demonstrations():
     if extra_filters:
         query["$and"] = query.get("$and", []) + extra_filters
 
+    if "cursor" in request.args:
+        return _demonstration_cursor_payload(query, per_page)
+
     # --- Pagination slicing ---
     total = mongo.demonstrations.count_documents(query)
     total_pages = max((total + per_page - 1) // per_page, 1)
@@ -363,19 +308,121 @@ def list_demonstrations():
         "prev_url": prev_url,
         "results": paginated,
         "rendered_at": utcnow().isoformat() + "Z",
-        "cached": True  # mark as cached
     }
+    return response_data
+
+
+def _demonstration_cursor_payload(query, per_page):
+    """Keyset-paginated variant of :func:`_demonstration_list_payload` (``?cursor=``)."""
+    docs, next_cursor = keyset_page(
+        mongo.demonstrations,
+        query,
+        PUBLIC_DEMONSTRATION_LIST_PROJECTION,
+        request.args.get("cursor", ""),
+        per_page,
+    )
+    next_url = None
+    if next_cursor:
+        params = {k: v for k, v in request.args.items() if k != "cursor"}
+        params["cursor"] = next_cursor
+        next_url = f"{request.base_url}?{urlencode(params)}"
+    response_data = {
+        "per_page": per_page,
+        "next_cursor": next_cursor,
+        "next_url": next_url,
+        "results": [stringify_object_ids(demo) for demo in docs],
+        "rendered_at": utcnow().isoformat() + "Z",
+    }
+    if request.args.get("include_total", "").strip().lower() == "true":
+        response_data["total"] = approximate_count(mongo.demonstrations, query)
+    return response_data
+
+
+@api_bp.route("/demonstrations", methods=["GET"])
+# @token_required(required_scopes=["read"])
+def list_demonstrations():
+    """
+    Retrieve a paginated and filterable list of demonstrations.
+
+    ---
+    ### 🔍 Query Parameters
+
+    - **search** (`str`, optional):  
+      Free text search within the title (case-insensitive).
+
+    - **city** (`str`, optional):  
+      Filter by city name (case-insensitive).
 
-    # --- Cache the response ---
-    if use_cache:
-        cache.set(cache_key, response_data)
+    - **title** (`str`, optional):  
+      Title substring filter (case-insensitive).
 
-    # --- Before returning, make a copy and set cached=False ---
-    response_to_return = deepcopy(response_data)
-    response_to_return["cached"] = False
+    - **tag** (`str`, optional):  
+      Filter by tag (case-insensitive match against the `tags` array).
 
-    return jsonify(response_to_return), 200
+    - **recurring** (`str`, optional):  
+      Not currently applied; reserved for future use.
 
+    - **in_past** (`bool`, optional, default=`false`):  
+      Include past demonstrations if set to `"true"`.
+
+    - **parent_id** (`str`, optional):  
+      Filter by parent demonstration ID.
+
+    - **organization_id** (`str`, optional):  
+      Filter by organizer organization ID.
+
+    - **include_cancelled** (`bool`, optional, default=`false`):  
+      Include cancelled demonstrations. Automatically enabled when filtering by organization or recurring
+      parent demonstrations.
+
+    - **max_days_till** (`int`, optional):  
+      Include only demonstrations within *N* days from today (inclusive).
+
+    - **page** (`int`, optional, default=`1`):  
+      Pagination page number.
+
+    - **per_page** (`int`, optional, default=`20`):  
+      Number of items per page.
+
+    - **cursor** (`str`, optional):  
+      Switch to keyset pagination ordered by date, start time and id. Pass an
+      empty value for the first page and the returned `next_cursor` for the
+      following ones; `page` is ignored and `total`/`total_pages` are left out.
+
+    - **include_total** (`bool`, optional, default=`false`):  
+      In cursor mode, add an approximate `total` (cached count).
+
+    ---
+    ### 🧾 Returns
+    JSON response:
+    ```json
+    {
+        "page": 1,
+        "per_page": 20,
+        "total": 133,
+        "total_pages": 7,
+        "next_url": "...",
+        "prev_url": null,
+        "results": [ ... list of demonstration objects ... ]
+    }
+    ```
+    """
+
+    if request.args.get("cursor"):
+        try:
+            decode_cursor(request.args["cursor"])
+        except ValueError:
+            raise ApiException(Message("Invalid cursor", "invalid_cursor"), 400)
+
+    if should_skip_cache(public_only=False):
+        return jsonify(dict(_demonstration_list_payload(), cached=False)), 200
+
+    return cached_json_response(
+        make_cache_key(),
+        _demonstration_list_payload,
+        DEMONSTRATION_LIST_CACHE_TIMEOUT,
+        cached_field="cached",
+    )
 
 
 @api_bp.route("/demonstrations/<demo_id>", methods=["GET"])
@@ -607,80 +654,96 @@ FRIENDS_DATA = {
         {"name": "Mikko Meikäläinen", "avatar": "/avatars/mikko.jpg"}],
 }
 
+FRIENDS_ATTENDING_MAX_DEMOS = 100
+FRIENDS_ATTENDING_CACHE_TIMEOUT = 30  # seconds
+
+
 def _get_user_friends():
-    return [friend.get("user_id") for friend in current_user.friends]
-    
-        
-    
+    """Return the current user's friend ids as ObjectIds."""
+    friend_ids = []
+    for friend in current_user.friends or []:
+        fid = friend.get("user_id") if isinstance(friend, dict) else friend
+        if isinstance(fid, dict):
+            fid = fid.get("$oid")
+        if isinstance(fid, str) and ObjectId.is_valid(fid):
+            fid = ObjectId(fid)
+        if isinstance(fid, ObjectId):
+            friend_ids.append(fid)
+    return friend_ids
+
+
 from bson import ObjectId
-def _get_attending_per_demo(demoId, user_friends):
+def _get_attending_by_demo(demo_ids, user_friends):
     """
-    Returns a list of friends attending a given demo, with their name and avatar.
+    Return ``{demo_id: [friend, ...]}`` for friends attending any of ``demo_ids``.
+
+    One aggregation joins the attendance rows with the attending users, so
+    the cost does not grow with the number of demos on the page.
     """
-    demoId = ObjectId(demoId) if not isinstance(demoId, ObjectId) else demoId
-
-    # 1️⃣ Get attending docs for this demo & friends
-    attending_docs = list(demo_attending_collection.find({
-        "demo_id": demoId,
-        "user_id": {"$in": user_friends},
-        "attending": True
-    }))
-
-    if not attending_docs:
-        return []
-
-    # 2️⃣ Extract the user_ids
-    attend_uid = [doc["user_id"] for doc in attending_docs]
-
-    # 3️⃣ Query users collection for display info
-    user_docs = mongo["users"].find({"_id": {"$in": attend_uid}})
-
-    # 4️⃣ Build a dict for fast lookup
-    user_info_map = {str(user["_id"]): user for user in user_docs}
-
-    # 5️⃣ Combine attendance + user info
-    combined = []
-    for doc in attending_docs:
-        uid = str(doc["user_id"])
-        user = user_info_map.get(uid, {})
-        combined.append({
-            "user_id": uid,
-            "name": user.get("displayname", "Unknown"),
-            "avatar": user.get("profile_picture")
-        })
+    if not demo_ids or not user_friends:
+        return {}
+
+    pipeline = [
+        {
+            "$match": {
+                "demo_id": {"$in": demo_ids},
+                "user_id": {"$in": user_friends},
+                "attending": True,
+            }
+        },
+        {"$lookup": {"from": "users", "localField": "user_id", "foreignField": "_id", "as": "user"}},
+        {"$project": {"demo_id": 1, "user_id": 1, "user.displayname": 1, "user.profile_picture": 1}},
+        {"$group": {"_id": "$demo_id", "attending": {"$push": {"user_id": "$user_id", "user": "$user"}}}},
+    ]
 
-    return combined
+    result = {}
+    for row in demo_attending_collection.aggregate(pipeline):
+        friends = []
+        for entry in row["attending"]:
+            user = (entry.get("user") or [{}])[0]
+            friends.append({
+                "user_id": str(entry["user_id"]),
+                "name": user.get("displayname", "Unknown"),
+                "avatar": user.get("profile_picture"),
+            })
+        result[str(row["_id"])] = friends
+    return result
 
 
 @api_bp.route("/friends-attending", methods=["POST"])
 def friends_attending():
     """
-    Expects JSON: { "demo_ids": [1, 2, 3] }
-    Returns: { "1": [...friends...], "2": [...], ... }
+    Expects JSON: { "demo_ids": ["<id>", ...] } (at most FRIENDS_ATTENDING_MAX_DEMOS)
+    Returns: { "<id>": [...friends...], ... }
+
+    Answers are cached per user and demo set for FRIENDS_ATTENDING_CACHE_TIMEOUT seconds.
     """
-    data = request.get_json()
+    data = request.get_json(silent=True)
     if not data or "demo_ids" not in data:
         return jsonify({"error": "Missing demo_ids"}), 400
 
-    
-
     demo_ids = data["demo_ids"]
-    result = {}
-    
-    
-    friends = _get_user_friends()
-    
-    #print("Filtering by", friends)
-
-    for demo_id in demo_ids:
-        
-        # Convert to ObjectId if coming as string
-        demo_id = ObjectId(demo_id)
-        #print(demo_id)
-        friends_attending = _get_attending_per_demo(demoId=demo_id, user_friends=friends)
-        #print(friends_attending)
-        result[str(demo_id)] = friends_attending
-
+    if not isinstance(demo_ids, list):
+        return jsonify({"error": "demo_ids must be a list"}), 400
+    if len(demo_ids) > FRIENDS_ATTENDING_MAX_DEMOS:
+        return jsonify({"error": f"At most {FRIENDS_ATTENDING_MAX_DEMOS} demo_ids per request"}), 400
+
+    demo_oids = list(dict.fromkeys(
+        ObjectId(demo_id) for demo_id in demo_ids
+        if isinstance(demo_id, str) and ObjectId.is_valid(demo_id)
+    ))
+    result = {str(demo_id): [] for demo_id in demo_oids}
+    if not current_user.is_authenticated or not demo_oids:
+        return jsonify(result)
+
+    digest = hashlib.sha1(",".join(sorted(result)).encode("utf-8")).hexdigest()
+    cache_key = f"friends_attending:v1:{current_user.get_id()}:{digest}"
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return jsonify(cached)
+
+    result.update(_get_attending_by_demo(demo_oids, _get_user_friends()))
+    cache.set(cache_key, result, timeout=FRIENDS_ATTENDING_CACHE_TIMEOUT)
     return jsonify(result)
 
 @api_bp.route("/user/friends/")
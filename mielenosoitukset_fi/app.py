@@ -9,7 +9,7 @@ from mielenosoitukset_fi.background_jobs import JOB_DEFINITIONS, init_background
 
 from mielenosoitukset_fi.utils.logger import logger
 from mielenosoitukset_fi.database_manager import DatabaseManager
-from mielenosoitukset_fi.users.models import User, AnonymousUser
+from mielenosoitukset_fi.users.models import AnonymousUser
 from mielenosoitukset_fi.error_handlers import register_error_handlers
 from mielenosoitukset_fi.utils.media_helpers import (
     get_demo_cover_image,
@@ -30,7 +30,10 @@ from mielenosoitukset_fi.notifications_bp import notif_bp
 
 import os
 
-from mielenosoitukset_fi.utils.wrappers import depracated_endpoint, has_demo_permission
+from mielenosoitukset_fi.utils.principal import load_user_principal
+from mielenosoitukset_fi.utils import lazy_context
+from mielenosoitukset_fi.utils.admin_tasks import tasks_for_user
+from mielenosoitukset_fi.utils.wrappers import depracated_endpoint
 
 from flask_caching import Cache  # Added for caching
 
@@ -90,6 +93,7 @@ def create_app(config_overrides=None) -> Flask:
         
     from mielenosoitukset_fi.utils.cache import cache, skip_cache_public_only
     cache.init_app(app)
+    lazy_context.init_app(app)
     
 
     # Locale selector function
@@ -130,12 +134,12 @@ def create_app(config_overrides=None) -> Flask:
     # User Loader function
     @login_manager.user_loader
     def load_user(user_id):
-        user_doc = mongo.users.find_one({"_id": ObjectId(user_id)})
-        if user_doc:
-            logger.info(f"User loaded: {user_doc.get('username')}")
-            return User.from_db(user_doc)
-        logger.warning(f"User not found with id: {user_id}")
-        return None
+        # Memberships and scoped grants come from the per-process principal
+        # cache (utils.principal); only the user document is read.
+        user = load_user_principal(mongo, user_id)
+        if user is None:
+            logger.warning(f"User not found with id: {user_id}")
+        return user
 
     # Import and register blueprints
     from admin import (
@@ -316,123 +320,47 @@ def create_app(config_overrides=None) -> Flask:
     from datetime import datetime, timedelta
     from bson import ObjectId
 
-    # --- Cached admin tasks (avoid re-running heavy queries on every template render) ---
-    _admin_tasks_cache = {"tasks": None, "timestamp": 0}
-    _ADMIN_TASKS_CACHE_TTL = 30  # seconds
-
-    def _get_admin_tasks_cached():
-        import time as _time
-        now = _time.monotonic()
-        cached = _admin_tasks_cache["tasks"]
-        if cached is not None and (now - _admin_tasks_cache["timestamp"]) < _ADMIN_TASKS_CACHE_TTL:
-            return cached
-
-        tasks = []
-
-        # --- DEMONSTRATION approval tasks ---
-        waiting_demos = list(
-            mongo.demonstrations.find({
-                "approved": False,
-                "hide": False,
-                "$or": [
-                    {"rejected": False},
-                    {"rejected": {"$exists": False}}
-                ]
-            }).sort("created_at", -1)
-        )
-        for demo in waiting_demos:
-            if not getattr(current_user, "global_admin", False) and not has_demo_permission(
-                current_user,
-                demo["_id"],
-                "LIST_DEMOS",
-            ):
-                continue
-            tasks.append({
-                "type": "demo",
-                "id": str(demo["_id"]),
-                "title": demo.get("title", "Nimetön mielenosoitus"),
-                "created_at": demo.get("created_datetime", datetime.now()) or datetime.now(),
-                "status": "waiting_approval",
-                "link": url_for("admin_demo.edit_demo", demo_id=demo["_id"]),
-            })
-
-        # --- ORG SUGGESTIONS tasks ---
-        org_suggestions = list(
-            mongo.org_edit_suggestions.find({
-        "status.state": {"$nin": ["partially_applied", "applied", "rejected", "cancelled"]}
-        }).sort("created_at", -1)
-        )
-        for s in org_suggestions:
-            if not getattr(current_user, "global_admin", False) and not current_user.has_permission(
-                "EDIT_ORGANIZATION",
-                s["organization_id"],
-            ):
-                continue
-            org = mongo.organizations.find_one({"_id": ObjectId(s["organization_id"])})
-            org_name = org["name"] if org else "Tuntematon organisaatio"
-            tasks.append({
-                "type": "org_suggestion",
-                "id": str(s["_id"]),
-                "title": f"Organisaation päivitysehdotus: {org_name}",
-                "created_at": s.get("created_at", datetime.now()),
-                "status": (s.get("status") or {}).get("state"),
-                "link": url_for("admin_org.review_suggestion", org_id=s["organization_id"], suggestion_id=s["_id"]),
-            })
-
-        # sort by creation time descending
-        tasks.sort(key=lambda x: x.get("created_at", datetime.min), reverse=True)
-
-        _admin_tasks_cache["tasks"] = tasks
-        _admin_tasks_cache["timestamp"] = now
-        return tasks
-
-    @app.context_processor
-    def utility_processor():
-        def get_org_name(org_id):
-            org = mongo.organizations.find_one({"_id": ObjectId(org_id)}, {"name": 1})
-            return org.get("name") if org else "Tuntematon"
-
-        def _get_user_by_id(user_id, fields=None, include_none=False):
-            if fields is None:
-                fields = ["username", "display_name", "profile_picture", "last_login"]
-
-            try:
-                oid = ObjectId(user_id) if not isinstance(user_id, ObjectId) else user_id
-            except Exception:
-                return None
+    # Template helpers hit the database only when called, once per
+    # argument set and request (see utils.lazy_context).
+    @lazy_context.memoized
+    def get_org_name(org_id):
+        org = mongo.organizations.find_one({"_id": ObjectId(org_id)}, {"name": 1})
+        return org.get("name") if org else "Tuntematon"
 
-            user = mongo.users.find_one({"_id": oid})
-            if not user:
-                return None
+    @lazy_context.memoized
+    def _get_user_by_id(user_id, fields=None, include_none=False):
+        if fields is None:
+            fields = ["username", "display_name", "profile_picture", "last_login"]
 
-            user_data = {}
-            for field in fields:
-                if field in user:
-                    if user[field] is not None or include_none:
-                        user_data[field] = user[field]
+        try:
+            oid = ObjectId(user_id) if not isinstance(user_id, ObjectId) else user_id
+        except Exception:
+            return None
 
-            return user_data
+        user = mongo.users.find_one({"_id": oid}, {field: 1 for field in fields})
+        if not user:
+            return None
 
-        def get_supported_locales():
-            return app.config["BABEL_SUPPORTED_LOCALES"]
+        user_data = {}
+        for field in fields:
+            if field in user:
+                if user[field] is not None or include_none:
+                    user_data[field] = user[field]
 
-        def get_lang_name(lang_code):
-            return app.config["BABEL_LANGUAGES"].get(lang_code)
+        return user_data
 
-        # Get all tasks (uses 30s in-memory cache)
-        tasks = _get_admin_tasks_cached()
-        tasks_amount_total = len(tasks)
+    def get_supported_locales():
+        return app.config["BABEL_SUPPORTED_LOCALES"]
 
-        # Demonstrations done
-        tasks_amount_done = sum(1 for t in tasks if t.get("approved", False) or t.get("state") == "applied")
+    def get_lang_name(lang_code):
+        return app.config["BABEL_LANGUAGES"].get(lang_code)
 
+    @app.context_processor
+    def utility_processor():
         return dict(
             get_org_name=get_org_name,
             get_supported_locales=get_supported_locales,
             get_lang_name=get_lang_name,
-            tasks=tasks,
-            tasks_amount_total=tasks_amount_total,
-            tasks_amount_done=tasks_amount_done,
             _get_user_by_id=_get_user_by_id
         )
 
@@ -512,6 +440,10 @@ def create_app(config_overrides=None) -> Flask:
         attr_or_get=attr_or_get,
         get_demo_cover_image=get_demo_cover_image,
         get_demo_gallery_images=get_demo_gallery_images,
+        # Called by admin_base.html only, so public pages skip the query.
+        admin_tasks=lambda: lazy_context.resolve(
+            "admin_tasks", lambda: tasks_for_user(mongo, current_user)
+        ),
     )
 
     return app
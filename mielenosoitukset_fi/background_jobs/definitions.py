@@ -17,6 +17,8 @@ from mielenosoitukset_fi.scripts.process_submission_notifications import (
     run as process_submit_notifications,
 )
 from mielenosoitukset_fi.utils.analytics import prep
+from mielenosoitukset_fi.utils.demo_scores import run_demo_scores
+from mielenosoitukset_fi.utils.sitemap import run_sitemap_refresh
 from mielenosoitukset_fi.scripts.auto_close_cases import main as auto_close_cases
 
 
@@ -74,10 +76,17 @@ JOB_DEFINITIONS: List[JobDefinition] = [
     JobDefinition(
         key="prep",
         name="Analytics rollup",
-        description="Aggregates analytics stats for dashboards.",
+        description="Incrementally rolls new view events into per-demo totals.",
         func=prep,
         default_trigger=_interval(minutes=15),
     ),
+    JobDefinition(
+        key="demo_scores",
+        name="Demo trending scores",
+        description="Precomputes trending, popularity and category scores into demo_scores.",
+        func=run_demo_scores,
+        default_trigger=_interval(minutes=15),
+    ),
     JobDefinition(
         key="run_preview",
         name="Preview image regeneration",
@@ -107,6 +116,13 @@ JOB_DEFINITIONS: List[JobDefinition] = [
         func=process_submit_notifications,
         default_trigger=_interval(minutes=5),
     ),
+    JobDefinition(
+        key="sitemap_refresh",
+        name="Sitemap shard refresher",
+        description="Rebuilds sitemap shards whose demonstrations or organizations changed.",
+        func=run_sitemap_refresh,
+        default_trigger=_interval(minutes=30),
+    ),
     JobDefinition(
         key="auto_close_cases",
         name="Case autoclose (demos/orgs)",
@@ -2,13 +2,12 @@ import copy
 import ast
 import os
 import re
-import threading
-import time
 import uuid
 import hashlib
+import json
 import requests
 from mielenosoitukset_fi.utils.time_utils import utcnow
-from datetime import datetime, date, timedelta, timezone
+from datetime import date, timedelta, timezone
 from flask_babel import _, format_date
 from flask import (
     Response,
@@ -24,6 +23,7 @@ from flask import (
 )
 from flask_login import current_user, login_required
 from bson.objectid import ObjectId
+from markupsafe import Markup
 from mielenosoitukset_fi.utils.notifications import fetch_notifications, serialize_notification
 from mielenosoitukset_fi.utils.s3 import upload_image_fileobj
 from mielenosoitukset_fi.utils.classes import Organizer, Demonstration, Organization, RecurringDemonstration
@@ -32,21 +32,45 @@ from mielenosoitukset_fi.emailer.EmailSender import EmailSender
 from mielenosoitukset_fi.scripts.send_demo_reminders import generate_ical_event
 from mielenosoitukset_fi.utils.variables import CITY_LIST
 from mielenosoitukset_fi.utils.cities import CITY_KEY_TO_NAME, normalize_city_key
-from mielenosoitukset_fi.utils.city_settings import enabled_city_names
+from mielenosoitukset_fi.utils.city_settings import city_stats, enabled_city_names
 from mielenosoitukset_fi.utils.flashing import flash_message
 from mielenosoitukset_fi.utils.database import DEMO_FILTER
+from mielenosoitukset_fi.utils.demo_scores import top_scores
+from mielenosoitukset_fi.utils.demo_export import (
+    EXPORT_FORMATS,
+    iter_export,
+    iter_tombstones,
+    parse_updated_since,
+    with_updated_since,
+)
+from mielenosoitukset_fi.utils.demo_summary import DemoSummary, summary_projection
+from mielenosoitukset_fi.utils.keyset import approximate_count, decode_cursor, keyset_page
+from mielenosoitukset_fi.utils.lazy_context import lazy_value
 from mielenosoitukset_fi.utils.analytics import log_demo_view
+from mielenosoitukset_fi.utils.admin_tasks import sync_org_suggestion_tasks
+from mielenosoitukset_fi.utils.calendar_data import get_month_buckets, get_year_buckets
+from mielenosoitukset_fi.utils.sitemap import (
+    get_shard as get_sitemap_shard,
+    list_shards as list_sitemap_shards,
+    refresh_sitemaps,
+    render_index as render_sitemap_index,
+    render_shard as render_sitemap_shard,
+)
 from mielenosoitukset_fi.utils.wrappers import permission_required, depracated_endpoint
-from mielenosoitukset_fi.utils.media_helpers import get_demo_cover_image
 from mielenosoitukset_fi.utils.request_ip import get_client_ip
+from mielenosoitukset_fi.utils.runtime_flags import panic_mode
 from mielenosoitukset_fi.a import generate_demo_sentence
 from pymongo.errors import DuplicateKeyError
-from pymongo import ASCENDING, DESCENDING
-from config import Config
+from pymongo import ASCENDING
 
 from mielenosoitukset_fi.utils.cache import (
+    PUBLIC_LIST_TAG,
+    cached_json_response,
+    demo_tags,
     should_skip_cache,
     skip_cache_public_only,
+    tagged_cache_key,
+    tiered_cache,
 )
 from mielenosoitukset_fi.utils import VERSION
 from mielenosoitukset_fi.utils.logger import logger
@@ -66,53 +90,18 @@ email_sender = EmailSender()
 db_manager = DatabaseManager().get_instance()
 mongo = db_manager.get_db()
 demonstrations_collection = mongo["demonstrations"]
-demonstrations_collection.create_index(
-    [
-        ("approved", ASCENDING),
-        ("date", ASCENDING),
-        ("cancelled", ASCENDING),
-        ("hide", ASCENDING),
-        ("rejected", ASCENDING),
-    ],
-    background=True,
-)
 submitters_collection = mongo["submitters"]  # <-- Add this line
 malicious_reports_collection = mongo["malicious_reports"]
 submission_tokens_collection = mongo["demo_submission_tokens"]
-submission_tokens_collection.create_index("token", unique=True, background=True)
-submission_tokens_collection.create_index(
-    [("fingerprint", ASCENDING), ("created_at", DESCENDING)], background=True
-)
 demo_notifications_queue = mongo["demo_notifications_queue"]
-demo_notifications_queue.create_index("status", background=True)
-demo_notifications_queue.create_index("created_at", background=True)
-demo_notifications_queue.create_index(
-    [("demo_id", ASCENDING), ("status", ASCENDING)], background=True
-)
-demo_notifications_queue.create_index("notification_type", background=True)
 submission_errors_collection = mongo["demo_submission_errors"]
-submission_errors_collection.create_index("created_at", background=True)
-submission_errors_collection.create_index("error_code", background=True)
-
-# --- Performance indexes (added for admin & audit query speed) ---
-mongo["demo_audit_logs"].create_index([("demo_id", ASCENDING), ("timestamp", DESCENDING)], background=True)
-mongo["demo_edit_history"].create_index([("demo_id", ASCENDING), ("edited_at", DESCENDING)], background=True)
-mongo["demo_suggestions"].create_index([("demo_id", ASCENDING), ("created_at", DESCENDING)], background=True)
-mongo["admin_logs"].create_index("timestamp", background=True)
-mongo["super_audit_logs"].create_index("timestamp", background=True)
-mongo["magic_links"].create_index("token_hash", unique=True, background=True)
-mongo["magic_links"].create_index("demo_id", background=True)
-mongo["cases"].create_index([("demo_id", ASCENDING), ("created_at", DESCENDING)], background=True)
-mongo["demo_attending"].create_index("demo_id", background=True)
-mongo["demo_invites"].create_index("demo_id", background=True)
-mongo["demo_reminders"].create_index("demonstration_id", background=True)
-mongo["recommended_demos"].create_index("demo_id", unique=True, background=True)
-mongo["posted_events"].create_index([("demo_id", ASCENDING), ("created_at", DESCENDING)], background=True)
-mongo["demonstrations"].create_index("slug", background=True)
-mongo["demonstrations"].create_index("parent", background=True)
-mongo["city_settings"].create_index("city_key", background=True)
-# --- End performance indexes ---
+# Indexes are declared in utils.indexes and applied by run_auto_migrations.
 
+INDEX_FEATURED_LIMIT = 6
+# Writers invalidate the detail fragment through its cache tags; the TTL
+# only bounds how stale the date-dependent similar demos can get.
+DETAIL_CACHE_TIMEOUT = 60 * 60
+API_LIST_CACHE_TIMEOUT = 300
 SUBMISSION_DUPLICATE_WINDOW = timedelta(hours=12)
 SUBMIT_ERROR_CODES = {
     "missing_required": "SUBMIT_MISSING_FIELDS",
@@ -122,7 +111,7 @@ SUBMIT_ERROR_CODES = {
     "duplicate_conflict": "SUBMIT_DUPLICATE_CONFLICT",
 }
 
-PANIC_MODE = False  # Forced maintenance mode for security remediation
+SITEMAP_SHARD_NAME = re.compile(r"^[a-z0-9-]+$")
 
 CITY_INESSIVE_OVERRIDES = {
     "helsinki": "Helsingissä",
@@ -177,10 +166,6 @@ def _city_inessive_phrase(city_name):
     return CITY_INESSIVE_OVERRIDES.get(city_key) or f"kaupungissa {city_name}"
 
 
-def _demo_detail_identifier(demo):
-    return demo.get("slug") or demo.get("running_number") or str(demo.get("_id"))
-
-
 def _today_demo_query(city_name=None):
     query = {**DEMO_FILTER, "date": date.today().isoformat()}
     if city_name:
@@ -214,22 +199,6 @@ def _normalize_route_points(raw_route):
     return [point.strip() for point in re.split(r"[\n,]+", text) if point.strip()]
 
 
-def _load_panic():
-    a = mongo.panic.find_one({"name": "global"})
-    return a.get("panic", False) if a else False
-
-PANIC_MODE = _load_panic()
-
-def refresh_panic(interval=15):  # 180 seconds = 3 minutes
-    global PANIC_MODE
-    while True:
-        PANIC_MODE = _load_panic()
-        time.sleep(interval)
-
-if Config.ENABLE_PANIC_THREAD:
-    threading.Thread(target=refresh_panic, daemon=True).start()
-
-
 def _new_submission_token():
     return uuid.uuid4().hex
 
@@ -386,137 +355,17 @@ def format_demo_for_api(demo):
 
     Parameters
     ----------
-    demo : dict
-        The demonstration document from MongoDB.
+    demo : dict or DemoSummary
+        The demonstration document from MongoDB, or its summary.
 
     Returns
     -------
     dict
         Dictionary with only the fields needed for API rendering.
     """
-    def fmt_time(t):
-        """
-        Format time string to HH:MM.
-
-        Parameters
-        ----------
-        t : str
-
-        Returns
-        -------
-        str
-        """
-        if not t:
-            return ""
-        try:
-            try:
-                return datetime.strptime(t, "%H:%M:%S").strftime("%H:%M")
-            except ValueError:
-                return datetime.strptime(t, "%H:%M").strftime("%H:%M")
-        except Exception:
-            logger.exception(f"Error formatting time: {t}")
-            return t
-        
-    try:
-        date_obj = datetime.strptime(demo.get("date", ""), "%Y-%m-%d")
-        date_display = date_obj.strftime("%d.%m.%Y")
-    except Exception:
-        date_display = demo.get("date", "")
-
-    return {
-        "_id": str(demo.get("_id")),
-        "title": demo.get("title", ""),
-        "date_display": date_display,
-        "start_time_display": fmt_time(demo.get("start_time")),
-        "end_time_display": fmt_time(demo.get("end_time")),
-        "city": demo.get("city", ""),
-        "address": demo.get("address", ""),
-        "tags": demo.get("tags", []),
-        "description": demo.get("description", ""),
-        "cover_image": get_demo_cover_image(demo),
-        "cancelled": bool(demo.get("cancelled")),
-    }
-
-def filter_demonstrations_api(
-    demonstrations, today, search_query, city_query, location_query, date_start, date_end, tag_query=None
-):
-    """
-    Filter the demonstrations for the API based on various criteria.
-
-    Parameters
-    ----------
-    demonstrations : iterable
-        Demonstration documents.
-    today : date
-        Today's date.
-    search_query : str
-        Search term.
-    city_query : str or list
-        City/cities.
-    location_query : str
-        Location.
-    date_start : str
-        Start date (YYYY-MM-DD).
-    date_end : str
-        End date (YYYY-MM-DD).
-    tag_query : str or None
-        Tag to filter by.
-
-    Returns
-    -------
-    list
-        Filtered demonstration dicts.
-    """
-    filtered = []
-    added_demo_ids = set()
-    for demo in demonstrations:
-        # Only approved and not hidden
-        if not demo.get("approved", True) or demo.get("hide", False):
-            continue
-        if demo.get("cancelled"):
-            continue
-        try:
-            demo_date = datetime.strptime(demo["date"], "%Y-%m-%d").date()
-        except Exception:
-            continue
-        if demo_date < today:
-            continue
-        # Search
-        if search_query:
-            if search_query not in demo.get("title", "").lower() and \
-               search_query not in demo.get("address", "").lower():
-                continue
-        # City
-        if city_query:
-            if isinstance(city_query, list):
-                if not any(city in demo.get("city", "").lower() for city in city_query):
-                    continue
-            else:
-                if city_query not in demo.get("city", "").lower():
-                    continue
-        # Location
-        if location_query:
-            if location_query not in demo.get("address", "").lower():
-                continue
-        # Date range
-        if date_start and date_end:
-            try:
-                start_date = datetime.strptime(date_start, "%Y-%m-%d").date()
-                end_date = datetime.strptime(date_end, "%Y-%m-%d").date()
-                if not (start_date <= demo_date <= end_date):
-                    continue
-            except Exception:
-                pass
-        # Tag filter
-        if tag_query:
-            tags = [t.lower() for t in demo.get("tags", [])]
-            if tag_query.lower() not in tags:
-                continue
-        if demo["_id"] not in added_demo_ids:
-            filtered.append(demo)
-            added_demo_ids.add(demo["_id"])
-    return filtered
-
+    if not isinstance(demo, DemoSummary):
+        demo = DemoSummary(demo)
+    return demo.to_api()
 
 def _case_insensitive_contains(value):
     return {"$regex": re.escape(value), "$options": "i"}
@@ -530,6 +379,15 @@ def _case_insensitive_contains_pattern(value):
     return re.compile(re.escape(value), re.IGNORECASE)
 
 
+def _known_city_keys(city_query):
+    """Return city keys when every requested city is a known municipality, else None."""
+    values = city_query if isinstance(city_query, list) else [city_query]
+    keys = [normalize_city_key(value) for value in values]
+    if keys and all(key in CITY_KEY_TO_NAME for key in keys):
+        return keys
+    return None
+
+
 def _build_public_demo_query(
     today,
     search_query="",
@@ -539,6 +397,12 @@ def _build_public_demo_query(
     date_end=None,
     tag_query=None,
 ):
+    """
+    Build the Mongo filter shared by the public demonstration listings.
+
+    Known municipalities are matched by equality on the indexed ``city_key``;
+    free-form city text falls back to a case-insensitive substring match.
+    """
     query = copy.deepcopy(DEMO_FILTER)
     today_iso = today.isoformat()
     date_query = {"$gte": today_iso}
@@ -556,7 +420,10 @@ def _build_public_demo_query(
             {"address": _case_insensitive_contains(search_query)},
         ]
 
-    if city_query:
+    city_keys = _known_city_keys(city_query) if city_query else None
+    if city_keys:
+        query["city_key"] = city_keys[0] if len(city_keys) == 1 else {"$in": city_keys}
+    elif city_query:
         if isinstance(city_query, list):
             query["city"] = {
                 "$in": [_case_insensitive_contains_pattern(city) for city in city_query]
@@ -614,7 +481,8 @@ def get_api_pagination_args():
     Returns
     -------
     dict
-        Contains page, per_page, search, city, location, date_start, date_end, tag.
+        Contains page, per_page, search, city, location, date_start, date_end,
+        tag, cursor (None in page-number mode) and include_total.
     """
     page = int(request.args.get("page", 1))
     per_page = int(request.args.get("per_page", 20) or 20)
@@ -633,6 +501,8 @@ def get_api_pagination_args():
         date_start=date_start,
         date_end=date_end,
         tag_query=tag_query,
+        cursor=request.args.get("cursor") if "cursor" in request.args else None,
+        include_total=request.args.get("include_total", "").lower() == "true",
     )
 
 
@@ -671,15 +541,105 @@ def add_api_routes(app):
         """
         API endpoint for demonstration list.
 
+        Responses are cached as encoded JSON per query string and support
+        ``If-None-Match``.
+
+        Passing ``cursor`` (empty for the first page) switches to keyset
+        pagination: rows are ordered by ``(date, start_time, _id)`` and the
+        response carries ``next_cursor`` instead of ``total_pages``;
+        ``include_total=true`` adds an approximate ``total``.
+
         Returns
         -------
         response : flask.Response
-            JSON with keys: demonstrations, total_pages
+            JSON with keys: demonstrations, total_pages (page mode) or
+            demonstrations, next_cursor[, total] (cursor mode)
         """
         args = get_api_pagination_args()
-        today = date.today()
+        if args["cursor"]:
+            try:
+                decode_cursor(args["cursor"])
+            except ValueError:
+                return jsonify({"status": "ERROR", "message": "Invalid cursor"}), 400
+
+        def _payload():
+            today = date.today()
+            query = _build_public_demo_query(
+                today,
+                args["search_query"],
+                args["city_query"],
+                args["location_query"],
+                args["date_start"],
+                args["date_end"],
+                args.get("tag_query"),
+            )
+            per_page = max(args["per_page"], 1)
+            if args["cursor"] is not None:
+                docs, next_cursor = keyset_page(
+                    demonstrations_collection, query, summary_projection(), args["cursor"], per_page
+                )
+                payload = {
+                    "demonstrations": [DemoSummary(doc).to_api() for doc in docs],
+                    "next_cursor": next_cursor,
+                }
+                if args["include_total"]:
+                    payload["total"] = approximate_count(demonstrations_collection, query)
+                return payload
+
+            page = max(args["page"], 1)
+            total = demonstrations_collection.count_documents(query)
+            total_pages = max((total + per_page - 1) // per_page, 1)
+            demos_cursor = (
+                demonstrations_collection.find(query, summary_projection())
+                .sort([("date", ASCENDING), ("start_time", ASCENDING)])
+                .skip((page - 1) * per_page)
+                .limit(per_page)
+            )
+            result = [DemoSummary(demo).to_api() for demo in demos_cursor]
+            return {"demonstrations": result, "total_pages": total_pages}
+
+        if should_skip_cache(public_only=False):
+            return jsonify(_payload())
+        params = json.dumps(sorted(request.args.items(multi=True)))
+        cache_key = tagged_cache_key(
+            f"api_v1_demonstrations:{date.today().isoformat()}:"
+            + hashlib.md5(params.encode("utf-8")).hexdigest(),
+            [PUBLIC_LIST_TAG],
+        )
+        return cached_json_response(cache_key, _payload, API_LIST_CACHE_TIMEOUT)
+
+    @app.route("/api/v1/demonstrations/export", methods=["GET"])
+    def api_demonstrations_export():
+        """
+        Stream every matching demonstration as NDJSON or CSV.
+
+        Takes the filters of :func:`api_demonstrations` plus ``format``
+        (``ndjson`` or ``csv``), ``updated_since`` (ISO 8601, compared with
+        ``last_modified``; adds tombstone rows for demonstrations that left
+        the set) and ``in_past=true`` to include past events. Rows
+        come from one MongoDB cursor and are written as they are read, so
+        memory use does not grow with the export.
+
+        Returns
+        -------
+        response : flask.Response
+            Streamed ``application/x-ndjson`` or ``text/csv`` attachment, or a
+            JSON error with status 400.
+        """
+        fmt = request.args.get("format", "ndjson").lower()
+        if fmt not in EXPORT_FORMATS:
+            return jsonify({"status": "ERROR", "message": "Unsupported format"}), 400
+        updated_since = None
+        if request.args.get("updated_since"):
+            try:
+                updated_since = parse_updated_since(request.args["updated_since"])
+            except ValueError:
+                return jsonify({"status": "ERROR", "message": "Invalid updated_since"}), 400
+
+        args = get_api_pagination_args()
+        in_past = request.args.get("in_past", "").lower() == "true"
         query = _build_public_demo_query(
-            today,
+            date.min if in_past else date.today(),
             args["search_query"],
             args["city_query"],
             args["location_query"],
@@ -687,18 +647,16 @@ def add_api_routes(app):
             args["date_end"],
             args.get("tag_query"),
         )
-        page = max(args["page"], 1)
-        per_page = max(args["per_page"], 1)
-        total = demonstrations_collection.count_documents(query)
-        total_pages = max((total + per_page - 1) // per_page, 1)
-        demos_cursor = (
-            demonstrations_collection.find(query)
-            .sort("date", ASCENDING)
-            .skip((page - 1) * per_page)
-            .limit(per_page)
+        tombstones = iter_tombstones(mongo, query, updated_since) if updated_since else ()
+        query = with_updated_since(query, updated_since)
+
+        response = Response(
+            iter_export(demonstrations_collection, query, fmt, tombstones=tombstones),
+            mimetype=EXPORT_FORMATS[fmt],
         )
-        result = [format_demo_for_api(demo) for demo in demos_cursor]
-        return jsonify(demonstrations=result, total_pages=total_pages)
+        response.headers["Content-Disposition"] = f"attachment; filename=demonstrations.{fmt}"
+        response.headers["Cache-Control"] = "no-store"
+        return response
 
     @app.route("/api/v1/check_demo_conflict", methods=["GET"])
     def api_check_demo_conflict():
@@ -897,281 +855,92 @@ def init_routes(app):
         api_dir = os.path.join(os.path.dirname(__file__), "api")
         return send_from_directory(api_dir, "api.yaml", mimetype="application/yaml")
 
-        
-    import xml.etree.ElementTree as ET
+
+    _SITEMAP_CACHE_TIMEOUT = 60 * 60
+
+    def _sitemap_response(kind, etag, last_modified, render):
+        """
+        Return sitemap XML with ETag/Last-Modified, rendering only on a miss.
+
+        Conditional requests short-circuit to 304 before anything is rendered;
+        rendered bytes are cached per host and content digest.
+        """
+        base_url = request.url_root.rstrip("/")
+        etag = f"{etag}-{hashlib.sha1(base_url.encode('utf-8')).hexdigest()[:8]}"
+        if last_modified is not None:
+            last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+
+        resp = Response(mimetype="application/xml")
+        resp.headers["Content-Type"] = "application/xml; charset=utf-8"
+        resp.set_etag(etag)
+        resp.last_modified = last_modified
+        resp.cache_control.public = True
+        resp.cache_control.max_age = 3600
+
+        not_modified = etag in request.if_none_match or (
+            last_modified is not None
+            and not request.if_none_match
+            and request.if_modified_since is not None
+            and request.if_modified_since >= last_modified
+        )
+        if not_modified:
+            resp.status_code = 304
+            return resp
+
+        cache_key = f"sitemap:v1:{kind}:{etag}"
+        xml_bytes = cache.get(cache_key)
+        if xml_bytes is None:
+            xml_bytes = render(base_url)
+            cache.set(cache_key, xml_bytes, timeout=_SITEMAP_CACHE_TIMEOUT)
+        resp.set_data(xml_bytes)
+        return resp
 
     @app.route("/sitemap.xml", methods=["GET"])
     def sitemap():
         """
-        Generate sitemap XML including hreflang alternate links.
+        Serve the sitemap index pointing at the precomputed shards.
 
-        Notes
-        -----
-        Default language is Finnish. If only Finnish is enabled in
-        BABEL_SUPPORTED_LOCALES, no alternate hreflang links are emitted.
-
-        Returns
-        -------
-        flask.Response
-            XML sitemap response (application/xml) or 500 on error.
+        Shards are maintained by the ``sitemap_refresh`` background job (see
+        `utils.sitemap`); they are built synchronously only when none exist yet.
         """
         try:
-            # Supported locales (fallback to Finnish)
-            locales = app.config.get("BABEL_SUPPORTED_LOCALES") or ["fi"]
-            locales = [l for l in locales if l]  # normalize
-
-            # If only Finnish is available, do not include alternate links
-            include_alternates = not (
-                len(locales) == 1 and locales[0].lower().startswith("fi")
+            shards = list_sitemap_shards(mongo)
+            if not shards:
+                refresh_sitemaps(mongo)
+                shards = list_sitemap_shards(mongo)
+            etag = hashlib.sha1(
+                "|".join(f"{shard['_id']}:{shard.get('digest')}" for shard in shards).encode("utf-8")
+            ).hexdigest()
+            last_modified = max(
+                (shard["last_modified"] for shard in shards if shard.get("last_modified")),
+                default=None,
+            )
+            return _sitemap_response(
+                "index",
+                etag,
+                last_modified,
+                lambda base_url: render_sitemap_index(
+                    shards, base_url, lambda name: url_for("sitemap_shard", name=name)
+                ),
             )
-
-            # Use the official sitemap namespace and the xhtml namespace for alternate links
-            ns_attribs = {
-                "xmlns": "http://www.sitemaps.org/schemas/sitemap/0.9",
-                "xmlns:xhtml": "http://www.w3.org/1999/xhtml",
-            }
-            urlset = ET.Element("urlset", ns_attribs)
-
-            # Static endpoints to include
-            static_routes = [
-                {"loc": "index"},
-                {"loc": "submit"},
-                {"loc": "demonstrations"},
-                {"loc": "today_demos"},
-                {"loc": "cities"},
-                {"loc": "calendar_month_view"},
-                {"loc": "calendar_year_view", "values": {"year": date.today().year}},
-                {"loc": "public_guides"},
-                {"loc": "info"},
-                {"loc": "terms"},
-                {"loc": "privacy"},
-                {"loc": "contact"},
-                {"loc": "api_docs"},
-                {"loc": "pride_nakyvaksi"},
-                {"loc": "campaign.index"},
-            ]
-
-            # Helper to add url + optional alternate links
-            def _add_url_with_alternates(parent, endpoint, lastmod=None, **values):
-                url_el = ET.SubElement(parent, "url")
-                loc_el = ET.SubElement(url_el, "loc")
-                loc_el.text = url_for(endpoint, _external=True, **values)
-                if lastmod:
-                    ET.SubElement(url_el, "lastmod").text = lastmod
-                if include_alternates:
-                    for lang in locales:
-                        ET.SubElement(
-                            url_el,
-                            "{http://www.w3.org/1999/xhtml}link",
-                            {
-                                "rel": "alternate",
-                                "hreflang": lang,
-                                "href": url_for(
-                                    endpoint, lang_code=lang, _external=True, **values
-                                ),
-                            },
-                        )
-
-            # Add static routes
-            for r in static_routes:
-                _add_url_with_alternates(urlset, r["loc"], **r.get("values", {}))
-
-            # Demonstration URLs: limit to demos in reasonable date window
-            query_filter = DEMO_FILTER.copy()
-            start_date = (date.today() - timedelta(days=365)).strftime("%Y-%m-%d")
-            end_date = (date.today() + timedelta(days=365 * 2)).strftime("%Y-%m-%d")
-            query_filter["date"] = {"$gte": start_date, "$lte": end_date}
-
-            def _format_lastmod_for_doc(doc):
-                """
-                Determine a suitable lastmod value for a Mongo-style document.
-
-                The function prefers explicit timestamp fields (updated_at, modified_at, ...)
-                and falls back to the document date field. When an explicit timestamp is found
-                it is normalized to a date string in "YYYY-MM-DD" form. If only a date
-                string is available, it is returned as-is. Returns None if no sensible
-                value is found.
-
-                Parameters
-                ----------
-                doc : dict
-                    Mongo-style document.
-
-                Returns
-                -------
-                str or None
-                    ISO date string "YYYY-MM-DD" or original date-like string, or None.
-                """
-                candidates = (
-                    "updated_at",
-                    "modified_at",
-                    "last_modified",
-                    "lastmod",
-                    "updated",
-                    "modified",
-                )
-
-                def _to_date_str(v):
-                    """Try to produce a YYYY-MM-DD string from v, or return None."""
-                    if v is None:
-                        return None
-                    # datetime instance -> date string
-                    try:
-                        if isinstance(v, datetime):
-                            return v.date().isoformat()
-                    except Exception:
-                        pass
-                    # date instance -> isoformat
-                    try:
-                        if isinstance(v, date):
-                            return v.isoformat()
-                    except Exception:
-                        pass
-                    # string -> try parsing ISO/datetime/date formats
-                    if isinstance(v, str):
-                        s = v.strip()
-                        if not s:
-                            return None
-                        # Handle common trailing Z timezone
-                        try:
-                            iso_s = s.replace("Z", "+00:00") if s.endswith("Z") else s
-                            dt = datetime.fromisoformat(iso_s)
-                            return dt.date().isoformat()
-                        except Exception:
-                            pass
-                        # Try date-only format
-                        try:
-                            dt = datetime.strptime(s, "%Y-%m-%d")
-                            return dt.date().isoformat()
-                        except Exception:
-                            pass
-                        # Try datetime without timezone but with T
-                        for fmt in ("%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S"):
-                            try:
-                                dt = datetime.strptime(s, fmt)
-                                return dt.date().isoformat()
-                            except Exception:
-                                continue
-                        # As a last resort return the original string (fallback consumer may handle)
-                        return s
-                    return None
-
-                # Prefer explicit timestamp-like fields and always normalize to YYYY-MM-DD when possible
-                for key in candidates:
-                    v = doc.get(key)
-                    if not v:
-                        continue
-                    date_str = _to_date_str(v)
-                    if date_str:
-                        return date_str
-
-                # Fallback to doc['date']
-                v = doc.get("date")
-                if v:
-                    date_str = _to_date_str(v)
-                    if date_str:
-                        return date_str
-                    # if it's something else, return as-is
-                    if isinstance(v, str) and v.strip():
-                        return v
-                return None
-
-            demo_city_keys = set()
-            for row in demonstrations_collection.aggregate(
-                [
-                    {"$match": {**DEMO_FILTER, "city": {"$exists": True, "$ne": ""}}},
-                    {"$group": {"_id": {"city_key": "$city_key", "city": "$city"}}},
-                ]
-            ):
-                raw = row.get("_id") or {}
-                city_key = raw.get("city_key") or normalize_city_key(raw.get("city"))
-                if city_key in CITY_KEY_TO_NAME:
-                    demo_city_keys.add(city_key)
-
-            enabled_city_keys_for_sitemap = {
-                normalize_city_key(city)
-                for city in enabled_city_names(mongo)
-                if normalize_city_key(city) in CITY_KEY_TO_NAME
-            }
-            for city_key in sorted(
-                enabled_city_keys_for_sitemap | demo_city_keys,
-                key=lambda key: CITY_KEY_TO_NAME[key],
-            ):
-                _add_url_with_alternates(
-                    urlset,
-                    "city_demos",
-                    city=CITY_KEY_TO_NAME[city_key].lower(),
-                )
-                _add_url_with_alternates(
-                    urlset,
-                    "today_city_demos",
-                    city=CITY_KEY_TO_NAME[city_key].lower(),
-                )
-
-            for org_doc in mongo.organizations.find({}).sort("name", 1):
-                _add_url_with_alternates(
-                    urlset,
-                    "org",
-                    lastmod=_format_lastmod_for_doc(org_doc),
-                    org_id=str(org_doc["_id"]),
-                )
-
-            tag_pipeline = [
-                {"$match": DEMO_FILTER},
-                {"$unwind": "$tags"},
-                {"$match": {"tags": {"$type": "string", "$ne": ""}}},
-                {"$group": {"_id": "$tags"}},
-                {"$sort": {"_id": 1}},
-            ]
-            for row in demonstrations_collection.aggregate(tag_pipeline):
-                tag_name = str(row.get("_id") or "").strip().lstrip("#")
-                if tag_name:
-                    _add_url_with_alternates(urlset, "tag_detail", tag_name=tag_name)
-
-            for demo in demonstrations_collection.find(query_filter):
-                demo_identifier = (
-                    demo.get("slug")
-                    or demo.get("running_number")
-                    or str(demo.get("_id"))
-                )
-                url_el = ET.SubElement(urlset, "url")
-                loc_el = ET.SubElement(url_el, "loc")
-                loc_el.text = url_for(
-                    "demonstration_detail", demo_id=demo_identifier, _external=True
-                )
-
-                # lastmod for the demonstration if available
-                lastmod_val = _format_lastmod_for_doc(demo)
-                if lastmod_val:
-                    ET.SubElement(url_el, "lastmod").text = lastmod_val
-
-                if include_alternates:
-                    for lang in locales:
-                        ET.SubElement(
-                            url_el,
-                            "{http://www.w3.org/1999/xhtml}link",
-                            {
-                                "rel": "alternate",
-                                "hreflang": lang,
-                                "href": url_for(
-                                    "demonstration_detail",
-                                    demo_id=demo_identifier,
-                                    lang_code=lang,
-                                    _external=True,
-                                ),
-                            },
-                        )
-
-            xml_bytes = ET.tostring(urlset, encoding="utf-8", xml_declaration=True)
-            resp = Response(xml_bytes, mimetype="application/xml")
-            resp.headers["Content-Type"] = "application/xml; charset=utf-8"
-            return resp
-
         except Exception:
-            app.logger.exception("Error generating sitemap")
+            app.logger.exception("Error generating sitemap index")
             return Response(status=500)
 
-
+    @app.route("/sitemaps/<name>.xml", methods=["GET"])
+    def sitemap_shard(name):
+        """Serve one precomputed sitemap shard as a ``<urlset>``."""
+        if not SITEMAP_SHARD_NAME.match(name):
+            abort(404)
+        shard = get_sitemap_shard(mongo, name)
+        if not shard:
+            abort(404)
+        return _sitemap_response(
+            f"shard:{name}",
+            shard.get("digest") or "",
+            shard.get("last_modified"),
+            lambda base_url: render_sitemap_shard(shard, base_url),
+        )
 
 
     @app.context_processor
@@ -1191,11 +960,7 @@ def init_routes(app):
     _city_names_cache = {"names": None, "timestamp": 0}
     _CITY_NAMES_CACHE_TTL = 60  # seconds
 
-    @app.context_processor
-    def inject_city_list():
-        """
-        Inject the city list into the template context.
-        """
+    def _enabled_city_names():
         import time as _time
         now = _time.monotonic()
         cached_names = _city_names_cache["names"]
@@ -1203,7 +968,20 @@ def init_routes(app):
             cached_names = enabled_city_names(mongo)
             _city_names_cache["names"] = cached_names
             _city_names_cache["timestamp"] = now
-        return dict(city_list=CITY_LIST, enabled_city_list=cached_names)
+        return cached_names
+
+    @app.context_processor
+    def inject_city_list():
+        """
+        Inject the city list into the template context.
+
+        ``enabled_city_list`` is lazy: ``city_settings`` is only read when a
+        template uses it.
+        """
+        return dict(
+            city_list=CITY_LIST,
+            enabled_city_list=lazy_value("enabled_city_list", _enabled_city_names),
+        )
 
     @app.context_processor
     def inject_app_version():
@@ -1222,60 +1000,79 @@ def init_routes(app):
         today = date.today()
 
         # --- Recommended demos (cached) ---
-        cache_key = "recommended_demos_v1"
-        recommended_demos = None
-
-        if hasattr(cache, "get") and callable(cache.get):
-            recommended_demos = cache.get(cache_key)
-
-        if recommended_demos is None:
+        def _load_recommended_demos():
             # Get recommended demo_ids from the recommended_demos collection
             recs = list(mongo.recommended_demos.find({}))
             demo_ids = [ObjectId(rec["demo_id"]) for rec in recs if "demo_id" in rec]
 
             # Fetch demos, filter for approved and not hidden
-            demos = list(
-                mongo.demonstrations.find({
-                    "_id": {"$in": demo_ids},
-                    "approved": True,
-                    "hide": {"$ne": True},
-                    "cancelled": {"$ne": True},
-                })
+            demos = DemoSummary.from_cursor(
+                mongo.demonstrations.find(
+                    {
+                        "_id": {"$in": demo_ids},
+                        "approved": True,
+                        "hide": {"$ne": True},
+                        "cancelled": {"$ne": True},
+                    },
+                    summary_projection(),
+                )
             )
 
             # Sort by recommend_till (or fallback to date)
+            recommend_till = {str(rec["demo_id"]): rec.get("recommend_till") for rec in recs}
+
             def get_recommend_till(d):
-                rec = next((r for r in recs if str(r["demo_id"]) == str(d["_id"])), None)
-                return rec["recommend_till"] if rec else d.get("date", "9999-12-31")
+                return recommend_till.get(str(d._id)) or d.date or "9999-12-31"
 
             demos.sort(key=get_recommend_till)
 
             # Remove past demos
-            demos = [
+            return [
                 d for d in demos
-                if datetime.strptime(d["date"], "%Y-%m-%d").date() >= today
+                if datetime.strptime(d.date, "%Y-%m-%d").date() >= today
             ]
 
-            recommended_demos = demos
-
-            if hasattr(cache, "set") and callable(cache.set):
-                cache.set(cache_key, recommended_demos, timeout=60 * 10)  # Cache 10 min
+        recommended_demos = tiered_cache.get_or_set(
+            tagged_cache_key("recommended_demos_v2", [PUBLIC_LIST_TAG]),
+            _load_recommended_demos,
+            60 * 10,
+        )
 
-        # --- Featured / other demos ---
-        filtered_demonstrations = list(
-            demonstrations_collection.find(
-                _build_public_demo_query(today),
+        # --- Featured / other demos: best scored upcoming first, then by date ---
+        public_query = _build_public_demo_query(today)
+        scored_ids = [
+            doc["demo_id"]
+            for doc in top_scores(
+                mongo,
+                INDEX_FEATURED_LIMIT,
+                query={"date": {"$gte": today.isoformat()}},
+                compute_if_empty=False,
+            )
+        ]
+        scored = {
+            demo._id: demo
+            for demo in DemoSummary.from_cursor(
+                demonstrations_collection.find(
+                    {**public_query, "_id": {"$in": scored_ids}}, summary_projection()
+                )
+            )
+        }
+        filtered_demonstrations = [scored[demo_id] for demo_id in scored_ids if demo_id in scored]
+        if len(filtered_demonstrations) < INDEX_FEATURED_LIMIT:
+            filtered_demonstrations += DemoSummary.from_cursor(
+                demonstrations_collection.find(
+                    {**public_query, "_id": {"$nin": list(scored)}}, summary_projection()
+                )
+                .sort("date", ASCENDING)
+                .limit(INDEX_FEATURED_LIMIT - len(filtered_demonstrations))
             )
-            .sort("date", ASCENDING)
-            .limit(6)
-        )
 
         return render_template(
             "index.html",
             demonstrations=filtered_demonstrations,
             recommended_demos=recommended_demos,
-            featured_demos_json=[format_demo_for_api(demo) for demo in filtered_demonstrations[:6]],
-            recommended_demos_json=[format_demo_for_api(demo) for demo in (recommended_demos or [])],
+            featured_demos_json=[demo.to_api() for demo in filtered_demonstrations[:6]],
+            recommended_demos_json=[demo.to_api() for demo in (recommended_demos or [])],
         )
 
 
@@ -1946,45 +1743,10 @@ def init_routes(app):
         """
         Render a public city index from enabled cities and cities with demonstrations.
         """
-        demo_city_keys = set()
-        for row in demonstrations_collection.aggregate(
-            [
-                {"$match": {**DEMO_FILTER, "city": {"$exists": True, "$ne": ""}}},
-                {"$group": {"_id": {"city_key": "$city_key", "city": "$city"}}},
-            ]
-        ):
-            raw = row.get("_id") or {}
-            city_key = raw.get("city_key") or normalize_city_key(raw.get("city"))
-            if city_key in CITY_KEY_TO_NAME:
-                demo_city_keys.add(city_key)
-
-        enabled_keys = {
-            normalize_city_key(name)
-            for name in enabled_city_names(mongo)
-            if normalize_city_key(name) in CITY_KEY_TO_NAME
-        }
-        city_rows = []
-        for city_key in sorted(enabled_keys | demo_city_keys, key=lambda key: CITY_KEY_TO_NAME[key]):
-            city_name = CITY_KEY_TO_NAME[city_key]
-            demo_count = demonstrations_collection.count_documents(
-                {
-                    **DEMO_FILTER,
-                    "$or": [
-                        {"city_key": city_key},
-                        {"city": {"$regex": f"^{re.escape(city_name)}$", "$options": "i"}},
-                    ],
-                }
-            )
-            today_count = demonstrations_collection.count_documents(_today_demo_query(city_name))
-            city_rows.append(
-                {
-                    "key": city_key,
-                    "name": city_name,
-                    "phrase": _city_inessive_phrase(city_name),
-                    "demo_count": demo_count,
-                    "today_count": today_count,
-                }
-            )
+        city_rows = [
+            {**row, "phrase": _city_inessive_phrase(row["name"])}
+            for row in city_stats(mongo)
+        ]
 
         return render_template("cities.html", cities=city_rows)
 
@@ -1994,9 +1756,9 @@ def init_routes(app):
             abort(404)
 
         query = _today_demo_query(city_name)
-        demos = list(demonstrations_collection.find(query).sort("start_time", ASCENDING))
-        for demo in demos:
-            demo["detail_identifier"] = _demo_detail_identifier(demo)
+        demos = DemoSummary.from_cursor(
+            demonstrations_collection.find(query, summary_projection()).sort("start_time", ASCENDING)
+        )
 
         today_value = date.today()
         if city_name:
@@ -2032,127 +1794,16 @@ def init_routes(app):
         return _render_today_demonstrations(city=city)
 
 
-    @app.route("/city/<city>") # TODO: lets make this use the api too
+    @app.route("/city/<city>")
     def city_demos(city):
         """
-        List all upcoming approved demonstrations, optionally filtered by search query.
-        """
-        page = int(request.args.get("page", 1))
-        per_page = int(request.args.get("per_page", 10) or 10)
-        search_query = request.args.get("search", "").lower()
-        city_query = city
-        location_query = request.args.get("location", "").lower()
-        date_query = request.args.get("date", "")
-        today = date.today()
-        demonstrations = demonstrations_collection.find(DEMO_FILTER)
-        filtered_demonstrations = filter_demonstrations(
-            demonstrations, today, search_query, city_query, location_query, date_query
-        )
-        filtered_demonstrations.sort(
-            key=lambda x: datetime.strptime(x["date"], "%Y-%m-%d").date()
-        )
-        total_demos = len(filtered_demonstrations)
-        total_pages = (total_demos + per_page - 1) // per_page
-        start = (page - 1) * per_page
-        end = start + per_page
-        paginated_demonstrations = filtered_demonstrations[start:end]
-        return render_template(
-            "city.html",
-            demonstrations=paginated_demonstrations,
-            page=page,
-            total_pages=total_pages,
-            city_name=city.capitalize(),
-        )
-        
-        
-
-    def filter_demonstrations(
-        demonstrations, today, search_query, city_query, location_query, date_query
-    ):
-        """
-        Filter the demonstrations based on various criteria.
-        """
-        filtered = []
-        added_demo_ids = set()
-        for demo in demonstrations:
-            if demo.get("cancelled"):
-                continue
-            if is_future_demo(demo, today):
-                if (
-                    matches_filters(
-                        demo, search_query, city_query, location_query, date_query
-                    )
-                    and demo["_id"] not in added_demo_ids
-                ):
-                    filtered.append(demo)
-                    added_demo_ids.add(demo["_id"])
-        return filtered
+        Render the page of one city.
 
-    def is_future_demo(demo, today):
-        """
-        Check if the demonstration is in the future.
+        The page loads its demonstrations from ``/api/v1/demonstrations``
+        with the city locked, so the route itself runs no queries.
         """
-        demo_date = datetime.strptime(demo["date"], "%Y-%m-%d").date()
-        return demo_date >= today
+        return render_template("city.html", city_name=city.capitalize())
 
-    def matches_filters(demo, search_query, city_query, location_query, date_query):
-        """
-        Check if the demonstration matches the filtering criteria.
-        
-        Parameters
-        ----------
-        demo : dict
-            The demonstration document
-        search_query : str
-            Search term to filter by title and address
-        city_query : str or list
-            City or cities to filter by
-        location_query : str
-            Location to filter by address
-        date_query : str
-            Date range query in format 'YYYY-MM-DD,YYYY-MM-DD' or single date 'YYYY-MM-DD'
-            
-        Returns
-        -------
-        bool
-            True if demo matches all filters, False otherwise
-        """
-        matches_search = (
-            search_query in demo["title"].lower()
-            or search_query in demo["address"].lower()
-        )
-        
-        matches_city = (
-            any(city in demo["city"].lower() for city in city_query)
-            if isinstance(city_query, list)
-            else city_query in demo["city"].lower()
-        ) if city_query else True
-        
-        matches_location = (
-            location_query in demo["address"].lower() if location_query else True
-        )
-
-        matches_date = True
-        try:
-            # Handle date range
-            if request.args and request.args.get("date_start") and request.args.get("date_end"):
-                start_date_str = request.args.get("date_start")
-                end_date_str = request.args.get("date_end")
-                try:
-                    start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
-                    end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
-                    demo_date = datetime.strptime(demo["date"], "%Y-%m-%d").date()
-                    matches_date = start_date <= demo_date <= end_date
-                except ValueError:
-                    matches_date = True
-    
-        except ValueError:
-            flash_message(
-                _("Virheellinen päivämäärän muoto. Ole hyvä ja käytä muotoa vvvv-kk-pp.")
-            )
-            matches_date = False
-
-        return matches_search and matches_city and matches_location and matches_date
     from flask import make_response
 
     def _force_reload():
@@ -2161,69 +1812,8 @@ def init_routes(app):
             return True
         return False
 
-    @app.route("/demonstration/<demo_id>")
-    def demonstration_detail(demo_id):
-        """
-        Display demonstration detail with a cached HTML response and a reliable X-Cache header.
-
-        The view uses the app cache manually so we can detect cache hits and set the
-        X-Cache response header accordingly. Caching is bypassed when:
-        - there is a query string (incl. ?force_reload=1)
-        - the requester is authenticated
-        - flash messages are pending for the session/request
-        """
-        # Load demonstration and permission checks first (so we don't serve cached 401/404)
-        try:
-            demo_obj = Demonstration.load_by_id(demo_id)
-        except ValueError:
-            abort(404)
-        if not demo_obj:
-            abort(404)
-
-        if (not demo_obj.approved and not current_user.has_permission("VIEW_DEMO")) or \
-            (demo_obj.hide and not current_user.has_permission("VIEW_DEMO")):
-            abort(401)
-
-        # Determine whether to bypass cache
-        bypass_cache = bool(request.query_string) or should_skip_cache(public_only=False)
-
-        # Build a cache key that is stable for public users; include locale so localized pages differ
-        locale = session.get("locale", "")
-        viewer_segment = "anon"
-        if current_user.is_authenticated:
-            try:
-                viewer_segment = f"user={current_user.get_id() or 'anon'}"
-            except Exception:
-                viewer_segment = "user=unknown"
-        cache_key = f"demonstration_detail:v1:{demo_id}:locale={locale}:viewer={viewer_segment}"
-
-        # Try to serve from cache if allowed
-        if not bypass_cache and hasattr(cache, "get"):
-            cached = cache.get(cache_key)
-            if cached:
-                resp = Response(cached["data"], status=cached.get("status", 200), mimetype=cached.get("mimetype"))
-                # restore headers (skip over Content-Length to allow Flask to recalc)
-                for k, v in cached.get("headers", []):
-                    if k.lower() == "content-length":
-                        continue
-                    resp.headers[k] = v
-                resp.headers["X-Cache"] = "HIT (cached)"
-                return resp
-
-        # Not cached (or bypassed) — ensure we have coordinates if needed
-        if not demo_obj.longitude:
-            try:
-                fetch_geocode_data(demo_obj)
-            except Exception:
-                logger.exception("Error fetching geocode for demo %s", demo_id)
-
-        # Prepare response
-        _demo = copy.copy(demo_obj)
-        demo = Demonstration.to_dict(demo_obj, True)
-
-        toistuvuus = ""
-        if _demo.recurs:
-            toistuvuus = generate_demo_sentence(demo)
+    def _similar_demos(demo_obj, demo):
+        """Return up to four upcoming public demos sharing the city or a tag."""
 
         def _format_suggestion_date(raw_value):
             date_obj = None
@@ -2243,187 +1833,182 @@ def init_routes(app):
             except Exception:
                 return date_obj.strftime("%d.%m.%Y")
 
-        user_follow_orgs = _get_followed_org_ids()
-        user_follow_recurring = _get_followed_recurring_ids()
+        base_query = {
+            "_id": {"$ne": demo_obj._id},
+            "approved": True,
+            "hide": {"$ne": True},
+            "cancelled": {"$ne": True},
+            "date": {"$gte": demo_obj.date or date.today().strftime("%Y-%m-%d")},
+        }
+        or_conditions = []
+        if demo_obj.city:
+            or_conditions.append({"city": demo_obj.city})
+        tag_list = [tag for tag in (demo.get("tags") or []) if isinstance(tag, str)]
+        if tag_list:
+            or_conditions.append({"tags": {"$in": tag_list}})
+        if or_conditions:
+            base_query["$or"] = or_conditions
+        cursor = (
+            mongo.demonstrations.find(
+                base_query,
+                {
+                    "_id": 1,
+                    "title": 1,
+                    "city": 1,
+                    "date": 1,
+                    "formatted_date": 1,
+                    "start_time": 1,
+                    "address": 1,
+                    "slug": 1,
+                },
+            )
+            .sort("date", ASCENDING)
+            .limit(4)
+        )
+        return [
+            {
+                "id": _stringify_id(doc.get("_id")),
+                "title": doc.get("title"),
+                "city": doc.get("city"),
+                "date": doc.get("date"),
+                "formatted_date": doc.get("formatted_date") or _format_suggestion_date(doc.get("date")),
+                "start_time": doc.get("start_time"),
+                "address": doc.get("address"),
+                "slug": doc.get("slug"),
+            }
+            for doc in cursor
+        ]
+
+    def _render_detail_fragment(demo_obj):
+        """
+        Render the viewer-independent body of the detail page.
+
+        Returns
+        -------
+        dict
+            ``demo`` (the dict the page head is rendered from) and ``content``
+            (the HTML of ``demo_views/_detail_content.html``).
+        """
+        if not demo_obj.longitude:
+            try:
+                fetch_geocode_data(demo_obj)
+            except Exception:
+                logger.exception("Error fetching geocode for demo %s", demo_obj._id)
+
+        demo = Demonstration.to_dict(demo_obj, True)
+        toistuvuus = generate_demo_sentence(demo) if demo_obj.recurs else ""
 
-        organizer_follow_map = {}
         for org in demo.get("organizers") or []:
-            org_identifier = org.get("organization_id") or org.get("_id")
-            org_id_str = _stringify_id(org_identifier)
+            org_id_str = _stringify_id(org.get("organization_id") or org.get("_id"))
             if org_id_str:
-                organizer_follow_map[org_id_str] = org_id_str in user_follow_orgs
                 org["organization_id_str"] = org_id_str
 
-        recurring_target_id = None
-        #if demo.get("recurs"):
-        #    recurring_target_id = _stringify_id(demo_obj._id)
-        if demo.get("parent"):
-            recurring_target_id = _stringify_id(demo.get("parent"))
-        recurring_following = bool(recurring_target_id and recurring_target_id in user_follow_recurring)
-
-        similar_demos = []
-        seen_similar_ids = {str(demo_obj._id)}
-        seen_similar_objectids = set()
-        initial_oid = _safe_objectid(demo_obj._id)
-        if initial_oid:
-            seen_similar_objectids.add(initial_oid)
-
-        def _append_similar(doc):
-            raw_id = doc.get("_id")
-            sid = _stringify_id(raw_id)
-            if not sid or sid in seen_similar_ids:
-                return
-            seen_similar_ids.add(sid)
-            if isinstance(raw_id, ObjectId):
-                seen_similar_objectids.add(raw_id)
-            formatted_date = _format_suggestion_date(doc.get("date"))
-            similar_demos.append(
-                {
-                    "id": sid,
-                    "title": doc.get("title"),
-                    "city": doc.get("city"),
-                    "date": doc.get("date"),
-                    "formatted_date": formatted_date,
-                    "start_time": doc.get("start_time"),
-                    "address": doc.get("address"),
-                    "slug": doc.get("slug"),
-                }
-            )
-
         try:
-            today_str = date.today().strftime("%Y-%m-%d")
-            base_query = {
-                "_id": {"$ne": demo_obj._id},
-                "approved": True,
-                "hide": {"$ne": True},
-                "cancelled": {"$ne": True},
-                "date": {"$gte": demo_obj.date or today_str},
-            }
-            or_conditions = []
-            if demo_obj.city:
-                or_conditions.append({"city": demo_obj.city})
-            tag_list = [tag for tag in (demo.get("tags") or []) if isinstance(tag, str)]
-            if tag_list:
-                or_conditions.append({"tags": {"$in": tag_list}})
-            if or_conditions:
-                base_query["$or"] = or_conditions
-            cursor = (
-                mongo.demonstrations.find(
-                    base_query,
-                    {
-                        "_id": 1,
-                        "title": 1,
-                        "city": 1,
-                        "date": 1,
-                        "start_time": 1,
-                        "address": 1,
-                        "slug": 1,
-                    },
-                )
-                .sort("date", ASCENDING)
-                .limit(6)
-            )
-            for doc in cursor:
-                if len(similar_demos) >= 4:
-                    break
-                _append_similar(doc)
-
-            if len(similar_demos) < 4 and user_follow_orgs:
-                org_filter_values = []
-                for oid in user_follow_orgs:
-                    org_filter_values.append(oid)
-                    converted = _safe_objectid(oid)
-                    if converted:
-                        org_filter_values.append(converted)
-                org_query = {
-                    "_id": {"$nin": list(seen_similar_objectids)},
-                    "approved": True,
-                    "hide": {"$ne": True},
-                    "cancelled": {"$ne": True},
-                    "date": {"$gte": today_str},
-                    "organizers.organization_id": {"$in": org_filter_values},
-                }
-                org_cursor = (
-                    mongo.demonstrations.find(
-                        org_query,
-                        {"_id": 1, "title": 1, "city": 1, "date": 1, "start_time": 1, "address": 1, "slug": 1},
-                    )
-                    .sort("date", ASCENDING)
-                    .limit(6)
-                )
-                for doc in org_cursor:
-                    if len(similar_demos) >= 4:
-                        break
-                    _append_similar(doc)
-
-            if len(similar_demos) < 4 and user_follow_recurring:
-                rec_filter_values = []
-                for rid in user_follow_recurring:
-                    rec_filter_values.append(rid)
-                    converted = _safe_objectid(rid)
-                    if converted:
-                        rec_filter_values.append(converted)
-                rec_query = {
-                    "_id": {"$nin": list(seen_similar_objectids)},
-                    "approved": True,
-                    "hide": {"$ne": True},
-                    "cancelled": {"$ne": True},
-                    "date": {"$gte": today_str},
-                    "$or": [
-                        {"parent": {"$in": rec_filter_values}},
-                        {"_id": {"$in": rec_filter_values}},
-                    ],
-                }
-                rec_cursor = (
-                    mongo.demonstrations.find(
-                        rec_query,
-                        {"_id": 1, "title": 1, "city": 1, "date": 1, "start_time": 1, "address": 1, "slug": 1},
-                    )
-                    .sort("date", ASCENDING)
-                    .limit(6)
-                )
-                for doc in rec_cursor:
-                    if len(similar_demos) >= 4:
-                        break
-                    _append_similar(doc)
+            similar_demos = _similar_demos(demo_obj, demo)
         except Exception:
-            logger.exception("Failed to load similar demonstrations for %s", demo_id)
+            logger.exception("Failed to load similar demonstrations for %s", demo_obj._id)
+            similar_demos = []
 
-        follow_meta = {
-            "organizer_follow_map": organizer_follow_map,
+        content = render_template(
+            "demo_views/_detail_content.html",
+            demo=demo,
+            toistuvuus=toistuvuus,
+            similar_demos=similar_demos,
+            recurring_target_id=_stringify_id(demo.get("parent")) if demo.get("parent") else None,
+        )
+        return {"demo": demo, "content": content}
+
+    def _viewer_follow_meta(demo):
+        """Return the signed-in viewer's follow state for the organizers and series of ``demo``."""
+        followed_orgs = _get_followed_org_ids()
+        recurring_target_id = _stringify_id(demo.get("parent")) if demo.get("parent") else None
+        return {
+            "organizer_follow_map": {
+                org["organization_id_str"]: org["organization_id_str"] in followed_orgs
+                for org in demo.get("organizers") or []
+                if org.get("organization_id_str")
+            },
             "recurring_target_id": recurring_target_id,
-            "recurring_following": recurring_following,
+            "recurring_following": bool(
+                recurring_target_id and recurring_target_id in _get_followed_recurring_ids()
+            ),
         }
 
+    def _detail_cache_tags(demo_obj):
+        """Tags of the detail fragment: the demo, its organizations and its city (similar demos)."""
+        organizers = [
+            {"organization_id": getattr(org, "organization_id", None)}
+            for org in demo_obj.organizers or []
+        ]
+        return demo_tags(
+            {"_id": demo_obj._id, "city": demo_obj.city, "organizers": organizers},
+            include_public_list=False,
+        )
+
+    @app.route("/demonstration/<demo_id>")
+    def demonstration_detail(demo_id):
+        """
+        Display demonstration detail from a cached public fragment plus a per-viewer overlay.
+
+        The page body (``demo_views/_detail_content.html``, including the
+        similar demos) does not depend on the viewer, so it is cached once per
+        demonstration, locale and audience (anonymous or signed in), tagged
+        with the demo, its organizations and its city. Follow
+        state is the only per-user part; it is computed from the session user
+        without queries and applied client side from ``#demo-follow-state``.
+        The X-Cache header reports whether the fragment was served from cache.
+
+        The fragment cache is bypassed when:
+        - there is a query string (incl. ?force_reload=1)
+        - flash messages are pending for the session/request
+        """
+        # Load demonstration and permission checks first (so we don't serve cached 401/404)
+        try:
+            demo_obj = Demonstration.load_by_id(demo_id)
+        except ValueError:
+            abort(404)
+        if not demo_obj:
+            abort(404)
+
+        if (not demo_obj.approved and not current_user.has_permission("VIEW_DEMO")) or \
+            (demo_obj.hide and not current_user.has_permission("VIEW_DEMO")):
+            abort(401)
+
+        bypass_cache = bool(request.query_string) or should_skip_cache(public_only=False)
+
+        if bypass_cache:
+            fragment = _render_detail_fragment(demo_obj)
+            cache_status = "MISS"
+        else:
+            locale = session.get("locale", "")
+            audience = "auth" if current_user.is_authenticated else "anon"
+            cache_key = tagged_cache_key(
+                f"demonstration_detail:v2:{demo_obj._id}:locale={locale}:audience={audience}",
+                _detail_cache_tags(demo_obj),
+            )
+            built = []
+
+            def _build():
+                built.append(True)
+                return _render_detail_fragment(demo_obj)
+
+            fragment = tiered_cache.get_or_set(cache_key, _build, DETAIL_CACHE_TIMEOUT)
+            cache_status = "MISS" if built else "HIT (cached)"
+
+        demo = fragment["demo"]
+        follow_meta = {"organizer_follow_map": {}, "recurring_target_id": None, "recurring_following": False}
+        if current_user.is_authenticated:
+            follow_meta = _viewer_follow_meta(demo)
+
         response = make_response(
             render_template(
                 "detail.html",
                 demo=demo,
-                toistuvuus=toistuvuus,
-                similar_demos=similar_demos,
+                detail_content=Markup(fragment["content"]),
                 follow_meta=follow_meta,
             )
         )
-        response.headers["X-Cache"] = "MISS"
-
-        # Store response in cache for future requests (if available)
-        if not (bypass_cache or should_skip_cache(public_only=False)) and hasattr(cache, "set"):
-            try:
-                # Capture headers as list of tuples
-                headers_snapshot = list(response.headers.items())
-                cache.set(
-                    cache_key,
-                    {
-                        "data": response.get_data(),
-                        "mimetype": response.mimetype,
-                        "status": response.status_code,
-                        "headers": headers_snapshot,
-                    },
-                    timeout=60 * 5,
-                )
-            except Exception:
-                logger.exception("Failed to cache demonstration_detail for %s", demo_id)
-
+        response.headers["X-Cache"] = cache_status
         return response
 
     @app.route("/demonstration/<demo_id>/ics")
@@ -2886,6 +2471,7 @@ def init_routes(app):
         # Save to DB
         result = mongo.org_edit_suggestions.insert_one(suggestion)
         suggestion_id = str(result.inserted_id)
+        sync_org_suggestion_tasks(mongo, suggestion_id)
         
         
         Case.create_new(
@@ -2950,11 +2536,11 @@ def init_routes(app):
         per_page = int(request.args.get("per_page", 10) or 10)
         total_demos = mongo.demonstrations.count_documents(demonstrations_query)
         total_pages = (total_demos + per_page - 1) // per_page
-        demonstrations_cursor = mongo.demonstrations.find(demonstrations_query)
+        demonstrations_cursor = mongo.demonstrations.find(demonstrations_query, summary_projection())
         paginated_demos = demonstrations_cursor.skip((page - 1) * per_page).limit(
             per_page
         )
-        paginated_demos_list = list(paginated_demos)
+        paginated_demos_list = DemoSummary.from_cursor(paginated_demos)
         return render_template(
             "tag_list.html",
             demonstrations=paginated_demos_list,
@@ -3045,19 +2631,23 @@ def init_routes(app):
         """
         Makes `user_notifications` available in all templates.
 
+        Lazy: notifications are fetched only when a template uses them.
+
         Shape per item:
         id, type, message, icon, link, time, created_at, read
         """
         if not current_user.is_authenticated:
             return {"user_notifications": []}
 
-        try:
-            raw = fetch_notifications(current_user.id, limit=20)
-            serialized = [serialize_notification(n) for n in raw]
-            return {"user_notifications": serialized}
-        except Exception:
-            # Avoid breaking templates if Mongo is down
-            return {"user_notifications": []}
+        def _load():
+            try:
+                raw = fetch_notifications(current_user.id, limit=20)
+                return [serialize_notification(n) for n in raw]
+            except Exception:
+                # Avoid breaking templates if Mongo is down
+                return []
+
+        return {"user_notifications": lazy_value("user_notifications", _load)}
 
     @app.route("/subscribe_reminder/<demo_id>", methods=["POST"])
     def subscribe_reminder(demo_id):
@@ -3237,10 +2827,10 @@ def init_routes(app):
         for demo in demonstrations:
             item = ET.SubElement(channel, "item")
 
-            demo_id = str(demo.get("_id", ""))
-            demo_title = demo.get("title", "Tuntematon tapahtuma")
-            demo_date = demo.get("formatted_date", "Tuntematon päivämäärä")
-            demo_description = demo.get("description") or "Ei kuvausta."
+            demo_id = str(demo._id)
+            demo_title = demo.title or "Tuntematon tapahtuma"
+            demo_date = demo.date_display or "Tuntematon päivämäärä"
+            demo_description = demo.description or "Ei kuvausta."
 
             # Title
             ET.SubElement(item, "title").text = f"{demo_title} – {demo_date}"
@@ -3253,10 +2843,6 @@ def init_routes(app):
             # Description (safe fallback)
             ET.SubElement(item, "description").text = html.escape(str(demo_description))
 
-            # pubDate
-            if "date" in demo and isinstance(demo["date"], datetime):
-                ET.SubElement(item, "pubDate").text = format_datetime(demo["date"])
-
         # Return pretty UTF-8 XML string
         return ET.tostring(feed, encoding="utf-8", xml_declaration=True)
 
@@ -3265,21 +2851,23 @@ def init_routes(app):
     import hashlib
 
     @app.route("/demonstrations.rss")
-    @cache.cached(timeout=300, unless=skip_cache_public_only)  # cache for 5 minutes
+    @cache.cached(
+        timeout=60 * 60,
+        key_prefix=lambda: tagged_cache_key("view/demonstrations.rss", [PUBLIC_LIST_TAG]),
+        unless=skip_cache_public_only,
+    )
     def demonstrations_rss():
         """
         Serve the RSS feed for demonstrations.
         Cached heavily to reduce DB load.
         """
-        demonstrations = list(
-            demonstrations_collection.find().sort("date", -1).limit(50)
+        demonstrations = DemoSummary.from_cursor(
+            demonstrations_collection.find({}, summary_projection(with_description=True))
+            .sort("date", -1)
+            .limit(50),
+            with_description=True,
         )
 
-        # Normalize ObjectId → str
-        for demo in demonstrations:
-            if "_id" in demo and isinstance(demo["_id"], ObjectId):
-                demo["_id"] = str(demo["_id"])
-
         feed_xml = create_rss_feed(demonstrations)
 
         # Create ETag for conditional GET
@@ -3301,7 +2889,6 @@ def init_routes(app):
             },
         )
     from datetime import datetime, date
-    from collections import defaultdict
     import calendar
     from flask import render_template
 
@@ -3328,17 +2915,8 @@ def init_routes(app):
         if year < 2000 or year > 2100:
             noindex_nofollow = True
 
-        # Haetaan kaikki demonstraatiot
-        demonstrations = list(demonstrations_collection.find(DEMO_FILTER))
-
-        # Filteröidään vain kyseisen kuukauden demoja
-        month_demos = defaultdict(list)
-        for demo in demonstrations:
-            demo_date = demo.get("date")
-            if demo_date:
-                dd = datetime.strptime(demo_date, "%Y-%m-%d").date()
-                if dd.year == year and dd.month == month:
-                    month_demos[dd.day].append(demo)
+        # Haetaan vain kyseisen kuukauden demot (välimuistissa kuukausittain)
+        month_demos = get_month_buckets(mongo, year, month)
 
         # Kalenteri kuukaudelle
         cal = calendar.Calendar(firstweekday=0)  # 0 = Monday
@@ -3381,31 +2959,21 @@ def init_routes(app):
     # ============================
     @app.route("/calendar/<int:year>/")
     def calendar_year_view(year):
-        # Haetaan kaikki demonstraatiot
-        demonstrations = list(demonstrations_collection.find(DEMO_FILTER))
-
         noindex_nofollow = False
         if year < 2000 or year > 2100:
             noindex_nofollow = True
             
         # Valmistellaan tietorakenne: month -> {weeks, days}
+        year_buckets = get_year_buckets(mongo, year)
         year_demos = {}
         cal = calendar.Calendar(firstweekday=0)  # Monday
         for month in range(1, 13):
             month_weeks = cal.monthdayscalendar(year, month)
             year_demos[month] = {
                 "weeks": month_weeks,
-                "days": defaultdict(list)
+                "days": year_buckets.get(month, {}),
             }
 
-        # Lisätään demoja oikeille päiville
-        for demo in demonstrations:
-            demo_date_str = demo.get("date")
-            if demo_date_str:
-                dd = datetime.strptime(demo_date_str, "%Y-%m-%d").date()
-                if dd.year == year:
-                    year_demos[dd.month]["days"][dd.day].append(demo)
-
         # Kuukausien nimet
         month_names = {
             1: "Tammikuu", 2: "Helmikuu", 3: "Maaliskuu", 4: "Huhtikuu",
@@ -3487,5 +3055,5 @@ def init_routes(app):
     @app.before_request
     def _check_panic_mode():
         if not request.path.startswith("/admin") and not request.path.startswith("/users/auth") and not request.path.startswith("/static"):
-            if PANIC_MODE:
+            if panic_mode():
                 return render_template("heavy.html")
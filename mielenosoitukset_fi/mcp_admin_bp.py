@@ -20,13 +20,27 @@ from mielenosoitukset_fi.api.exceptions import ApiException
 from mielenosoitukset_fi.utils.classes.Case import Case
 from mielenosoitukset_fi.utils.classes.Demonstration import Demonstration
 from mielenosoitukset_fi.utils.classes.Organization import Organization
+from mielenosoitukset_fi.utils.cache import invalidate_tags, org_tag
+from mielenosoitukset_fi.users.models import User
 from mielenosoitukset_fi.utils.database import stringify_object_ids
+from mielenosoitukset_fi.utils.permission_filters import demo_permission_filter
 from mielenosoitukset_fi.utils.tokens import check_token
 
 
 mcp_admin_bp = Blueprint("admin_mcp", __name__)
 logger = logging.getLogger(__name__)
 
+MCP_DEMO_LIST_PROJECTION = {
+    "title": 1,
+    "date": 1,
+    "city": 1,
+    "approved": 1,
+    "hide": 1,
+    "cancelled": 1,
+    "running_number": 1,
+    "slug": 1,
+}
+
 
 def _mongo():
     return DatabaseManager().get_instance().get_db()
@@ -485,6 +499,17 @@ def _serialize_result(data: Any) -> dict[str, Any]:
     }
 
 
+def _token_user(token_entry: dict[str, Any]) -> User | None:
+    """Return the user behind a personal API token; config and OAuth tokens have none."""
+    user_id = (token_entry.get("token_record") or {}).get("user_id")
+    if not user_id or not ObjectId.is_valid(str(user_id)):
+        return None
+    try:
+        return User.from_OID(str(user_id))
+    except ValueError:
+        return None
+
+
 def _list_demos(arguments: dict[str, Any], token_entry: dict[str, Any]) -> dict[str, Any]:
     _require_scope(token_entry, "read")
     db = _mongo()
@@ -516,11 +541,16 @@ def _list_demos(arguments: dict[str, Any], token_entry: dict[str, Any]) -> dict[
                 ]
             }
         )
+    # Personal API tokens only see the demos their user may list.
+    if (token_entry.get("token_record") or {}).get("user_id"):
+        permission_filter = demo_permission_filter(_token_user(token_entry), "LIST_DEMOS")
+        if permission_filter:
+            clauses.append(permission_filter)
     query = {"$and": clauses} if len(clauses) > 1 else clauses[0]
 
     total = db.demonstrations.count_documents(query)
     cursor = (
-        db.demonstrations.find(query)
+        db.demonstrations.find(query, MCP_DEMO_LIST_PROJECTION)
         .sort([("date", 1), ("_id", 1)])
         .skip((page - 1) * per_page)
         .limit(per_page)
@@ -728,6 +758,7 @@ def _update_organization(arguments: dict[str, Any], token_entry: dict[str, Any])
     )
     if result.matched_count == 0:
         raise LookupError("Organization not found")
+    invalidate_tags(org_tag(org_id))
     return _serialize_result({"updated": True, "organization_id": org_id, "applied": update_payload})
 
 
@@ -51,6 +51,8 @@ from traceback import format_exc
 from mielenosoitukset_fi.utils import VERSION
 from mielenosoitukset_fi.utils.classes.RepeatSchedule import RepeatSchedule
 from mielenosoitukset_fi.utils.time_utils import utcnow
+from mielenosoitukset_fi.utils.demo_export import record_deleted_demos
+from mielenosoitukset_fi.utils.demo_summary import derived_fields, with_derived_fields
 
 # Dry-run flag (can be overridden from CLI)
 DRY_RUN = False
@@ -377,6 +379,7 @@ def remove_invalid_child_demonstrations(parent_demo: dict, valid_dates: list[dat
                 logger.info(f"DRY RUN: would delete invalid child demo {demo['_id']}")
             else:
                 demonstrations_collection.delete_one({"_id": demo["_id"]})
+                record_deleted_demos(db, demo["_id"])
                 logger.info(f"Deleted invalid child demo {demo['_id']}")
 
 def get(obj: dict, key: str, default=None):
@@ -459,7 +462,7 @@ def process_demo(demo: dict, only_calculate: bool = False):
                                     logger.info(f"DRY RUN: would update child {child['_id']} date from {child_date} to {corrected} ({msg})")
                                     runtime_actions.append({"action":"fix","document":child,"reason":f"would change date to {corrected}","timestamp":datetime.now(),"executed_by":"system"})
                                 else:
-                                    demonstrations_collection.update_one({"_id": child["_id"]}, {"$set": {"date": corrected.strftime("%Y-%m-%d")}})
+                                    demonstrations_collection.update_one({"_id": child["_id"]}, {"$set": with_derived_fields({"date": corrected.strftime("%Y-%m-%d")}, child)})
                                     runtime_actions.append({"action":"fix","document":child,"reason":f"changed date to {corrected}","timestamp":datetime.now(),"executed_by":"system"})
                                     logger.info(f"Updated child {child['_id']} date from {child_date} to {corrected}")
                             else:
@@ -487,7 +490,7 @@ def process_demo(demo: dict, only_calculate: bool = False):
                                     logger.info(f"DRY RUN: would update child {child['_id']} date from {child_date} to {corrected} ({msg})")
                                     runtime_actions.append({"action":"fix","document":child,"reason":f"would change date to {corrected}","timestamp":datetime.now(),"executed_by":"system"})
                                 else:
-                                    demonstrations_collection.update_one({"_id": child["_id"]}, {"$set": {"date": corrected.strftime("%Y-%m-%d")}})
+                                    demonstrations_collection.update_one({"_id": child["_id"]}, {"$set": with_derived_fields({"date": corrected.strftime("%Y-%m-%d")}, child)})
                                     runtime_actions.append({"action":"fix","document":child,"reason":f"changed date to {corrected}","timestamp":datetime.now(),"executed_by":"system"})
                                     logger.info(f"Updated child {child['_id']} date from {child_date} to {corrected}")
                             except ValueError:
@@ -522,7 +525,9 @@ def process_demo(demo: dict, only_calculate: bool = False):
                 new_demo_data.update({"date": next_date_str,"parent":demo["_id"],"recurring":True})
                 new_demo_data.pop("_id", None)
                 new_demo = Demonstration.from_dict(new_demo_data)
-                bulk_ops.append(UpdateOne({"date": next_date_str,"parent":demo["_id"]},{"$setOnInsert": new_demo.to_dict()}, upsert=True))
+                new_doc = new_demo.to_dict()
+                new_doc.update(derived_fields(new_doc))
+                bulk_ops.append(UpdateOne({"date": next_date_str,"parent":demo["_id"]},{"$setOnInsert": new_doc}, upsert=True))
                 runtime_actions.append({"action":"create","document":new_demo.to_dict(),"reason":"create new","timestamp":datetime.now(),"executed_by":"system"})
 
         if bulk_ops:
@@ -581,12 +586,20 @@ def find_duplicates() -> list[dict]:
 def merge_duplicates() -> int:
     duplicates = find_duplicates()
     merged_count = 0
+    # Load every demo of every group (and their parents) up front.
+    all_ids = [demo_id for group in duplicates for demo_id in group["ids"]]
+    loaded = {
+        demo._id: demo
+        for demo in Demonstration.from_dicts(demonstrations_collection.find({"_id": {"$in": all_ids}}))
+    } if all_ids else {}
     for group in duplicates:
         ids = group["ids"]
-        base_demo = Demonstration.from_dict(demonstrations_collection.find_one({"_id": ids[0]}))
+        base_demo = loaded.get(ids[0])
+        if base_demo is None:
+            continue
         for dup_id in ids[1:]:
             try:
-                base_demo.merge(dup_id)
+                base_demo.merge(dup_id, other_demo=loaded.get(dup_id))
                 runtime_actions.append({"action":"merge","document":base_demo.to_dict(),"reason":"merge duplicate","timestamp":datetime.now(),"executed_by":"system"})
                 merged_count += 1
             except Exception as e:
@@ -183,6 +183,9 @@ class User(UserMixin):
         # CACHED memberships (lazy)  --------------------------------------------
         self._memberships: Optional[List[MemberShip]] = None
         self._admin_scope_grants: Optional[List[dict]] = None
+        # Cached permission snapshot (utils.principal), set by load_user
+        self._principal = None
+        self._invites: Dict[str, bool] = {}
 
     # ---------- CLASS HELPERS ----------------------------------------------------
 
@@ -231,6 +234,13 @@ class User(UserMixin):
             self._memberships = MemberShip.all_per_user(self._id)
         return self._memberships
 
+    def apply_principal(self, snapshot) -> None:
+        """Use a cached :class:`~mielenosoitukset_fi.utils.principal.PrincipalSnapshot`
+        instead of querying memberships and scoped grants."""
+        self._principal = snapshot
+        self._memberships = list(snapshot.memberships)
+        self._admin_scope_grants = list(snapshot.admin_scope_grants)
+
     def org_ids(self) -> List[ObjectId]:
         return [m.organization_id for m in self.memberships]
 
@@ -256,6 +266,8 @@ class User(UserMixin):
 
     def scoped_city_keys_for(self, permission: str) -> List[str]:
         """Return normalized city keys where this user has a scoped permission."""
+        if self._principal is not None:
+            return list(self._principal.city_keys_by_permission.get(permission, ()))
         keys: list[str] = []
         for grant in self.admin_scope_grants:
             if grant.get("scope_type") != "city":
@@ -304,18 +316,19 @@ class User(UserMixin):
             True if the user has a pending invite for this organization, else False.
         """
         oid = ObjectId(organization_id) if isinstance(organization_id, str) else organization_id
+        if str(oid) in self._invites:
+            return self._invites[str(oid)]
 
-        org = _get_mongo().organizations.find_one({"_id": oid})
-        if not org or "invitations" not in org:
-            return False
-
-        for inv in org["invitations"]:
+        org = _get_mongo().organizations.find_one({"_id": oid}, {"invitations": 1})
+        invited = False
+        for inv in (org or {}).get("invitations") or []:
             if isinstance(inv, str) and inv == self.email:
-                return True
+                invited = True
             elif isinstance(inv, dict) and inv.get("email") == self.email:
-                return True
+                invited = True
 
-        return False
+        self._invites[str(oid)] = invited
+        return invited
 
 
     def _permission_in(self, permission: str) -> List[Union[str, ObjectId]]:
@@ -424,11 +437,9 @@ class User(UserMixin):
             return True
         
         if organization_id:
+            if self._principal is not None:
+                return perm in self._principal.permissions_by_org.get(ObjectId(organization_id), ())
             ms = self.membership_for(organization_id)
-            if ms:
-                print(ms.permissions)
-                print(ms.organization_id)
-            
             return bool(ms and perm in ms.permissions)
         # if org not specified, check all org memberships
         return any(perm in m.permissions for m in self.memberships)
@@ -491,6 +502,8 @@ class User(UserMixin):
         # invalidate cache after save
         self._memberships = None
         self._admin_scope_grants = None
+        self._principal = None
+        self._invites = {}
 
     # ---------- SERIALISATION ----------------------------------------------------
 
@@ -0,0 +1,261 @@
+"""
+Materialised admin task list.
+
+The admin sidebar lists demonstrations waiting for approval and open
+organization edit suggestions. Computing that on every template render meant
+loading every pending demonstration and suggestion, checking permissions
+row by row and looking up each suggestion's organization. Instead the
+``admin_tasks`` collection keeps one small document per open task,
+maintained by the writers (submission, approval, rejection, edits,
+suggestion status changes) through :func:`sync_demo_tasks` and
+:func:`sync_org_suggestion_tasks`.
+
+Demo tasks copy the fields the permission predicate reads (``editors``,
+``organizers.organization_id``, ``city`` and ``city_key``), so
+:func:`tasks_for_user` filters them with
+:func:`~mielenosoitukset_fi.utils.permission_filters.demo_permission_filter`
+unchanged. :func:`rebuild_admin_tasks` recreates the collection from
+scratch (migration ``007_admin_tasks``).
+"""
+
+from bson import ObjectId
+from flask import url_for
+from pymongo import ReplaceOne
+
+from mielenosoitukset_fi.utils.cities import normalize_city_key
+from mielenosoitukset_fi.utils.logger import logger
+from mielenosoitukset_fi.utils.permission_filters import (
+    MATCH_NOTHING,
+    demo_permission_filter,
+    organization_ids_with,
+)
+from mielenosoitukset_fi.utils.time_utils import utcnow
+
+COLLECTION = "admin_tasks"
+DEMO_TASK = "demo"
+ORG_SUGGESTION_TASK = "org_suggestion"
+ADMIN_TASKS_LIMIT = 100
+
+CLOSED_SUGGESTION_STATES = ("partially_applied", "applied", "rejected", "cancelled")
+PENDING_DEMO_QUERY = {
+    "approved": False,
+    "hide": False,
+    "$or": [{"rejected": False}, {"rejected": {"$exists": False}}],
+}
+_DEMO_PROJECTION = {
+    "title": 1,
+    "approved": 1,
+    "hide": 1,
+    "rejected": 1,
+    "created_datetime": 1,
+    "editors": 1,
+    "organizers": 1,
+    "city": 1,
+    "city_key": 1,
+}
+
+
+def _task_id(task_type, ref_id):
+    return f"{task_type}:{ref_id}"
+
+
+def is_pending_demo(doc):
+    """Mirror :data:`PENDING_DEMO_QUERY` for a document in memory."""
+    return (
+        doc.get("approved") is False
+        and doc.get("hide") is False
+        and not doc.get("rejected", False)
+    )
+
+
+def _demo_task(doc):
+    organizers = [
+        {"organization_id": organizer.get("organization_id")}
+        for organizer in doc.get("organizers") or []
+        if isinstance(organizer, dict) and organizer.get("organization_id")
+    ]
+    return {
+        "_id": _task_id(DEMO_TASK, doc["_id"]),
+        "type": DEMO_TASK,
+        "ref_id": doc["_id"],
+        "title": doc.get("title") or "Nimetön mielenosoitus",
+        "created_at": doc.get("created_datetime") or utcnow(),
+        "status": "waiting_approval",
+        "editors": list(doc.get("editors") or []),
+        "organizers": organizers,
+        "city": doc.get("city"),
+        "city_key": doc.get("city_key") or normalize_city_key(doc.get("city")),
+    }
+
+
+def _suggestion_task(suggestion, org_name):
+    return {
+        "_id": _task_id(ORG_SUGGESTION_TASK, suggestion["_id"]),
+        "type": ORG_SUGGESTION_TASK,
+        "ref_id": suggestion["_id"],
+        "organization_id": ObjectId(str(suggestion["organization_id"])),
+        "title": f"Organisaation päivitysehdotus: {org_name or 'Tuntematon organisaatio'}",
+        "created_at": suggestion.get("created_at") or utcnow(),
+        "status": (suggestion.get("status") or {}).get("state"),
+    }
+
+
+def _is_open_suggestion(suggestion):
+    return (suggestion.get("status") or {}).get("state") not in CLOSED_SUGGESTION_STATES
+
+
+def sync_demo_task_doc(db, doc):
+    """Add, refresh or drop the task of one demonstration document."""
+    if not doc:
+        return
+    task_id = _task_id(DEMO_TASK, doc["_id"])
+    try:
+        if is_pending_demo(doc):
+            db[COLLECTION].replace_one({"_id": task_id}, _demo_task(doc), upsert=True)
+        else:
+            db[COLLECTION].delete_one({"_id": task_id})
+    except Exception:
+        logger.exception("Failed to sync admin task %s", task_id)
+
+
+def sync_demo_tasks(db, *demo_ids):
+    """
+    Re-read ``demo_ids`` and update their tasks.
+
+    Demonstrations that are no longer pending, or no longer exist, lose
+    their task.
+    """
+    oids = [ObjectId(str(demo_id)) for demo_id in demo_ids if demo_id and ObjectId.is_valid(str(demo_id))]
+    if not oids:
+        return
+    try:
+        docs = {doc["_id"]: doc for doc in db.demonstrations.find({"_id": {"$in": oids}}, _DEMO_PROJECTION)}
+        for oid in oids:
+            doc = docs.get(oid)
+            if doc is None:
+                db[COLLECTION].delete_one({"_id": _task_id(DEMO_TASK, oid)})
+            else:
+                sync_demo_task_doc(db, doc)
+    except Exception:
+        logger.exception("Failed to sync admin tasks for demonstrations %s", oids)
+
+
+def sync_org_suggestion_tasks(db, *suggestion_ids):
+    """Re-read organization edit suggestions and update their tasks."""
+    oids = [ObjectId(str(sid)) for sid in suggestion_ids if sid and ObjectId.is_valid(str(sid))]
+    if not oids:
+        return
+    try:
+        suggestions = list(
+            db.org_edit_suggestions.find(
+                {"_id": {"$in": oids}}, {"organization_id": 1, "created_at": 1, "status": 1}
+            )
+        )
+        found = {suggestion["_id"] for suggestion in suggestions}
+        for oid in set(oids) - found:
+            db[COLLECTION].delete_one({"_id": _task_id(ORG_SUGGESTION_TASK, oid)})
+        org_names = _organization_names(db, suggestions)
+        for suggestion in suggestions:
+            task_id = _task_id(ORG_SUGGESTION_TASK, suggestion["_id"])
+            if _is_open_suggestion(suggestion):
+                org_name = org_names.get(ObjectId(str(suggestion["organization_id"])))
+                db[COLLECTION].replace_one(
+                    {"_id": task_id}, _suggestion_task(suggestion, org_name), upsert=True
+                )
+            else:
+                db[COLLECTION].delete_one({"_id": task_id})
+    except Exception:
+        logger.exception("Failed to sync admin tasks for suggestions %s", oids)
+
+
+def _organization_names(db, suggestions):
+    org_ids = list({ObjectId(str(s["organization_id"])) for s in suggestions if s.get("organization_id")})
+    if not org_ids:
+        return {}
+    return {org["_id"]: org.get("name") for org in db.organizations.find({"_id": {"$in": org_ids}}, {"name": 1})}
+
+
+def rebuild_admin_tasks(db=None):
+    """
+    Recreate ``admin_tasks`` from the demonstrations and suggestions.
+
+    Returns
+    -------
+    dict
+        ``{"demo_tasks": int, "suggestion_tasks": int}``.
+    """
+    if db is None:
+        from mielenosoitukset_fi.utils.database import get_database_manager
+
+        db = get_database_manager()
+
+    tasks = [_demo_task(doc) for doc in db.demonstrations.find(PENDING_DEMO_QUERY, _DEMO_PROJECTION)]
+    demo_count = len(tasks)
+    suggestions = list(
+        db.org_edit_suggestions.find(
+            {"status.state": {"$nin": list(CLOSED_SUGGESTION_STATES)}},
+            {"organization_id": 1, "created_at": 1, "status": 1},
+        )
+    )
+    org_names = _organization_names(db, suggestions)
+    tasks.extend(
+        _suggestion_task(s, org_names.get(ObjectId(str(s["organization_id"])))) for s in suggestions
+    )
+
+    collection = db[COLLECTION]
+    collection.delete_many({"_id": {"$nin": [task["_id"] for task in tasks]}})
+    if tasks:
+        collection.bulk_write(
+            [ReplaceOne({"_id": task["_id"]}, task, upsert=True) for task in tasks], ordered=False
+        )
+    return {"demo_tasks": demo_count, "suggestion_tasks": len(tasks) - demo_count}
+
+
+def _task_link(task):
+    if task["type"] == DEMO_TASK:
+        return url_for("admin_demo.edit_demo", demo_id=task["ref_id"])
+    return url_for(
+        "admin_org.review_suggestion", org_id=task["organization_id"], suggestion_id=task["ref_id"]
+    )
+
+
+def tasks_for_user(db, user, limit=ADMIN_TASKS_LIMIT):
+    """
+    Return the open tasks ``user`` may act on, newest first.
+
+    Demo tasks need ``LIST_DEMOS`` and suggestion tasks ``EDIT_ORGANIZATION``
+    on the organization, matching the permission checks of the pages they
+    link to.
+
+    Returns
+    -------
+    list of dict
+        ``type``, ``id``, ``title``, ``created_at``, ``status`` and ``link``.
+    """
+    if user is None or not getattr(user, "is_authenticated", False):
+        return []
+
+    clauses = []
+    demo_filter = demo_permission_filter(user, "LIST_DEMOS")
+    if demo_filter != MATCH_NOTHING:
+        clauses.append({"type": DEMO_TASK, **demo_filter})
+    org_ids = organization_ids_with(user, "EDIT_ORGANIZATION")
+    if org_ids is None:
+        clauses.append({"type": ORG_SUGGESTION_TASK})
+    elif org_ids:
+        clauses.append({"type": ORG_SUGGESTION_TASK, "organization_id": {"$in": org_ids}})
+    if not clauses:
+        return []
+
+    cursor = db[COLLECTION].find({"$or": clauses}).sort("created_at", -1).limit(limit)
+    return [
+        {
+            "type": task["type"],
+            "id": str(task["ref_id"]),
+            "title": task.get("title"),
+            "created_at": task.get("created_at"),
+            "status": task.get("status"),
+            "link": _task_link(task),
+        }
+        for task in cursor
+    ]
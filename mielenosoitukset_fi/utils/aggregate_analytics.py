@@ -3,16 +3,17 @@
 import time
 from datetime import datetime, timezone
 from bson import ObjectId
-from pymongo import MongoClient, UpdateOne
+from pymongo import MongoClient
 from tqdm import tqdm
 import pytz  # <-- you need to install this: pip install pytz
 from config import Config
+from mielenosoitukset_fi.utils.analytics_buckets import count_events, increment_ops
 
 # ── CONFIG ──────────────────────────────────────────────────────
 MONGO_URI     = Config.MONGO_URI or "mongodb://localhost:27017"
 DB_NAME       = Config.MONGO_DBNAME or "testdb"
 RAW_COLL      = "analytics"     # incoming view events
-AGGR_COLL     = "d_analytics"   # rolled-up analytics
+AGGR_COLL     = "d_analytics"   # per-demo, per-day view buckets
 META_COLL     = "_meta"         # stores last processed ObjectId
 POLL_INTERVAL = 60              # seconds
 
@@ -82,46 +83,18 @@ def rollup_events(run_once: bool = False):
 
             if new_events:
                 on_demand_max_ids = get_on_demand_max_ids()
-                counters = {}  # { demo_id: { date: { hour: { minute: count } } } }
-
+                pending = []
                 for ev in new_events:
-                    demo_id_str = str(ev["demo_id"])
-                    max_on_demand_id = on_demand_max_ids.get(demo_id_str)
+                    max_on_demand_id = on_demand_max_ids.get(str(ev["demo_id"]))
                     if max_on_demand_id is not None and ev["_id"] <= max_on_demand_id:
                         continue
-                    demo_id = ev["demo_id"]
-                    ts = ev["timestamp"]
-                    ts = _normalize_timestamp(ts)
-                    if not ts:
-                        continue
-
-                    ts_hel = ts.astimezone(HELSINKI_TZ)
-                    d = iso_date(ts_hel)
-                    h = two(ts_hel.hour)
-                    m = two(ts_hel.minute)
-
-                    counters.setdefault(demo_id, {})
-                    counters[demo_id].setdefault(d, {})
-                    counters[demo_id][d].setdefault(h, {})
-                    counters[demo_id][d][h].setdefault(m, 0)
-                    counters[demo_id][d][h][m] += 1
-
-                ops = []
-                for demo_id, dates in counters.items():
-                    inc_dict = {}
-                    for d, hours in dates.items():
-                        for h, minutes in hours.items():
-                            for m, count in minutes.items():
-                                inc_dict[f"analytics.{d}.{h}.{m}"] = count
-
-                    ops.append(UpdateOne(
-                        {"_id": demo_id},
-                        {"$inc": inc_dict},
-                        upsert=True
-                    ))
+                    ev["timestamp"] = _normalize_timestamp(ev.get("timestamp"))
+                    pending.append(ev)
 
+                # { (demo_id, date): { minute of day: count } }, Helsinki time
+                ops = increment_ops(count_events(pending))
                 if ops:
-                    aggr.bulk_write(ops, ordered=False)
+                    aggr.bulk_write(ops, ordered=True)
                 last_seen_id = new_events[-1]["_id"]
                 set_last_seen_id(last_seen_id)
 
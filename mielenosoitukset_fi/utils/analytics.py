@@ -1,16 +1,35 @@
 from mielenosoitukset_fi.database_manager import DatabaseManager
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
 from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 
+from config import Config
 from mielenosoitukset_fi.utils.database import stringify_object_ids
+from mielenosoitukset_fi.utils.time_utils import utcnow
+from mielenosoitukset_fi.utils.write_buffer import BatchWriter
 
 db_manager = DatabaseManager().get_instance()
 mongo = db_manager.get_db()
 
+# View events are buffered in-process and written in batches unless
+# ANALYTICS_BUFFERED_VIEWS is disabled (the test suite writes synchronously).
+view_buffer = BatchWriter(
+    lambda: mongo.analytics,
+    name="analytics-views",
+    max_batch=Config.ANALYTICS_VIEW_BATCH_SIZE,
+    flush_interval=Config.ANALYTICS_VIEW_FLUSH_SECONDS,
+    max_queue=Config.ANALYTICS_VIEW_QUEUE_SIZE,
+)
+
 
 def log_demo_view(demo_id, user_id=None, session_id=None):
-    """This function logs a demonstration view by inserting a new document into the "views" collection in the database.
+    """This function logs a demonstration view into the "analytics" collection.
+
+    With ``ANALYTICS_BUFFERED_VIEWS`` enabled the event is queued in
+    ``view_buffer`` and inserted in a batch by a background thread; otherwise
+    it is inserted synchronously.
 
     Parameters
     ----------
@@ -34,7 +53,10 @@ def log_demo_view(demo_id, user_id=None, session_id=None):
     else:
         view_data["session_id"] = session_id
 
-    mongo.analytics.insert_one(view_data)
+    if Config.ANALYTICS_BUFFERED_VIEWS:
+        view_buffer.add(view_data)
+    else:
+        mongo.analytics.insert_one(view_data)
 
 
 def get_demo_views(demo_id=None, json=False):
@@ -108,37 +130,182 @@ def count_per_demo(data):
     return demo_count
 
 
-# Could we somehow "prep" reports?
-# So that we would do the count_per_demo like every 15 minutes, and save to prepped_analytics collection
-# Then we could just fetch the prepped data instead of doing the count every time
+ROLLUP_META_ID = "analytics_totals"
+ROLLUP_BATCH_SIZE = 5000
+# Events are ordered by their client-generated ObjectId; leaving the newest
+# minute for the next run keeps late inserts from other workers from falling
+# behind the watermark.
+ROLLUP_SETTLE_SECONDS = 60
 
-# We could also have a "last_updated" field in the prepped_analytics collection
-# And only update the data if the last_updated field is older than 15 minutes
-# This way we would only update the data every 15 minutes
-# And we could still fetch the data every time the report
 
+def _rollup_meta():
+    return mongo["_meta"].find_one({"_id": ROLLUP_META_ID}, {"last_seen_id": 1, "pending_upper": 1}) or {}
 
-def prep():
-    """This function prepares the analytics data for reporting by counting the number of views per demonstration
-    and saving the data to the "prepped_analytics" collection in the database.
 
-    Parameters
-    ----------
+def _rollup_watermark():
+    return _rollup_meta().get("last_seen_id")
 
-    Returns
-    -------
 
+def _set_pending_upper(upper):
+    """Record the bound of the batch about to be written, for an exact retry."""
+    mongo["_meta"].update_one(
+        {"_id": ROLLUP_META_ID}, {"$set": {"pending_upper": upper}}, upsert=True
+    )
 
-    """
-    data = get_demo_views()
-    demo_count = count_per_demo(data)
 
-    prepped_data = [
-        {"demo_id": ObjectId(demo.id), "views": demo.views} for demo in demo_count
+def _set_rollup_watermark(last_seen_id):
+    mongo["_meta"].update_one(
+        {"_id": ROLLUP_META_ID},
+        {"$set": {"last_seen_id": last_seen_id, "updated_at": utcnow()}, "$unset": {"pending_upper": ""}},
+        upsert=True,
+    )
+
+
+def _rollup_batch(lower, upper, bootstrap):
+    """Fold raw events with ``lower < _id <= upper`` into per-demo totals."""
+    id_range = {"$lte": upper}
+    if lower is not None:
+        id_range["$gt"] = lower
+    pipeline = [
+        {"$match": {"_id": id_range}},
+        {"$group": {"_id": "$demo_id", "views": {"$sum": 1}}},
     ]
 
-    mongo.prepped_analytics.drop()
-    mongo.prepped_analytics.insert_many(prepped_data)
+    ops = []
+    for row in mongo.analytics.aggregate(pipeline):
+        if row["_id"] is None:
+            continue
+        if bootstrap:
+            # First run: totals recomputed from scratch replace the values
+            # left by the old full-snapshot job.
+            ops.append(
+                UpdateOne(
+                    {"demo_id": row["_id"]},
+                    {"$set": {"views": row["views"], "rolled_through": upper}},
+                    upsert=True,
+                )
+            )
+        else:
+            # ``rolled_through`` makes a retried batch a no-op: a demo that has
+            # already absorbed this range no longer matches the filter, and the
+            # resulting upsert collides with the unique ``demo_id`` index.
+            ops.append(
+                UpdateOne(
+                    {"demo_id": row["_id"], "rolled_through": {"$not": {"$gte": upper}}},
+                    {"$inc": {"views": row["views"]}, "$set": {"rolled_through": upper}},
+                    upsert=True,
+                )
+            )
+    if not ops:
+        return 0
+    try:
+        mongo.prepped_analytics.bulk_write(ops, ordered=False)
+    except BulkWriteError as exc:
+        unexpected = [e for e in exc.details.get("writeErrors", []) if e.get("code") != 11000]
+        if unexpected:
+            raise
+    return len(ops)
+
+
+def trim_rolled_up_events(retention_days=None):
+    """Delete raw view events that are rolled up and older than the retention window.
+
+    Events newer than the ``d_analytics`` poller's watermark are kept as well,
+    so the minute-level rollup in ``utils.aggregate_analytics`` never misses
+    data; nothing is trimmed before that poller has run once.
+    ``retention_days`` defaults to ``ANALYTICS_RAW_RETENTION_DAYS``; ``0``
+    disables trimming.
+
+    Returns
+    -------
+    int
+        Number of deleted events.
+    """
+    if retention_days is None:
+        retention_days = Config.ANALYTICS_RAW_RETENTION_DAYS
+    if not retention_days:
+        return 0
+
+    minute_rollup = mongo["_meta"].find_one({"_id": "analytics_rollup"}, {"last_seen_id": 1}) or {}
+    bounds = [
+        ObjectId.from_datetime(datetime.now(timezone.utc) - timedelta(days=retention_days)),
+        _rollup_watermark(),
+        minute_rollup.get("last_seen_id"),
+    ]
+    if any(bound is None for bound in bounds):
+        return 0
+    return mongo.analytics.delete_many({"_id": {"$lte": min(bounds)}}).deleted_count
+
+
+def prep():
+    """Incrementally roll raw view events up into ``prepped_analytics``.
+
+    Only events newer than the ``last_seen_id`` watermark in ``_meta`` are
+    read, in ``_id`` batches, and added to the per-demo totals with ``$inc``
+    upserts; the newest ``ROLLUP_SETTLE_SECONDS`` are left for the next run. The totals collection is never dropped, so readers always see
+    complete counts. The very first run (no watermark yet) recomputes every
+    total with one server-side ``$group`` and overwrites the old snapshot
+    values. Each batch's bound is stored as ``pending_upper`` before it is
+    written, so a run interrupted before the watermark moved retries that
+    exact batch instead of re-adding it under a wider one. Rolled-up events
+    past the retention window are trimmed afterwards.
+
+    Returns
+    -------
+    dict
+        Number of batches and per-demo updates applied, and trimmed events.
+    """
+    meta = _rollup_meta()
+    watermark = meta.get("last_seen_id")
+    # Set when a crash hit between a batch's write and its watermark update;
+    # retrying with the same bound keeps ``rolled_through`` matching it.
+    retry_upper = meta.get("pending_upper")
+    batches = updated = 0
+
+    if watermark is None:
+        last = list(mongo.analytics.find({}, {"_id": 1}).sort("_id", -1).limit(1))
+        if last:
+            watermark = last[0]["_id"]
+            updated += _rollup_batch(None, watermark, bootstrap=True)
+            _set_rollup_watermark(watermark)
+            batches += 1
+
+    settled = ObjectId.from_datetime(
+        datetime.now(timezone.utc) - timedelta(seconds=ROLLUP_SETTLE_SECONDS)
+    )
+    while watermark is not None:
+        if retry_upper is not None and retry_upper > watermark:
+            upper, more = retry_upper, True
+            retry_upper = None
+        else:
+            pending = {"_id": {"$gt": watermark}}
+            if ROLLUP_SETTLE_SECONDS:
+                pending["_id"]["$lt"] = settled
+            upper_docs = list(
+                mongo.analytics.find(pending, {"_id": 1})
+                .sort("_id", 1)
+                .skip(ROLLUP_BATCH_SIZE - 1)
+                .limit(1)
+            )
+            more = bool(upper_docs)
+            if upper_docs:
+                upper = upper_docs[0]["_id"]
+            else:
+                last = list(mongo.analytics.find(pending, {"_id": 1}).sort("_id", -1).limit(1))
+                if not last:
+                    break
+                upper = last[0]["_id"]
+            _set_pending_upper(upper)
+
+        updated += _rollup_batch(watermark, upper, bootstrap=False)
+        _set_rollup_watermark(upper)
+        watermark = upper
+        batches += 1
+        if not more:
+            break
+
+    trimmed = trim_rolled_up_events()
+    return {"batches": batches, "updated": updated, "trimmed": trimmed}
 
 
 def get_prepped_data(demo_id=None):
@@ -159,5 +326,3 @@ def get_prepped_data(demo_id=None):
     else:
         return mongo.prepped_analytics.find_one({"demo_id": ObjectId(demo_id)})
 
-
-# use apscheduler to run the prep function every 15 minutes
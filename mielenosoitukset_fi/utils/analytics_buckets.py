@@ -0,0 +1,275 @@
+"""
+Day-bucketed per-demo view counters stored in ``d_analytics``.
+
+Each document holds one demonstration's views for one Helsinki calendar
+day::
+
+    {
+        "demo_id": ObjectId,
+        "date": "YYYY-MM-DD",
+        "minutes": [int] * 1440,   # minute of day -> views
+        "hours": [int] * 24,       # pre-summed per hour
+        "total": int,              # pre-summed per day
+    }
+
+Documents stay a fixed ~15 kB regardless of how popular a demo is, and
+readers select only the days in the window they chart with the
+``(demo_id, date)`` index instead of walking every minute a demo has ever
+been viewed. On DST transition days the repeated local hour shares its
+minute slots.
+"""
+
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone
+
+import pytz
+from pymongo import UpdateOne
+
+COLLECTION = "d_analytics"
+MINUTES_PER_DAY = 24 * 60
+HELSINKI_TZ = pytz.timezone("Europe/Helsinki")
+
+
+def _as_utc(ts):
+    if ts.tzinfo is None:
+        return ts.replace(tzinfo=timezone.utc)
+    return ts
+
+
+def bucket_for(ts):
+    """
+    Return ``(date string, minute of day)`` of ``ts`` in Helsinki time.
+
+    Naive timestamps are treated as UTC, matching how view events are stored.
+    """
+    local = _as_utc(ts).astimezone(HELSINKI_TZ)
+    return local.strftime("%Y-%m-%d"), local.hour * 60 + local.minute
+
+
+def local_today(now=None):
+    """Return the current Helsinki calendar date."""
+    now = now or datetime.now(timezone.utc)
+    return _as_utc(now).astimezone(HELSINKI_TZ).date()
+
+
+def count_events(events):
+    """
+    Count view events into buckets.
+
+    Parameters
+    ----------
+    events : iterable of dict
+        Raw ``analytics`` documents with ``demo_id`` and ``timestamp``.
+
+    Returns
+    -------
+    dict
+        ``{(demo_id, date): {minute of day: views}}``.
+    """
+    counts = defaultdict(lambda: defaultdict(int))
+    for event in events:
+        ts = event.get("timestamp")
+        if not ts or event.get("demo_id") is None:
+            continue
+        day, minute = bucket_for(ts)
+        counts[(event["demo_id"], day)][minute] += 1
+    return counts
+
+
+def increment_ops(counts):
+    """
+    Build bulk operations adding ``counts`` (see :func:`count_events`).
+
+    ``$inc`` on an array slot needs the array to exist, so each bucket gets
+    a zero-filled upsert followed by the increment. The list must be run
+    with ``ordered=True``.
+    """
+    ops = []
+    for (demo_id, day), minutes in counts.items():
+        selector = {"demo_id": demo_id, "date": day}
+        ops.append(
+            UpdateOne(
+                selector,
+                {
+                    "$setOnInsert": {
+                        "minutes": [0] * MINUTES_PER_DAY,
+                        "hours": [0] * 24,
+                        "total": 0,
+                    }
+                },
+                upsert=True,
+            )
+        )
+        inc = defaultdict(int)
+        for minute, views in minutes.items():
+            inc[f"minutes.{minute}"] += views
+            inc[f"hours.{minute // 60}"] += views
+            inc["total"] += views
+        ops.append(UpdateOne(selector, {"$inc": dict(inc)}))
+    return ops
+
+
+def bucket_documents(demo_id, days):
+    """
+    Build complete bucket documents for one demo.
+
+    Parameters
+    ----------
+    demo_id : ObjectId
+    days : dict
+        ``{date: {minute of day: views}}``.
+    """
+    documents = []
+    for day, minutes in sorted(days.items()):
+        minute_counts = [0] * MINUTES_PER_DAY
+        for minute, views in minutes.items():
+            minute_counts[minute] += views
+        hours = [sum(minute_counts[h * 60:(h + 1) * 60]) for h in range(24)]
+        documents.append(
+            {
+                "demo_id": demo_id,
+                "date": day,
+                "minutes": minute_counts,
+                "hours": hours,
+                "total": sum(hours),
+            }
+        )
+    return documents
+
+
+def daily_totals(collection, demo_id, start, end):
+    """
+    Return ``{date: views}`` for ``demo_id`` between two dates, inclusive.
+
+    Only the ``date``/``total`` fields of the requested days are read.
+    """
+    cursor = collection.find(
+        {"demo_id": demo_id, "date": {"$gte": start.isoformat(), "$lte": end.isoformat()}},
+        {"date": 1, "total": 1, "_id": 0},
+    )
+    return {doc["date"]: int(doc.get("total") or 0) for doc in cursor}
+
+
+def day_minutes(collection, demo_id, day):
+    """Return the 1440 per-minute counts for ``demo_id`` on ``day``."""
+    doc = collection.find_one({"demo_id": demo_id, "date": day.isoformat()}, {"minutes": 1})
+    minutes = list((doc or {}).get("minutes") or [])
+    return (minutes + [0] * MINUTES_PER_DAY)[:MINUTES_PER_DAY]
+
+
+def total_views(collection, demo_id):
+    """Return the all-time views of ``demo_id`` from the daily totals."""
+    rows = list(
+        collection.aggregate(
+            [
+                {"$match": {"demo_id": demo_id}},
+                {"$group": {"_id": None, "views": {"$sum": "$total"}}},
+            ]
+        )
+    )
+    return int(rows[0]["views"]) if rows else 0
+
+
+def views_per_demo(collection, demo_ids=None):
+    """
+    Return ``{demo_id: all-time views}`` summed from the daily totals.
+
+    Unlike the raw ``analytics`` events, buckets are never trimmed, so these
+    totals survive ``ANALYTICS_RAW_RETENTION_DAYS``.
+    """
+    pipeline = [{"$group": {"_id": "$demo_id", "views": {"$sum": "$total"}}}]
+    if demo_ids is not None:
+        pipeline.insert(0, {"$match": {"demo_id": {"$in": list(demo_ids)}}})
+    return {row["_id"]: int(row["views"] or 0) for row in collection.aggregate(pipeline)}
+
+
+def iter_window(collection, start, end, demo_ids=None):
+    """
+    Yield ``(demo_id, local minute, views)`` for non-zero minutes in a window.
+
+    Only the bucket documents of the Helsinki days overlapping
+    ``[start, end]`` are read, so a 24 hour window touches at most two days
+    per demo.
+
+    Parameters
+    ----------
+    collection : pymongo.collection.Collection
+    start, end : datetime
+        Timezone-aware window bounds (inclusive).
+    demo_ids : iterable of ObjectId, optional
+        Restrict the window to these demos.
+    """
+    first_day = local_today(start)
+    last_day = local_today(end)
+    query = {"date": {"$gte": first_day.isoformat(), "$lte": last_day.isoformat()}}
+    if demo_ids is not None:
+        query["demo_id"] = {"$in": list(demo_ids)}
+
+    start_local = _as_utc(start).astimezone(HELSINKI_TZ)
+    end_local = _as_utc(end).astimezone(HELSINKI_TZ)
+    for doc in collection.find(query, {"demo_id": 1, "date": 1, "minutes": 1}):
+        try:
+            day = datetime.strptime(doc["date"], "%Y-%m-%d").date()
+        except (KeyError, TypeError, ValueError):
+            continue
+        midnight = HELSINKI_TZ.localize(datetime.combine(day, time.min))
+        for minute, views in enumerate(doc.get("minutes") or []):
+            if not views:
+                continue
+            stamp = midnight + timedelta(minutes=minute)
+            if start_local <= stamp <= end_local:
+                yield doc["demo_id"], stamp, views
+
+
+def views_in_window(collection, start, end, demo_ids=None):
+    """Return ``{demo_id: views}`` for the window ``[start, end]``."""
+    views = defaultdict(int)
+    for demo_id, _stamp, count in iter_window(collection, start, end, demo_ids):
+        views[demo_id] += count
+    return dict(views)
+
+
+def summarize(collection, demo_id, now=None):
+    """Return ``{"total", "last_7d", "last_24h"}`` view counts for a demo."""
+    now = _as_utc(now or datetime.now(timezone.utc))
+    week = views_in_window(collection, now - timedelta(days=7), now, [demo_id])
+    day = views_in_window(collection, now - timedelta(days=1), now, [demo_id])
+    return {
+        "total": total_views(collection, demo_id),
+        "last_7d": week.get(demo_id, 0),
+        "last_24h": day.get(demo_id, 0),
+    }
+
+
+def rebuild_demo(db, demo_id):
+    """
+    Rebuild every bucket of ``demo_id`` from its raw view events.
+
+    Records the newest event id folded in under ``on_demand_max_ids`` in the
+    rollup state document so the background rollup skips those events.
+
+    Returns
+    -------
+    bool
+        False when the demo has no raw events.
+    """
+    events = list(db["analytics"].find({"demo_id": demo_id}, {"timestamp": 1}))
+    if not events:
+        return False
+
+    days = defaultdict(lambda: defaultdict(int))
+    for event in events:
+        if event.get("timestamp"):
+            day, minute = bucket_for(event["timestamp"])
+            days[day][minute] += 1
+
+    db[COLLECTION].delete_many({"demo_id": demo_id})
+    documents = bucket_documents(demo_id, days)
+    if documents:
+        db[COLLECTION].insert_many(documents)
+    db["_meta"].update_one(
+        {"_id": "analytics_rollup"},
+        {"$max": {f"on_demand_max_ids.{demo_id}": max(event["_id"] for event in events)}},
+        upsert=True,
+    )
+    return True
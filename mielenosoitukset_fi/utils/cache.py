@@ -1,8 +1,19 @@
-from flask import g, has_request_context, request, session
+import hashlib
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from flask import current_app, g, has_request_context, request, session
 from flask_caching import Cache
 from flask_login import current_user
 
 from config import Config
+from mielenosoitukset_fi.utils.cities import normalize_city_key
+from mielenosoitukset_fi.utils.logger import logger
 
 cache = Cache(
     config={
@@ -78,3 +89,424 @@ def skip_cache_public_only(*args, **kwargs):
 def skip_cache_even_authenticated(*args, **kwargs):
     """Wrapper for cache decorators where authenticated users may still cache."""
     return should_skip_cache(public_only=False)
+
+
+# --- Dependency tags ---------------------------------------------------------
+#
+# Cached entries declare the data they were built from as tags
+# (``demo:<id>``, ``city:<key>``, ``org:<id>``, ``list:public``). Each tag has
+# a generation stored in the cache backend and folded into the key of every
+# entry that depends on it, so bumping a tag makes those entries unreachable
+# at once; they are never deleted and simply expire by TTL. Writers bump only
+# the tags they touched instead of clearing the whole cache.
+
+TAG_KEY_PREFIX = "cache_tag:"
+PUBLIC_LIST_TAG = "list:public"
+CACHE_TAG_PATTERN = re.compile(r"^(demo|city|org|list):\S+$")
+
+
+def demo_tag(demo_id):
+    return f"demo:{demo_id}"
+
+
+def city_tag(city):
+    return f"city:{normalize_city_key(city)}"
+
+
+def org_tag(org_id):
+    return f"org:{org_id}"
+
+
+def demo_tags(doc, include_public_list=True):
+    """
+    Return the tags a demonstration document contributes to.
+
+    Parameters
+    ----------
+    doc : dict
+        Demonstration document; ``_id``, ``city``, ``organizers`` and
+        ``approved`` are read.
+    include_public_list : bool, optional
+        Add :data:`PUBLIC_LIST_TAG` when the demo is approved, i.e. visible
+        in public lists. Defaults to True.
+    """
+    if not doc:
+        return []
+    tags = []
+    if doc.get("_id") is not None:
+        tags.append(demo_tag(doc["_id"]))
+    if doc.get("city"):
+        tags.append(city_tag(doc["city"]))
+    for organizer in doc.get("organizers") or []:
+        if isinstance(organizer, dict) and organizer.get("organization_id"):
+            tags.append(org_tag(organizer["organization_id"]))
+    if include_public_list and doc.get("approved"):
+        tags.append(PUBLIC_LIST_TAG)
+    return tags
+
+
+def _tag_key(tag):
+    return f"{TAG_KEY_PREFIX}{tag}"
+
+
+def _new_generation():
+    # A clock instead of a plain counter: a generation evicted from the
+    # backend is re-seeded with a value no earlier entry was stored under.
+    return time.time_ns()
+
+
+def tag_generations(tags):
+    """Return ``{tag: generation}``, seeding tags that have none yet."""
+    tags = sorted(set(tags))
+    if not tags:
+        return {}
+    keys = [_tag_key(tag) for tag in tags]
+    try:
+        values = cache.get_many(*keys)
+    except Exception:
+        logger.debug("Cache tag read failed for %s", tags, exc_info=True)
+        return {}
+    generations = {}
+    for tag, key, value in zip(tags, keys, values):
+        if value is None:
+            value = _new_generation()
+            try:
+                # add() keeps a generation another worker seeded meanwhile.
+                if not cache.add(key, value, timeout=0):
+                    value = cache.get(key) or value
+            except Exception:
+                logger.debug("Cache tag seed failed for %s", tag, exc_info=True)
+        generations[tag] = value
+    return generations
+
+
+def tagged_cache_key(key, tags):
+    """
+    Qualify ``key`` with the current generations of ``tags``.
+
+    Parameters
+    ----------
+    key : str
+        Base cache key.
+    tags : iterable of str
+        Dependencies of the entry, e.g. ``demo_tags(doc)``.
+
+    Returns
+    -------
+    str
+        ``key`` plus a digest of the generations; it changes whenever one
+        of the tags is invalidated.
+    """
+    generations = tag_generations(tags)
+    if not generations:
+        return key
+    signature = ",".join(f"{tag}={generation}" for tag, generation in sorted(generations.items()))
+    return f"{key}:g={hashlib.md5(signature.encode('utf-8')).hexdigest()[:16]}"
+
+
+def invalidate_tags(*tags):
+    """Bump the generation of ``tags``, orphaning every entry that depends on them."""
+    for tag in {tag for tag in tags if tag}:
+        try:
+            cache.set(_tag_key(tag), _new_generation(), timeout=0)
+        except Exception:
+            logger.debug("Cache tag invalidation skipped for %s", tag, exc_info=True)
+
+
+def invalidate_demo(*docs):
+    """
+    Invalidate the tags of one demonstration, before and after a write.
+
+    Pass the stored document and the new values (or the merged result) so
+    a demo leaving a city, an organizer or the public list is covered too.
+    """
+    tags = []
+    for doc in docs:
+        tags.extend(demo_tags(doc))
+    invalidate_tags(*tags)
+
+
+# --- Two-tier cache -----------------------------------------------------------
+
+L1_CACHE_SIZE = 512
+L1_MAX_AGE = 30
+STALE_GRACE = 300
+REBUILD_LOCK_TIMEOUT = 30
+REBUILD_WAIT = 2.0
+
+
+class TieredCache:
+    """
+    Read-through cache with a per-process L1 in front of the shared backend.
+
+    Entries are stored in the backend (L2) as envelopes with their expiry
+    and the time the last build took, and kept ``STALE_GRACE`` seconds past
+    expiry. A read checks the bounded in-process LRU (L1) first, so a hot
+    key costs no network round trip or unpickling; L1 copies live at most
+    ``L1_MAX_AGE`` seconds so other workers' rebuilds show up quickly.
+
+    Rebuilds are single-flight: the worker that wins a backend lock rebuilds
+    while the others keep serving the expired value, or wait briefly when
+    there is none. Fresh entries are also rebuilt early with a probability
+    that grows as expiry approaches (XFetch), so popular keys are normally
+    refreshed before they expire at all.
+
+    Cached values are shared between requests and must be treated as
+    read-only.
+
+    Parameters
+    ----------
+    backend : flask_caching.Cache
+        The shared cache (L2).
+    maxsize : int
+        Number of L1 entries kept per process.
+    beta : float
+        Early refresh eagerness; 0 disables early refreshes.
+    """
+
+    def __init__(self, backend, maxsize=L1_CACHE_SIZE, max_age=L1_MAX_AGE, beta=1.0):
+        self.backend = backend
+        self.maxsize = maxsize
+        self.max_age = max_age
+        self.beta = beta
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            "l1_hits": 0,
+            "l2_hits": 0,
+            "misses": 0,
+            "stale_served": 0,
+            "early_refreshes": 0,
+            "builds": 0,
+            "build_errors": 0,
+        }
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _l1_get(self, key, now):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            entry, l1_expires = item
+            if l1_expires <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _l1_set(self, key, entry, now):
+        l1_expires = min(now + self.max_age, entry["expires"])
+        if l1_expires <= now:
+            return
+        with self._lock:
+            self._entries[key] = (entry, l1_expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _l2_get(self, key):
+        try:
+            entry = self.backend.get(key)
+        except Exception:
+            logger.debug("L2 cache read failed for %s", key, exc_info=True)
+            return None
+        # Plain values written by older code under the same key are ignored.
+        return entry if isinstance(entry, dict) and "expires" in entry else None
+
+    def _lookup(self, key, now):
+        entry = self._l1_get(key, now)
+        if entry is not None:
+            self._count("l1_hits")
+            return entry
+        entry = self._l2_get(key)
+        if entry is not None:
+            self._count("l2_hits")
+            self._l1_set(key, entry, now)
+        return entry
+
+    def _needs_refresh(self, entry, now):
+        if now >= entry["expires"]:
+            return True
+        if not self.beta or not entry.get("delta"):
+            return False
+        # XFetch: refresh early with probability rising towards expiry,
+        # scaled by how long the value takes to build.
+        early = -entry["delta"] * self.beta * math.log(random.random() or 1e-12)
+        if now + early >= entry["expires"]:
+            self._count("early_refreshes")
+            return True
+        return False
+
+    def _acquire(self, key):
+        token = uuid.uuid4().hex
+        try:
+            if self.backend.add(f"{key}:lock", token, timeout=REBUILD_LOCK_TIMEOUT):
+                return token
+        except Exception:
+            logger.debug("Rebuild lock failed for %s", key, exc_info=True)
+            return token  # no working lock: build rather than fail
+        return None
+
+    def _release(self, key, token):
+        try:
+            if self.backend.get(f"{key}:lock") == token:
+                self.backend.delete(f"{key}:lock")
+        except Exception:
+            logger.debug("Rebuild lock release failed for %s", key, exc_info=True)
+
+    def _wait_for(self, key):
+        deadline = time.monotonic() + REBUILD_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            entry = self._l2_get(key)
+            if entry is not None:
+                return entry
+        return None
+
+    def _build(self, key, builder, timeout):
+        started = time.time()
+        value = builder()
+        now = time.time()
+        entry = {"value": value, "expires": now + timeout, "delta": now - started}
+        self._count("builds")
+        try:
+            self.backend.set(key, entry, timeout=timeout + STALE_GRACE)
+        except Exception:
+            logger.debug("L2 cache write failed for %s", key, exc_info=True)
+        self._l1_set(key, entry, now)
+        return entry
+
+    def get_or_set(self, key, builder, timeout):
+        """
+        Return the cached value of ``key``, building it with ``builder()`` when needed.
+
+        Parameters
+        ----------
+        key : str
+            Cache key, typically from :func:`tagged_cache_key`.
+        builder : callable
+            Computes the value; called by at most one worker at a time.
+        timeout : int
+            Seconds the value stays fresh.
+        """
+        now = time.time()
+        entry = self._lookup(key, now)
+        if entry is not None and not self._needs_refresh(entry, now):
+            return entry["value"]
+        if entry is None:
+            self._count("misses")
+
+        token = self._acquire(key)
+        if token is None:
+            if entry is not None:
+                if now >= entry["expires"]:
+                    self._count("stale_served")
+                return entry["value"]
+            entry = self._wait_for(key)
+            if entry is not None:
+                return entry["value"]
+        try:
+            return self._build(key, builder, timeout)["value"]
+        except Exception:
+            self._count("build_errors")
+            if entry is None:
+                raise
+            logger.exception("Cache rebuild failed for %s; serving the previous value", key)
+            return entry["value"]
+        finally:
+            if token is not None:
+                self._release(key, token)
+
+    def peek(self, key):
+        """Return the L1 value of ``key`` without touching the backend, or None."""
+        entry = self._l1_get(key, time.time())
+        return entry["value"] if entry is not None else None
+
+    def clear_local(self):
+        """Drop this process's L1 entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss/rebuild counters, L1 size and hit rate."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["size"] = len(self._entries)
+        stats["maxsize"] = self.maxsize
+        reads = stats["l1_hits"] + stats["l2_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["l1_hits"] + stats["l2_hits"]) / reads, 4) if reads else 0.0
+        return stats
+
+
+tiered_cache = TieredCache(cache)
+
+
+# --- Pre-serialised JSON responses -------------------------------------------
+
+
+def json_cache_entry(payload):
+    """Encode ``payload`` once as the app's JSON and hash it for an ETag."""
+    body = current_app.json.dumps(payload).encode("utf-8")
+    return {"body": body, "etag": hashlib.sha256(body).hexdigest()[:32]}
+
+
+def cached_json_response(key, builder, timeout, cached_field=None):
+    """
+    Serve the JSON of ``builder()`` from :data:`tiered_cache` as stored bytes.
+
+    Entries hold the encoded body and its hash, so a hit is returned without
+    copying or re-encoding. The hash is also kept under ``<key>:etag``; a
+    request whose ``If-None-Match`` matches it gets a 304 before the body
+    is loaded or anything is queried.
+
+    Parameters
+    ----------
+    key : str
+        Cache key, typically from :func:`tagged_cache_key`.
+    builder : callable
+        Returns the JSON-serialisable payload.
+    timeout : int
+        Seconds the payload stays fresh.
+    cached_field : str, optional
+        Payload field set to True in the cached body and to False in the
+        response of the request that built it.
+
+    Returns
+    -------
+    flask.Response
+    """
+    etag_key = f"{key}:etag"
+    known = tiered_cache.peek(key)
+    try:
+        etag = known["etag"] if known else cache.get(etag_key)
+    except Exception:
+        etag = None
+    if etag and request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+
+    built = {}
+
+    def _build():
+        payload = builder()
+        built["payload"] = payload
+        entry = json_cache_entry(dict(payload, **{cached_field: True}) if cached_field else payload)
+        try:
+            cache.set(etag_key, entry["etag"], timeout=timeout + STALE_GRACE)
+        except Exception:
+            logger.debug("ETag write failed for %s", key, exc_info=True)
+        return entry
+
+    entry = tiered_cache.get_or_set(key, _build, timeout)
+    body = entry["body"]
+    if cached_field and "payload" in built:
+        body = json_cache_entry(dict(built["payload"], **{cached_field: False}))["body"]
+    response = current_app.response_class(body, mimetype="application/json")
+    # Weak: the cached_field flag differs between otherwise equal bodies.
+    response.set_etag(entry["etag"], weak=True)
+    response.headers["X-Cache"] = "MISS" if built else "HIT"
+    return response.make_conditional(request)
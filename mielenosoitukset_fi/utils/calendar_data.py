@@ -0,0 +1,186 @@
+"""
+Calendar data layer for the public month and year views.
+
+Demonstrations are read per month with a ``date`` range query and the
+:mod:`~mielenosoitukset_fi.utils.demo_summary` projection, grouped into
+``{day: [DemoSummary, ...]}`` buckets and cached per
+(year, month). Write paths call :func:`invalidate_calendar_months` with the
+affected dates so a bucket is rebuilt only when a demo inside it changes.
+"""
+
+from datetime import date, datetime
+
+from mielenosoitukset_fi.utils.cache import cache
+from mielenosoitukset_fi.utils.database import DEMO_FILTER
+from mielenosoitukset_fi.utils.demo_summary import DemoSummary, summary_projection
+from mielenosoitukset_fi.utils.logger import logger
+
+CALENDAR_CACHE_TIMEOUT = 60 * 60  # invalidated on writes, TTL is only a safety net
+_CACHE_KEY_TEMPLATE = "calendar_month:v2:{year:04d}-{month:02d}"
+
+
+def calendar_cache_key(year, month):
+    """Return the cache key holding the day buckets for ``year``/``month``."""
+    return _CACHE_KEY_TEMPLATE.format(year=year, month=month)
+
+
+def month_date_range(year, month):
+    """
+    Return the half-open ISO date range covering a month.
+
+    Parameters
+    ----------
+    year : int
+    month : int
+
+    Returns
+    -------
+    tuple of str
+        ``("YYYY-MM-01", "YYYY-MM-01" of the following month)``
+    """
+    start = f"{year:04d}-{month:02d}-01"
+    if month == 12:
+        end = f"{year + 1:04d}-01-01"
+    else:
+        end = f"{year:04d}-{month + 1:02d}-01"
+    return start, end
+
+
+def _fetch_buckets(db, start, end):
+    """Return ``{(year, month): {day: [DemoSummary, ...]}}`` for ``start <= date < end``."""
+    query = {**DEMO_FILTER, "date": {"$gte": start, "$lt": end}}
+    cursor = db.demonstrations.find(query, summary_projection(with_description=True)).sort(
+        [("date", 1), ("start_time", 1)]
+    )
+    buckets = {}
+    # The calendar templates show a description teaser in tooltips.
+    for demo in DemoSummary.from_cursor(cursor, with_description=True):
+        parsed = _year_month_day(demo.date)
+        if not parsed:
+            continue
+        year, month, day = parsed
+        buckets.setdefault((year, month), {}).setdefault(day, []).append(demo)
+    return buckets
+
+
+def get_month_buckets(db, year, month):
+    """
+    Return the demonstrations of one month grouped by day of month.
+
+    Parameters
+    ----------
+    db : pymongo.database.Database
+    year : int
+    month : int
+
+    Returns
+    -------
+    dict
+        ``{day: [DemoSummary, ...]}`` sorted by date and start time.
+    """
+    key = calendar_cache_key(year, month)
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+
+    start, end = month_date_range(year, month)
+    month_buckets = _fetch_buckets(db, start, end).get((year, month), {})
+    _cache_set_many({key: month_buckets})
+    return month_buckets
+
+
+def get_year_buckets(db, year):
+    """
+    Return day buckets for every month of ``year``.
+
+    Cached months are reused; the missing ones are loaded with a single range
+    query spanning only those months.
+
+    Returns
+    -------
+    dict
+        ``{month: {day: [demo, ...]}}`` for months 1-12.
+    """
+    keys = {month: calendar_cache_key(year, month) for month in range(1, 13)}
+    cached = _cache_get_many(list(keys.values()))
+    result = {}
+    missing = []
+    for month, key in keys.items():
+        value = cached.get(key)
+        if value is None:
+            missing.append(month)
+        else:
+            result[month] = value
+
+    if missing:
+        start, _ = month_date_range(year, min(missing))
+        _, end = month_date_range(year, max(missing))
+        fetched = _fetch_buckets(db, start, end)
+        to_cache = {}
+        for month in missing:
+            result[month] = fetched.get((year, month), {})
+            to_cache[keys[month]] = result[month]
+        _cache_set_many(to_cache)
+
+    return result
+
+
+def invalidate_calendar_months(*date_values):
+    """
+    Drop the cached buckets for the months containing the given dates.
+
+    Accepts ISO date strings, ``date``/``datetime`` objects or ``None``
+    (ignored), so callers can pass both the previous and the new date of an
+    edited demonstration.
+    """
+    keys = set()
+    for value in date_values:
+        parsed = _year_month_day(value)
+        if parsed:
+            keys.add(calendar_cache_key(parsed[0], parsed[1]))
+    if not keys:
+        return
+    # Delete one key at a time: some backends stop ``delete_many`` at the
+    # first key that is not cached.
+    for key in keys:
+        try:
+            cache.delete(key)
+        except Exception:
+            logger.debug("Calendar cache invalidation skipped for %s", key, exc_info=True)
+
+
+def _year_month_day(value):
+    if isinstance(value, datetime):
+        return value.year, value.month, value.day
+    if isinstance(value, date):
+        return value.year, value.month, value.day
+    if isinstance(value, str):
+        try:
+            parsed = datetime.strptime(value.strip()[:10], "%Y-%m-%d")
+        except ValueError:
+            return None
+        return parsed.year, parsed.month, parsed.day
+    return None
+
+
+def _cache_get(key):
+    try:
+        return cache.get(key)
+    except Exception:
+        logger.debug("Calendar cache read failed for %s", key, exc_info=True)
+        return None
+
+
+def _cache_get_many(keys):
+    try:
+        return dict(zip(keys, cache.get_many(*keys)))
+    except Exception:
+        logger.debug("Calendar cache read failed for %s", keys, exc_info=True)
+        return {}
+
+
+def _cache_set_many(mapping):
+    try:
+        cache.set_many(mapping, timeout=CALENDAR_CACHE_TIMEOUT)
+    except Exception:
+        logger.debug("Calendar cache write failed for %s", list(mapping), exc_info=True)
@@ -1,4 +1,9 @@
+from datetime import date
+
+from mielenosoitukset_fi.utils.cache import cache
 from mielenosoitukset_fi.utils.cities import CITY_KEY_TO_NAME, normalize_city_key
+from mielenosoitukset_fi.utils.database import DEMO_FILTER
+from mielenosoitukset_fi.utils.logger import logger
 from mielenosoitukset_fi.utils.time_utils import utcnow
 
 
@@ -24,6 +29,8 @@ DEFAULT_ACTIVE_CITY_KEYS = {
     for city in DEFAULT_ACTIVE_CITY_NAMES
     if normalize_city_key(city) in CITY_KEY_TO_NAME
 }
+CITY_STATS_CACHE_TIMEOUT = 60  # seconds; counts only feed listings
+_CITY_STATS_CACHE_KEY = "city_stats:v1:{today}"
 
 
 def enabled_city_settings(db):
@@ -59,6 +66,101 @@ def enabled_city_names(db):
     return sorted(names)
 
 
+def _city_count_group():
+    # Legacy documents without ``city_key`` are grouped by their lowercased
+    # city name and normalised in Python.
+    return {
+        "$group": {
+            "_id": {"$ifNull": ["$city_key", {"$toLower": "$city"}]},
+            "count": {"$sum": 1},
+        }
+    }
+
+
+def _aggregate_city_counts(db, today):
+    pipeline = [
+        {"$match": {**DEMO_FILTER, "city": {"$exists": True, "$ne": ""}}},
+        {
+            "$facet": {
+                "total": [_city_count_group()],
+                "today": [{"$match": {"date": today}}, _city_count_group()],
+            }
+        },
+    ]
+    facets = next(iter(db.demonstrations.aggregate(pipeline)), {})
+
+    counts = {}
+    for facet in ("total", "today"):
+        for row in facets.get(facet, []):
+            city_key = normalize_city_key(row.get("_id"))
+            if city_key not in CITY_KEY_TO_NAME:
+                continue
+            bucket = counts.setdefault(city_key, {"total": 0, "today": 0})
+            bucket[facet] += row.get("count", 0)
+    return counts
+
+
+def city_stats(db):
+    """
+    Return demonstration counts for every public city.
+
+    Cities are included when they are enabled or have at least one visible
+    demonstration. Total and today's counts for all cities come from a single
+    aggregation and are cached for ``CITY_STATS_CACHE_TIMEOUT`` seconds.
+
+    Parameters
+    ----------
+    db : pymongo.database.Database
+
+    Returns
+    -------
+    list of dict
+        ``{"key", "name", "demo_count", "today_count"}`` sorted by city name.
+        Callers must not mutate the returned rows.
+    """
+    today = date.today().isoformat()
+    cache_key = _CITY_STATS_CACHE_KEY.format(today=today)
+    try:
+        cached = cache.get(cache_key)
+    except Exception:
+        logger.debug("City stats cache read failed", exc_info=True)
+        cached = None
+    if cached is not None:
+        return cached
+
+    counts = _aggregate_city_counts(db, today)
+    enabled_keys = {
+        normalize_city_key(name)
+        for name in enabled_city_names(db)
+        if normalize_city_key(name) in CITY_KEY_TO_NAME
+    }
+    stats = [
+        {
+            "key": city_key,
+            "name": CITY_KEY_TO_NAME[city_key],
+            "demo_count": counts.get(city_key, {}).get("total", 0),
+            "today_count": counts.get(city_key, {}).get("today", 0),
+        }
+        for city_key in sorted(
+            enabled_keys | {key for key, value in counts.items() if value["total"]},
+            key=lambda key: CITY_KEY_TO_NAME[key],
+        )
+    ]
+    try:
+        cache.set(cache_key, stats, timeout=CITY_STATS_CACHE_TIMEOUT)
+    except Exception:
+        logger.debug("City stats cache write failed", exc_info=True)
+    return stats
+
+
+def invalidate_city_stats():
+    """Drop today's cached :func:`city_stats` result."""
+    try:
+        cache.delete(_CITY_STATS_CACHE_KEY.format(today=date.today().isoformat()))
+    except Exception:
+        logger.debug("City stats cache invalidation skipped", exc_info=True)
+
+
 def upsert_city_setting(db, city_key, enabled, actor_id=None):
     city_key = normalize_city_key(city_key)
     if city_key not in CITY_KEY_TO_NAME:
@@ -82,4 +184,5 @@ def upsert_city_setting(db, city_key, enabled, actor_id=None):
         },
         upsert=True,
     )
+    invalidate_city_stats()
     return payload
@@ -12,6 +12,11 @@ from mielenosoitukset_fi.utils.validators import (
     valid_event_type,
     return_exists,
 )
+from mielenosoitukset_fi.utils.admin_tasks import sync_demo_task_doc, sync_demo_tasks
+from mielenosoitukset_fi.utils.cache import invalidate_demo
+from mielenosoitukset_fi.utils.calendar_data import invalidate_calendar_months
+from mielenosoitukset_fi.utils.demo_identifiers import invalidate_demo_identifiers, resolve_demo
+from mielenosoitukset_fi.utils.demo_summary import derived_fields
 from .RepeatSchedule import RepeatSchedule
 from bson import ObjectId
 from mielenosoitukset_fi.utils.time_utils import utcnow
@@ -167,6 +172,7 @@ class Demonstration(BaseModel):
         last_modified=None,
         _id: ObjectId = None,
         description: str = None,
+        description_html: str = None,
         _dont_override: bool = False,
         _rejected: bool = False,
         cover_source: str = None,
@@ -248,6 +254,8 @@ class Demonstration(BaseModel):
             Unique ID for the demonstration.
         description : str, optional
             Description of the event.
+        description_html : str, optional
+            Sanitised HTML of ``description``; recomputed by :meth:`save`.
         """
 
         #if issubclass(type(self), Demonstration) and type(self) is not Demonstration:
@@ -275,6 +283,7 @@ class Demonstration(BaseModel):
 
         self.title = title
         self.description = description
+        self.description_html = description_html
 
         # Removed direct assignment for date, start_time, end_time
 
@@ -285,20 +294,8 @@ class Demonstration(BaseModel):
         self.latitude = latitude
         self.longitude = longitude
         
-        if parent:
-            try:
-                _parent = _get_db()["recu_demos"].find_one({"_id": ObjectId(parent)})
-            except Exception as e:
-                print(f"Error fetching parent demonstration: {e}")
-
-            if not _parent:
-                print(f"Parent demonstration not found")
-                self.repeat_schedule = RepeatSchedule()
-            else:
-                self.parent_object = _parent
-                self.repeat_schedule = RepeatSchedule.from_dict(self.parent_object.get("repeat_schedule", None))
-                
-                
+        # parent_object / repeat_schedule are resolved lazily from self.parent;
+        # see the properties below and from_dicts for batch prefetching.
 
         self.event_type = event_type_convertor(event_type or "STAY_STILL")
 
@@ -344,8 +341,10 @@ class Demonstration(BaseModel):
         self.recurs = recurs or False
         
         if self.parent:
+            # Persist the flag once; re-saving every child on load is not needed.
+            if not self.recurs:
+                self.save_flag = True
             self.recurs = True
-            self.save_flag = True
             
         if _rejected == True:
             self.accepted = False
@@ -427,6 +426,48 @@ class Demonstration(BaseModel):
         )  # Validate required fields
 
 
+    @property
+    def parent_object(self):
+        """The parent ``recu_demos`` document, fetched on first access (None if missing)."""
+        if "_parent_object" not in self.__dict__:
+            self._parent_object = self._fetch_parent()
+        return self._parent_object
+
+    @parent_object.setter
+    def parent_object(self, value):
+        self._parent_object = value
+        self.__dict__.pop("_repeat_schedule", None)
+
+    @property
+    def repeat_schedule(self):
+        """The parent's :class:`RepeatSchedule`, resolved on first access."""
+        if "_repeat_schedule" not in self.__dict__:
+            if not self.__dict__.get("parent"):
+                return None
+            parent = self.parent_object
+            if parent is None:
+                self._repeat_schedule = RepeatSchedule()
+            else:
+                self._repeat_schedule = RepeatSchedule.from_dict(parent.get("repeat_schedule", None))
+        return self._repeat_schedule
+
+    @repeat_schedule.setter
+    def repeat_schedule(self, value):
+        self._repeat_schedule = value
+
+    def _fetch_parent(self):
+        parent = self.__dict__.get("parent")
+        if not parent:
+            return None
+        try:
+            doc = _get_db()["recu_demos"].find_one({"_id": ObjectId(parent)})
+        except Exception as e:
+            logger.error(f"Error fetching parent demonstration {parent}: {e}")
+            return None
+        if not doc:
+            logger.warning(f"Parent demonstration {parent} not found")
+        return doc
+
     def _format_date(self):
         if self.date:
             try:
@@ -463,7 +504,7 @@ class Demonstration(BaseModel):
 
         self.aliases = aliases
 
-    def merge(self, id_of_other_demo):
+    def merge(self, id_of_other_demo, other_demo=None):
         """
         Merge another demonstration into this one.
 
@@ -476,6 +517,8 @@ class Demonstration(BaseModel):
         ----------
         id_of_other_demo : str or ObjectId
             The ID of the demonstration to merge into this one.
+        other_demo : Demonstration, optional
+            The already loaded demonstration with that ID; skips the lookup.
 
         Returns
         -------
@@ -495,13 +538,14 @@ class Demonstration(BaseModel):
         >>> demo = Demonstration(...)
         >>> demo.merge("60f8e1e7a1b9c9b8f6b3f3b2") # Merge the demonstration with ID "60f8e1e7a1b9c9b8f6b3f3b2" into the current demonstration.
         """
-        other_demo_data = _get_db()["demonstrations"].find_one(
-            {"_id": ObjectId(id_of_other_demo)}
-        )
-        if not other_demo_data:
-            raise ValueError(f"Demonstration with id {id_of_other_demo} not found.")
+        if other_demo is None:
+            other_demo_data = _get_db()["demonstrations"].find_one(
+                {"_id": ObjectId(id_of_other_demo)}
+            )
+            if not other_demo_data:
+                raise ValueError(f"Demonstration with id {id_of_other_demo} not found.")
 
-        other_demo = Demonstration.from_dict(other_demo_data)
+            other_demo = Demonstration.from_dict(other_demo_data)
 
         # Update fields with non-None values from the other demonstration
         for key, value in other_demo.to_dict().items():
@@ -516,6 +560,7 @@ class Demonstration(BaseModel):
             {"_id": ObjectId(id_of_other_demo)},
             {"$set": {"merged_into": self._id, "hide": True}},
         )
+        sync_demo_tasks(_get_db(), id_of_other_demo)
 
         self.aliases.append(
             ObjectId(id_of_other_demo)
@@ -585,7 +630,7 @@ class Demonstration(BaseModel):
         # TODO: Implement intelligent merging of fields
         pass
 
-    def to_dict(self, json=False):
+    def to_dict(self, json=False, resolve_parent=True):
         """
         Convert instance to dictionary, including organizers as dictionaries.
 
@@ -593,6 +638,9 @@ class Demonstration(BaseModel):
         ----------
         json : bool, optional
             If True, convert the instance to a JSON-compatible dictionary. Defaults to False.
+        resolve_parent : bool, optional
+            If False, leave out ``repeat_schedule`` instead of loading the
+            parent to build it. Defaults to True.
 
         Returns
         -------
@@ -604,6 +652,8 @@ class Demonstration(BaseModel):
         BaseModel.to_dict : Convert the instance to a dictionary.
         """
         data = super().to_dict(json=json)
+        data.pop("_parent_object", None)
+        data.pop("_repeat_schedule", None)
         data["organizers"] = [
             org.to_dict(json=json) if isinstance(org, Organizer) else org
             for org in self.organizers
@@ -631,8 +681,10 @@ class Demonstration(BaseModel):
             logger.error(f"Error converting last_modified to dict: {e}")
         data.pop("save_flag", None)  # Remove save_flag from the dictionary representation
         data.pop("_dont_override", None)
+        if not resolve_parent:
+            return data
         try:
-            data["repeat_schedule"] = self.repeat_schedule.to_dict() if hasattr(self, "repeat_schedule") and self.repeat_schedule else None
+            data["repeat_schedule"] = self.repeat_schedule.to_dict() if self.repeat_schedule else None
         except Exception as e:
             data["repeat_schedule"] = None
             logger.error(f"Error converting repeat_schedule to dict: {e}")
@@ -700,7 +752,8 @@ class Demonstration(BaseModel):
         self.last_modified = utcnow()
 
         # Get the database instance from DatabaseManager
-        data = self.to_dict()  # Convert the object to a dictionary
+        # repeat_schedule is not stored on demonstrations; skip the parent load.
+        data = self.to_dict(resolve_parent=False)
 
         _data = copy.deepcopy(data)
         
@@ -711,10 +764,16 @@ class Demonstration(BaseModel):
         
         data.pop("repeat_schedule", None)  # Remove repeat_schedule if present
         data.pop("parent_object", None)  # Remove parent_object if present
+        data.update(derived_fields(data))  # Display fields, so readers skip parsing
         
         # Check if the demonstration already exists in the database
         db = _get_db()
-        if db["demonstrations"].find_one({"_id": self._id}):
+        existing = db["demonstrations"].find_one(
+            {"_id": self._id}, {"date": 1, "city": 1, "organizers": 1, "approved": 1}
+        )
+        invalidate_calendar_months(existing.get("date") if existing else None, self.date)
+        invalidate_demo_identifiers(self._id, identifiers=[self.slug, *data["aliases"]])
+        if existing:
             # Update existing entry
             result = db["demonstrations"].replace_one({"_id": self._id}, data)
             if result.modified_count:
@@ -731,6 +790,9 @@ class Demonstration(BaseModel):
             print(
                 "Demonstration saved successfully."
             )  # TODO: #191 Use utils.logger instead of print
+        # After the write, so a concurrent miss cannot re-cache the old document.
+        invalidate_demo(existing, data)
+        sync_demo_task_doc(db, {**data, "_id": self._id})
     
     @classmethod
     def load_by_id(cls, demo_id: str) -> "Demonstration":
@@ -752,42 +814,12 @@ class Demonstration(BaseModel):
         ValueError
             If the demonstration with the provided id/number/slug is not found.
         """
-        # Try ObjectId lookup first; fall back to alias lookup with the same id
-        obj_id = None
-        try:
-            if ObjectId.is_valid(str(demo_id)):
-                obj_id = ObjectId(demo_id)
-                data = _get_db()["demonstrations"].find_one({"_id": obj_id})
-                if data:
-                    logger.info("Found")
-                    return cls.from_dict(data)
-        except Exception as e:
-            logger.debug(f"ObjectId lookup failed for '{demo_id}': {e}")
-            obj_id = None
-
-        if obj_id:
-            alias_data = _get_db()["demonstrations"].find_one({"aliases": {"$in": [obj_id]}})
-            if alias_data:
-                logger.info("Found via alias id lookup")
-                return cls.from_dict(alias_data)
-
-        # Try running_number lookup
-        try:
-            num = int(demo_id)
-            data = _get_db()["demonstrations"].find_one({"running_number": num})
-            if data:
-                return cls.from_dict(data)
-        except ValueError:
-            logger.debug(f"Running number lookup failed for '{demo_id}'")
-        except Exception as e:
-            pass
-
-        # Try slug lookup
-        data = _get_db()["demonstrations"].find_one({"slug": demo_id})
+        # One $or query across _id, aliases, running_number and slug, with
+        # the resolved _id remembered for the next request.
+        data = resolve_demo(_get_db()["demonstrations"], demo_id)
         if data:
             return cls.from_dict(data)
 
-        # Nothing found
         raise ValueError(f"Demonstration with id/slug/number '{demo_id}' not found.")
 
     @classmethod
@@ -814,6 +846,7 @@ class Demonstration(BaseModel):
             # Basic Info
             title=get("title"),
             description=get("description"),
+            description_html=get("description_html"),
             date=get("date"),
             start_time=get("start_time"),
             end_time=get("end_time"),
@@ -871,6 +904,45 @@ class Demonstration(BaseModel):
             cancelled_by=get("cancelled_by"),
         )
 
+    @classmethod
+    def from_dicts(cls, docs):
+        """
+        Create Demonstration instances for many documents at once.
+
+        Parents referenced by the documents are fetched with a single ``$in``
+        query and attached, so accessing ``parent_object``/``repeat_schedule``
+        on the results costs no further queries.
+
+        Parameters
+        ----------
+        docs : iterable of dict
+            Demonstration documents.
+
+        Returns
+        -------
+        list of Demonstration
+        """
+        docs = list(docs)
+        parent_ids = {
+            ObjectId(doc["parent"])
+            for doc in docs
+            if doc.get("parent") and ObjectId.is_valid(str(doc["parent"]))
+        }
+        parents = {}
+        if parent_ids:
+            parents = {
+                parent["_id"]: parent
+                for parent in _get_db()["recu_demos"].find({"_id": {"$in": list(parent_ids)}})
+            }
+
+        demos = []
+        for doc in docs:
+            demo = cls.from_dict(doc)
+            if demo.parent and ObjectId.is_valid(str(demo.parent)):
+                demo.parent_object = parents.get(ObjectId(demo.parent))
+            demos.append(demo)
+        return demos
+
 
     def _to_iso8601_date(self, date_str: str) -> str:
         """
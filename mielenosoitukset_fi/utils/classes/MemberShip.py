@@ -130,6 +130,10 @@ class MemberShip(BaseModel):
             upsert=True
         )
 
+        from mielenosoitukset_fi.utils.principal import bump_permissions_version  # avoids an import cycle
+
+        bump_permissions_version(db, self.user_id)
+
     def insert_to_db(self):
         """Alias for save()."""
         self.save()
@@ -3,6 +3,7 @@ from bson import ObjectId
 
 from mielenosoitukset_fi.utils.classes.BaseModel   import BaseModel
 from mielenosoitukset_fi.utils.classes.MemberShip  import MemberShip as Membership
+from mielenosoitukset_fi.utils.cache               import invalidate_tags, org_tag
 from mielenosoitukset_fi.utils.database            import get_database_manager
 from mielenosoitukset_fi.utils.classes.Organizer   import BaseEntity
 
@@ -120,6 +121,7 @@ class Organization(BaseEntity):
         DB["organizations"].update_one(
             {"_id": self._id}, {"$set": self.to_dict()}, upsert=True
         )
+        invalidate_tags(org_tag(self._id))
 
     @classmethod
     def from_dict(cls, data: dict):
@@ -18,6 +18,8 @@ from flask import url_for
 
 from mielenosoitukset_fi.database_manager import DatabaseManager
 from mielenosoitukset_fi.emailer.EmailSender import EmailSender
+from mielenosoitukset_fi.utils.cache import invalidate_demo
+from mielenosoitukset_fi.utils.calendar_data import invalidate_calendar_months
 from mielenosoitukset_fi.utils.logger import logger
 from mielenosoitukset_fi.utils.notifications import create_notification
 from mielenosoitukset_fi.utils.classes import Case
@@ -153,6 +155,7 @@ def request_cancellation_case(
     update_doc = {
         "cancellation_requested": True,
         "cancellation_requested_at": utcnow(),
+        "last_modified": utcnow(),
         "cancellation_request_source": source,
         "cancellation_requested_by": {
             "email": requester_email,
@@ -174,7 +177,7 @@ def request_cancellation_case(
             submitter={"email": requester_email},
             meta={"source": source, "official_contact": official_contact, "reason": reason},
         )
-        mongo.demonstrations.update_one({"_id": demo_id}, {"$set": {"cancellation_case_id": case._id}})
+        mongo.demonstrations.update_one({"_id": demo_id}, {"$set": {"cancellation_case_id": case._id, "last_modified": utcnow()}})
 
     if case:
         case._add_history_entry(
@@ -284,6 +287,7 @@ def cancel_demo(
     update_doc = {
         "cancelled": True,
         "cancelled_at": utcnow(),
+        "last_modified": utcnow(),
         "cancelled_by": cancelled_by,
         "cancellation_requested": False,
     }
@@ -291,6 +295,8 @@ def cancel_demo(
         update_doc["cancellation_reason"] = reason
 
     mongo.demonstrations.update_one({"_id": demo_id}, {"$set": update_doc})
+    invalidate_calendar_months(current_demo.get("date"))
+    invalidate_demo(current_demo)
 
     case = None
     if create_case:
@@ -302,7 +308,7 @@ def cancel_demo(
                 demo_id=demo_id,
                 meta={"reason": reason, "cancelled_by": cancelled_by},
             )
-            mongo.demonstrations.update_one({"_id": demo_id}, {"$set": {"cancellation_case_id": case._id}})
+            mongo.demonstrations.update_one({"_id": demo_id}, {"$set": {"cancellation_case_id": case._id, "last_modified": utcnow()}})
 
         if case:
             case._add_history_entry(
@@ -0,0 +1,205 @@
+"""
+Streaming bulk export of public demonstrations.
+
+Data partners used to page through the list APIs, paying a count and a
+``skip`` per page. :func:`iter_export` instead walks a single MongoDB cursor
+with a fixed projection and ``batch_size`` and yields encoded chunks, so a
+streamed response holds at most one batch in memory however large the
+archive is.
+
+Rows are ordered by ``(date, start_time, _id)`` (the keyset index) and carry
+``last_modified``, so consumers can sync incrementally with
+``updated_since``. Incremental exports end with tombstone rows
+(``deleted: true``) for demonstrations that left the exported set since then:
+hidden, rejected, unapproved or otherwise no longer matching, or deleted
+outright, which writers record with :func:`record_deleted_demos`.
+"""
+
+import csv
+import io
+import itertools
+import json
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from mielenosoitukset_fi.utils.keyset import KEYSET_SORT
+from mielenosoitukset_fi.utils.time_utils import utcnow
+
+EXPORT_BATCH_SIZE = 500
+
+# One ``{_id, deleted_at}`` document per deleted demonstration.
+DELETED_COLLECTION = "deleted_demonstrations"
+
+# Column order of the CSV export; NDJSON rows use the same keys.
+EXPORT_FIELDS = (
+    "_id",
+    "title",
+    "date",
+    "start_time",
+    "end_time",
+    "city",
+    "address",
+    "latitude",
+    "longitude",
+    "tags",
+    "event_type",
+    "cancelled",
+    "slug",
+    "running_number",
+    "last_modified",
+    "deleted",
+)
+EXPORT_PROJECTION = {field: 1 for field in EXPORT_FIELDS if field != "deleted"}
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def parse_updated_since(value):
+    """
+    Parse an ``updated_since`` argument to a naive UTC datetime.
+
+    Accepts ISO 8601 dates and datetimes; offsets are converted to UTC and
+    naive values are taken as UTC, matching the stored ``last_modified``.
+
+    Raises
+    ------
+    ValueError
+        ``value`` is not ISO 8601.
+    """
+    parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def with_updated_since(query, updated_since):
+    """Return ``query`` narrowed to documents modified at or after ``updated_since``."""
+    if updated_since is None:
+        return query
+    return {"$and": [query, {"last_modified": {"$gte": updated_since}}]}
+
+
+def _iso(value):
+    return value.isoformat() + "Z" if isinstance(value, datetime) else value
+
+
+def export_row(doc):
+    """Return the JSON-ready export row of a demonstration document."""
+    row = {field: doc.get(field) for field in EXPORT_FIELDS}
+    row["_id"] = str(doc["_id"])
+    row["tags"] = list(row["tags"] or [])
+    row["cancelled"] = bool(row["cancelled"])
+    row["last_modified"] = _iso(row["last_modified"])
+    row["deleted"] = False
+    return row
+
+
+def tombstone_row(demo_id, last_modified):
+    """Return the export row telling a consumer to drop ``demo_id``."""
+    row = dict.fromkeys(EXPORT_FIELDS)
+    row.update({"_id": str(demo_id), "tags": [], "last_modified": _iso(last_modified), "deleted": True})
+    return row
+
+
+def record_deleted_demos(db, *demo_ids):
+    """Remember deleted demonstrations so incremental exports can tombstone them."""
+    now = utcnow()
+    ops = [
+        UpdateOne({"_id": ObjectId(str(demo_id))}, {"$set": {"deleted_at": now}}, upsert=True)
+        for demo_id in demo_ids
+        if demo_id and ObjectId.is_valid(str(demo_id))
+    ]
+    if ops:
+        db[DELETED_COLLECTION].bulk_write(ops, ordered=False)
+
+
+def iter_tombstones(db, query, updated_since, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Yield tombstone rows for demonstrations that left ``query`` since ``updated_since``.
+
+    Covers documents modified since then that no longer match ``query``
+    (hidden, rejected, moved out of the filters, ...) and demonstrations
+    deleted since then. A consumer may get tombstones for rows it never
+    had; dropping an unknown ``_id`` is a no-op.
+    """
+    left = {"$and": [{"last_modified": {"$gte": updated_since}}, {"$nor": [query]}]}
+    with db.demonstrations.find(left, {"last_modified": 1}).sort("_id", 1).batch_size(batch_size) as cursor:
+        for doc in cursor:
+            yield tombstone_row(doc["_id"], doc.get("last_modified"))
+    deleted = db[DELETED_COLLECTION].find({"deleted_at": {"$gte": updated_since}}).sort("deleted_at", 1)
+    with deleted.batch_size(batch_size) as cursor:
+        for doc in cursor:
+            yield tombstone_row(doc["_id"], doc["deleted_at"])
+
+
+def _ndjson_line(row):
+    return json.dumps(row, ensure_ascii=False, default=str) + "\n"
+
+
+def _csv_writer():
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def line(values):
+        writer.writerow(values)
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
+
+    return line
+
+
+def iter_export(collection, query, fmt="ndjson", batch_size=EXPORT_BATCH_SIZE, tombstones=()):
+    """
+    Yield the export of ``query`` as encoded chunks.
+
+    Parameters
+    ----------
+    collection : pymongo.collection.Collection
+    query : dict
+    fmt : str, optional
+        A key of :data:`EXPORT_FORMATS`. Defaults to ``"ndjson"``.
+    batch_size : int, optional
+        Documents per MongoDB batch and per yielded chunk.
+    tombstones : iterable of dict, optional
+        Rows written after the matching documents, e.g. from
+        :func:`iter_tombstones`.
+
+    Yields
+    ------
+    bytes
+        UTF-8 text; the CSV header comes first.
+    """
+    if fmt == "csv":
+        line = _csv_writer()
+        yield line(EXPORT_FIELDS).encode("utf-8")
+
+        def encode(row):
+            row["tags"] = ",".join(str(tag) for tag in row["tags"])
+            return line([row[field] for field in EXPORT_FIELDS])
+
+    else:
+        encode = _ndjson_line
+
+    cursor = (
+        collection.find(query, EXPORT_PROJECTION)
+        .sort(KEYSET_SORT)
+        .batch_size(batch_size)
+    )
+    try:
+        chunk = []
+        for row in itertools.chain((export_row(doc) for doc in cursor), tombstones):
+            chunk.append(encode(row))
+            if len(chunk) >= batch_size:
+                yield "".join(chunk).encode("utf-8")
+                chunk = []
+        if chunk:
+            yield "".join(chunk).encode("utf-8")
+    finally:
+        cursor.close()
@@ -0,0 +1,184 @@
+"""
+Resolve public demonstration identifiers to documents.
+
+A demonstration can be addressed by its ``_id``, by an old id kept in
+``aliases`` after a merge, by ``running_number`` or by ``slug``. The resolver
+matches all of them with a single ``$or`` query and remembers which
+canonical ``_id`` each identifier resolved to in a bounded, per-process LRU
+map, so repeated requests for the same URL become one ``_id`` point read.
+
+Cached mappings are re-validated against the fetched document, which keeps
+other worker processes correct after a slug or alias moves; writers in this
+process call :func:`invalidate_demo_identifiers` to drop them eagerly.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from bson import ObjectId
+
+IDENTIFIER_CACHE_SIZE = 4096
+
+
+class IdentifierCache:
+    """
+    Thread-safe LRU map from identifier string to canonical ``_id``.
+
+    Parameters
+    ----------
+    maxsize : int
+        Number of identifiers kept; the least recently used is evicted.
+    """
+
+    def __init__(self, maxsize=IDENTIFIER_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "stale": 0, "invalidations": 0}
+        self._lookups = 0
+        self._lookup_seconds = 0.0
+
+    def get(self, identifier):
+        with self._lock:
+            demo_id = self._entries.get(identifier)
+            if demo_id is None:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(identifier)
+            self._counters["hits"] += 1
+            return demo_id
+
+    def set(self, identifier, demo_id):
+        with self._lock:
+            self._entries[identifier] = demo_id
+            self._entries.move_to_end(identifier)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, identifier, stale=False):
+        with self._lock:
+            if self._entries.pop(identifier, None) is not None and stale:
+                self._counters["stale"] += 1
+
+    def invalidate(self, demo_ids=(), identifiers=()):
+        """Drop every identifier pointing at ``demo_ids`` plus ``identifiers``."""
+        demo_ids = set(demo_ids)
+        with self._lock:
+            doomed = {key for key, value in self._entries.items() if value in demo_ids}
+            doomed.update(key for key in identifiers if key in self._entries)
+            for key in doomed:
+                del self._entries[key]
+            self._counters["invalidations"] += len(doomed)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def record_lookup(self, seconds):
+        with self._lock:
+            self._lookups += 1
+            self._lookup_seconds += seconds
+
+    def stats(self):
+        """Return hit/miss counters, hit rate, size and mean resolve latency."""
+        with self._lock:
+            stats = dict(self._counters)
+            lookups = stats["hits"] + stats["misses"]
+            stats["size"] = len(self._entries)
+            stats["maxsize"] = self.maxsize
+            stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+            stats["lookups"] = self._lookups
+            stats["avg_lookup_ms"] = (
+                round(self._lookup_seconds / self._lookups * 1000, 3) if self._lookups else 0.0
+            )
+        return stats
+
+
+identifier_cache = IdentifierCache()
+
+
+def _identifier_query(identifier):
+    clauses = []
+    if ObjectId.is_valid(identifier):
+        oid = ObjectId(identifier)
+        clauses.append({"_id": oid})
+        # Demonstration.save stores aliases as strings, merges as ObjectIds.
+        clauses.append({"aliases": {"$in": [oid, identifier]}})
+    try:
+        clauses.append({"running_number": int(identifier)})
+    except (TypeError, ValueError):
+        pass
+    clauses.append({"slug": identifier})
+    return {"$or": clauses}
+
+
+def _match_rank(doc, identifier):
+    """Rank how ``doc`` matches ``identifier``; lower wins, None for no match."""
+    if str(doc.get("_id")) == identifier:
+        return 0
+    if identifier in {str(alias) for alias in doc.get("aliases") or []}:
+        return 1
+    if doc.get("running_number") is not None and str(doc.get("running_number")) == identifier:
+        return 2
+    if doc.get("slug") == identifier:
+        return 3
+    return None
+
+
+def resolve_demo(collection, identifier):
+    """
+    Return the demonstration document ``identifier`` refers to, or None.
+
+    Precedence matches the old sequential lookups: ``_id``, alias,
+    ``running_number``, then ``slug``.
+
+    Parameters
+    ----------
+    collection : pymongo.collection.Collection
+        The ``demonstrations`` collection.
+    identifier : str or ObjectId or int
+    """
+    identifier = str(identifier)
+    started = time.perf_counter()
+    try:
+        cached_id = identifier_cache.get(identifier)
+        if cached_id is not None:
+            doc = collection.find_one({"_id": cached_id})
+            if doc is not None and _match_rank(doc, identifier) is not None:
+                return doc
+            identifier_cache.discard(identifier, stale=True)
+
+        candidates = [
+            (rank, doc)
+            for doc in collection.find(_identifier_query(identifier))
+            for rank in [_match_rank(doc, identifier)]
+            if rank is not None
+        ]
+        if not candidates:
+            return None
+        doc = min(candidates, key=lambda pair: pair[0])[1]
+        identifier_cache.set(identifier, doc["_id"])
+        return doc
+    finally:
+        identifier_cache.record_lookup(time.perf_counter() - started)
+
+
+def invalidate_demo_identifiers(*demo_ids, identifiers=()):
+    """
+    Forget cached identifiers of ``demo_ids`` after a merge, alias or slug change.
+
+    Parameters
+    ----------
+    *demo_ids : ObjectId or str
+        Canonical ids whose identifiers should be re-resolved.
+    identifiers : iterable of str, optional
+        Extra identifiers to drop, e.g. a slug that was just released.
+    """
+    oids = [ObjectId(demo_id) for demo_id in demo_ids if demo_id and ObjectId.is_valid(str(demo_id))]
+    identifier_cache.invalidate(oids, [str(key) for key in identifiers if key is not None])
+
+
+def identifier_cache_stats():
+    """Return :meth:`IdentifierCache.stats` for the process-wide cache."""
+    return identifier_cache.stats()
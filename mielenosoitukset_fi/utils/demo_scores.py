@@ -0,0 +1,167 @@
+"""
+Precomputed demonstration trending and recommendation scores.
+
+The ``demo_scores`` background job scores every demonstration that has
+views in ``d_analytics`` and stores one document per demo in the
+``demo_scores`` collection::
+
+    {
+        "demo_id": ObjectId,
+        "title": str,
+        "date": "YYYY-MM-DD",
+        "trending_views": int,    # views in the last 24 hours
+        "popularity_views": int,  # all-time views
+        "trending": float,        # the components below are normalised to 0..1
+        "popularity": float,
+        "recency": float,
+        "category": float,
+        "score": float,           # weighted sum of the components
+        "computed_at": datetime,
+    }
+
+Readers (admin "nousussa", recommendations, the index page) are indexed
+top-N queries on ``score`` or ``trending_views``.
+"""
+
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from pymongo import DESCENDING, ReplaceOne
+
+from mielenosoitukset_fi.utils import analytics_buckets
+from mielenosoitukset_fi.utils.database import get_database_manager
+from mielenosoitukset_fi.utils.logger import logger
+
+SCORES_COLLECTION = "demo_scores"
+DEFAULT_WEIGHTS = {"trending": 0.5, "popularity": 0.3, "recency": 0.1, "category": 0.1}
+RECENCY_DAYS = 30
+TRENDING_WINDOW = timedelta(days=1)
+_WRITE_BATCH_SIZE = 1000
+
+
+def _as_aware(value, fallback):
+    if not isinstance(value, datetime):
+        return fallback
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def compute_demo_scores(db=None, weights=None, now=None):
+    """
+    Recompute ``demo_scores`` from the bucketed view counters.
+
+    Reads the last 24 hours of day buckets, one ``$group`` of daily totals
+    and a single batched ``$in`` lookup of the scored demonstrations, then
+    replaces the score documents in bulk. Demos that no longer have views
+    are removed.
+
+    Parameters
+    ----------
+    db : pymongo.database.Database, optional
+        Defaults to the shared application database.
+    weights : dict, optional
+        Component weights; defaults to :data:`DEFAULT_WEIGHTS`.
+    now : datetime, optional
+        Reference time, mainly for tests.
+
+    Returns
+    -------
+    dict
+        ``{"scored": int, "removed": int}``.
+    """
+    db = db if db is not None else get_database_manager()
+    weights = weights or DEFAULT_WEIGHTS
+    now = _as_aware(now, None) or datetime.now(timezone.utc)
+    buckets = db[analytics_buckets.COLLECTION]
+
+    trending = analytics_buckets.views_in_window(buckets, now - TRENDING_WINDOW, now)
+    popularity = {
+        row["_id"]: int(row["views"] or 0)
+        for row in buckets.aggregate([{"$group": {"_id": "$demo_id", "views": {"$sum": "$total"}}}])
+        if row["_id"] is not None
+    }
+    demo_ids = list(popularity)
+    demos = {
+        doc["_id"]: doc
+        for doc in db.demonstrations.find(
+            {"_id": {"$in": demo_ids}}, {"title": 1, "tags": 1, "created_at": 1, "date": 1}
+        )
+    }
+
+    category_trending = defaultdict(int)
+    for demo_id, demo in demos.items():
+        for tag in demo.get("tags") or []:
+            category_trending[tag] += trending.get(demo_id, 0)
+
+    max_trending = max(list(trending.values()) + [1])
+    max_popularity = max(list(popularity.values()) + [1])
+    max_category = max(list(category_trending.values()) + [1])
+    default_created = now - timedelta(days=RECENCY_DAYS)
+
+    ops = []
+    for demo_id in demo_ids:
+        demo = demos.get(demo_id)
+        if demo is None:
+            continue
+        tags = demo.get("tags") or []
+        created_at = _as_aware(demo.get("created_at"), default_created)
+        components = {
+            "trending": trending.get(demo_id, 0) / max_trending,
+            "popularity": popularity[demo_id] / max_popularity,
+            "recency": math.exp(-max((now - created_at).days, 0) / RECENCY_DAYS),
+            "category": sum(category_trending[tag] for tag in tags) / max_category,
+        }
+        ops.append(
+            ReplaceOne(
+                {"demo_id": demo_id},
+                {
+                    "demo_id": demo_id,
+                    "title": demo.get("title"),
+                    "date": demo.get("date"),
+                    "trending_views": trending.get(demo_id, 0),
+                    "popularity_views": popularity[demo_id],
+                    **components,
+                    "score": sum(components[key] * weight for key, weight in weights.items()),
+                    "computed_at": now,
+                },
+                upsert=True,
+            )
+        )
+
+    collection = db[SCORES_COLLECTION]
+    for start in range(0, len(ops), _WRITE_BATCH_SIZE):
+        collection.bulk_write(ops[start:start + _WRITE_BATCH_SIZE], ordered=False)
+    removed = collection.delete_many({"computed_at": {"$ne": now}}).deleted_count
+    return {"scored": len(ops), "removed": removed}
+
+
+def run_demo_scores():
+    """Background job entry point for :func:`compute_demo_scores`."""
+    result = compute_demo_scores()
+    logger.info("Demo scores refreshed: %s", result)
+    return result
+
+
+def top_scores(db, limit, sort_field="score", query=None, compute_if_empty=True):
+    """
+    Return the ``limit`` highest scored documents, best first.
+
+    Parameters
+    ----------
+    db : pymongo.database.Database
+    limit : int
+    sort_field : str
+        ``"score"`` or ``"trending_views"``; both are indexed.
+    query : dict, optional
+        Additional filter, e.g. ``{"trending_views": {"$gt": 0}}``.
+    compute_if_empty : bool
+        Compute the scores on the spot when the job has never run, so a
+        fresh deployment does not show empty admin lists until the first
+        scheduled run. Public pages pass False.
+    """
+    collection = db[SCORES_COLLECTION]
+    if compute_if_empty and collection.find_one({}, {"_id": 1}) is None:
+        compute_demo_scores(db)
+    return list(collection.find(query or {}).sort(sort_field, DESCENDING).limit(limit))
@@ -0,0 +1,267 @@
+"""
+Compact read model for demonstration listings.
+
+List surfaces (the public list API, index, city, tag and today pages, the
+calendar and the RSS feed) only render a handful of fields. Reading whole
+documents drags descriptions, gallery arrays and organizer subdocuments
+through every request, so these views query with :data:`SUMMARY_PROJECTION`
+and wrap each document in a :class:`DemoSummary` with the display strings
+pre-formatted once.
+
+Templates keep using attribute access (``demo.title``); API responses use
+:meth:`DemoSummary.to_api`.
+
+The display strings are also persisted on the documents by the writers
+(see :func:`derived_fields`), so list views only format documents written
+before migration ``006_derived_demo_fields``.
+"""
+
+from datetime import datetime, time
+
+import pytz
+
+from mielenosoitukset_fi.utils.content_formatting import html_to_markdown, markdown_to_html
+from mielenosoitukset_fi.utils.media_helpers import get_demo_cover_image
+from mielenosoitukset_fi.utils.time_utils import utcnow
+
+HELSINKI_TZ = pytz.timezone("Europe/Helsinki")
+
+# Stored field -> source fields it is derived from.
+DERIVED_FIELD_SOURCES = {
+    "formatted_date": ("date",),
+    "start_datetime": ("date", "start_time"),
+    "start_time_display": ("start_time",),
+    "end_time_display": ("end_time",),
+    "description_html": ("description",),
+}
+
+# Fields read by DemoSummary; description is added only on request.
+SUMMARY_PROJECTION = {
+    "_id": 1,
+    "title": 1,
+    "date": 1,
+    "start_time": 1,
+    "end_time": 1,
+    "city": 1,
+    "address": 1,
+    "tags": 1,
+    "cancelled": 1,
+    "slug": 1,
+    "running_number": 1,
+    "formatted_date": 1,
+    "start_time_display": 1,
+    "end_time_display": 1,
+    # cover image candidates, see media_helpers.get_demo_gallery_images
+    "gallery_images": 1,
+    "images": 1,
+    "img": 1,
+    "cover_picture": 1,
+    "cover_image": 1,
+    "preview_image": 1,
+}
+SUMMARY_PROJECTION_WITH_DESCRIPTION = {**SUMMARY_PROJECTION, "description": 1}
+
+
+def summary_projection(with_description=False):
+    """Return the projection :class:`DemoSummary` needs."""
+    return SUMMARY_PROJECTION_WITH_DESCRIPTION if with_description else SUMMARY_PROJECTION
+
+
+def format_date_display(value):
+    """Format an ISO ``YYYY-MM-DD`` date as ``DD.MM.YYYY``; other values pass through."""
+    try:
+        return datetime.strptime(value or "", "%Y-%m-%d").strftime("%d.%m.%Y")
+    except (TypeError, ValueError):
+        return value or ""
+
+
+def format_time_display(value):
+    """Format ``HH:MM[:SS]`` as ``HH:MM``; other values pass through."""
+    if not value:
+        return ""
+    for fmt in ("%H:%M:%S", "%H:%M"):
+        try:
+            return datetime.strptime(value, fmt).strftime("%H:%M")
+        except (TypeError, ValueError):
+            continue
+    return value
+
+
+def start_datetime(date_value, start_time=None):
+    """
+    Return the start of a demonstration as a naive UTC datetime.
+
+    ``date_value`` and ``start_time`` are Helsinki local time; a missing or
+    unparsable start time means midnight. Returns None without a valid date.
+    """
+    try:
+        day = datetime.strptime(date_value or "", "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+    clock = time.min
+    display = format_time_display(start_time)
+    if display:
+        try:
+            clock = datetime.strptime(display, "%H:%M").time()
+        except ValueError:
+            pass
+    local = HELSINKI_TZ.localize(datetime.combine(day, clock))
+    return local.astimezone(pytz.utc).replace(tzinfo=None)
+
+
+def render_description(description):
+    """
+    Return the sanitised HTML of a stored description.
+
+    Editor HTML is reduced to Markdown and rendered back through
+    :func:`~mielenosoitukset_fi.utils.content_formatting.markdown_to_html`,
+    which drops every tag and attribute outside its allow-list.
+    """
+    return markdown_to_html(html_to_markdown(description))
+
+
+def derived_fields(doc):
+    """
+    Compute the display fields persisted alongside a demonstration.
+
+    Parameters
+    ----------
+    doc : dict
+        Demonstration document (or the merged result of an update).
+
+    Returns
+    -------
+    dict
+        ``formatted_date``, ``start_datetime``, ``start_time_display``,
+        ``end_time_display`` and ``description_html``.
+    """
+    return {
+        "formatted_date": format_date_display(doc.get("date")) or None,
+        "start_datetime": start_datetime(doc.get("date"), doc.get("start_time")),
+        "start_time_display": format_time_display(doc.get("start_time")),
+        "end_time_display": format_time_display(doc.get("end_time")),
+        "description_html": render_description(doc.get("description")),
+    }
+
+
+def with_derived_fields(update, current=None):
+    """
+    Extend a ``$set`` document with the derived fields it invalidates.
+
+    ``last_modified`` is stamped too, unless the update sets it, so
+    ``updated_since`` exports pick the edit up.
+
+    Parameters
+    ----------
+    update : dict
+        Fields about to be set.
+    current : dict, optional
+        The stored document, used for source fields the update leaves alone.
+
+    Returns
+    -------
+    dict
+        A copy of ``update`` with the affected derived fields and
+        ``last_modified`` added.
+    """
+    changed = set(update)
+    stale = [
+        field
+        for field, sources in DERIVED_FIELD_SOURCES.items()
+        if changed.intersection(sources)
+    ]
+    update = {"last_modified": utcnow(), **update}
+    if not stale:
+        return update
+    derived = derived_fields({**(current or {}), **update})
+    return {**update, **{field: derived[field] for field in stale}}
+
+
+class DemoSummary:
+    """
+    The fields of one demonstration needed to render it in a list.
+
+    Parameters
+    ----------
+    doc : dict
+        Demonstration document, ideally read with :data:`SUMMARY_PROJECTION`.
+    with_description : bool, optional
+        Keep ``description`` (RSS feed, calendar tooltips). Defaults to False.
+    """
+
+    __slots__ = (
+        "_id",
+        "title",
+        "date",
+        "start_time",
+        "end_time",
+        "city",
+        "address",
+        "tags",
+        "cancelled",
+        "slug",
+        "running_number",
+        "preview_image",
+        "img",
+        "cover_image",
+        "date_display",
+        "start_time_display",
+        "end_time_display",
+        "time_display",
+        "description",
+    )
+
+    def __init__(self, doc, with_description=False):
+        self._id = doc.get("_id")
+        self.title = doc.get("title") or ""
+        self.date = doc.get("date") or ""
+        self.start_time = doc.get("start_time")
+        self.end_time = doc.get("end_time")
+        self.city = doc.get("city") or ""
+        self.address = doc.get("address") or ""
+        self.tags = list(doc.get("tags") or [])
+        self.cancelled = bool(doc.get("cancelled"))
+        self.slug = doc.get("slug")
+        self.running_number = doc.get("running_number")
+        self.preview_image = doc.get("preview_image")
+        self.img = doc.get("img")
+        self.cover_image = get_demo_cover_image(doc)
+        self.date_display = doc.get("formatted_date") or format_date_display(self.date)
+        self.start_time_display = doc.get("start_time_display") or format_time_display(self.start_time)
+        self.end_time_display = doc.get("end_time_display") or format_time_display(self.end_time)
+        self.time_display = (
+            f"{self.start_time_display} - {self.end_time_display}"
+            if self.end_time_display
+            else self.start_time_display
+        )
+        self.description = (doc.get("description") or "") if with_description else ""
+
+    @classmethod
+    def from_cursor(cls, cursor, with_description=False):
+        """Build summaries for every document of ``cursor`` (or any iterable)."""
+        return [cls(doc, with_description=with_description) for doc in cursor]
+
+    @property
+    def detail_identifier(self):
+        """Identifier used in public detail URLs: slug, running number or id."""
+        return self.slug or self.running_number or str(self._id)
+
+    def to_api(self):
+        """Return the JSON-ready dict served by the public list endpoints."""
+        return {
+            "_id": str(self._id),
+            "title": self.title,
+            "slug": self.slug,
+            "running_number": self.running_number,
+            "date_display": self.date_display,
+            "start_time_display": self.start_time_display,
+            "end_time_display": self.end_time_display,
+            "city": self.city,
+            "address": self.address,
+            "tags": self.tags,
+            "cover_image": self.cover_image,
+            "cancelled": self.cancelled,
+        }
+
+    def __repr__(self):
+        return f"<DemoSummary {self._id} {self.title!r} {self.date}>"
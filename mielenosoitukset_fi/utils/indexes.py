@@ -0,0 +1,179 @@
+"""
+Declarative MongoDB index registry.
+
+Every index the application relies on is listed in :data:`INDEX_REGISTRY`
+and created by :func:`ensure_indexes`, which the migration runner applies
+once per registry revision (see ``utils.migration_runner``). Add new
+indexes here instead of calling ``create_index`` at import time.
+"""
+
+import hashlib
+import json
+
+from pymongo import ASCENDING, DESCENDING
+
+from mielenosoitukset_fi.utils.logger import logger
+
+
+def _index(*keys, **options):
+    return {"keys": list(keys), "options": options}
+
+
+INDEX_REGISTRY = {
+    "demonstrations": [
+        # Public listings: DEMO_FILTER (approved/cancelled/hide/rejected) + date.
+        _index(
+            ("approved", ASCENDING),
+            ("date", ASCENDING),
+            ("cancelled", ASCENDING),
+            ("hide", ASCENDING),
+            ("rejected", ASCENDING),
+        ),
+        # Keyset pagination of the public APIs (utils.keyset.KEYSET_SORT).
+        _index(
+            ("approved", ASCENDING),
+            ("date", ASCENDING),
+            ("start_time", ASCENDING),
+            ("_id", ASCENDING),
+        ),
+        # Incremental exports (updated_since) and sitemap shard refreshes.
+        _index(("last_modified", ASCENDING)),
+        # Admin listings always exclude rejected demonstrations.
+        _index(("rejected", ASCENDING), ("date", ASCENDING)),
+        _index(("slug", ASCENDING)),
+        _index(("running_number", ASCENDING)),
+        _index(("aliases", ASCENDING)),
+        _index(("parent", ASCENDING)),
+        _index(("city_key", ASCENDING), ("date", ASCENDING)),
+        _index(("tags", ASCENDING)),
+        _index(("organizers.organization_id", ASCENDING)),
+    ],
+    # utils.demo_export tombstones for incremental exports.
+    "deleted_demonstrations": [_index(("deleted_at", ASCENDING))],
+    "demo_submission_tokens": [
+        _index(("token", ASCENDING), unique=True),
+        _index(("fingerprint", ASCENDING), ("created_at", DESCENDING)),
+    ],
+    "demo_notifications_queue": [
+        _index(("status", ASCENDING)),
+        _index(("created_at", ASCENDING)),
+        _index(("demo_id", ASCENDING), ("status", ASCENDING)),
+        _index(("notification_type", ASCENDING)),
+    ],
+    "demo_submission_errors": [
+        _index(("created_at", ASCENDING)),
+        _index(("error_code", ASCENDING)),
+    ],
+    "demo_audit_logs": [_index(("demo_id", ASCENDING), ("timestamp", DESCENDING))],
+    "demo_edit_history": [_index(("demo_id", ASCENDING), ("edited_at", DESCENDING))],
+    "demo_suggestions": [_index(("demo_id", ASCENDING), ("created_at", DESCENDING))],
+    "admin_logs": [_index(("timestamp", ASCENDING))],
+    "super_audit_logs": [_index(("timestamp", ASCENDING))],
+    "magic_links": [
+        _index(("token_hash", ASCENDING), unique=True),
+        _index(("demo_id", ASCENDING)),
+    ],
+    "cases": [_index(("demo_id", ASCENDING), ("created_at", DESCENDING))],
+    "demo_attending": [_index(("demo_id", ASCENDING), ("user_id", ASCENDING))],
+    "demo_invites": [_index(("demo_id", ASCENDING))],
+    "demo_reminders": [_index(("demonstration_id", ASCENDING))],
+    "recommended_demos": [_index(("demo_id", ASCENDING), unique=True)],
+    "posted_events": [_index(("demo_id", ASCENDING), ("created_at", DESCENDING))],
+    "city_settings": [_index(("city_key", ASCENDING))],
+    "analytics": [_index(("demo_id", ASCENDING), ("timestamp", ASCENDING))],
+    # One document per demo per day; see utils.analytics_buckets.
+    "d_analytics": [
+        _index(("demo_id", ASCENDING), ("date", ASCENDING), unique=True),
+        _index(("date", ASCENDING)),
+    ],
+    # utils.demo_scores: top-N reads by score or 24h views.
+    "demo_scores": [
+        _index(("demo_id", ASCENDING), unique=True),
+        _index(("score", DESCENDING)),
+        _index(("trending_views", DESCENDING)),
+    ],
+    # utils.analytics.prep relies on this to make retried $inc batches no-ops.
+    "prepped_analytics": [_index(("demo_id", ASCENDING), unique=True)],
+    "login_logs": [
+        _index(("timestamp", DESCENDING)),
+        _index(("user_id", ASCENDING), ("timestamp", DESCENDING)),
+    ],
+    "notifications": [_index(("user_id", ASCENDING), ("created_at", DESCENDING))],
+    # utils.admin_tasks: the admin sidebar's task list, newest first.
+    "admin_tasks": [
+        _index(("type", ASCENDING), ("created_at", DESCENDING)),
+        _index(("organization_id", ASCENDING)),
+        _index(("editors", ASCENDING)),
+        _index(("organizers.organization_id", ASCENDING)),
+    ],
+}
+
+
+class IndexCreationError(RuntimeError):
+    """Raised by :func:`ensure_indexes` after some indexes could not be created."""
+
+    def __init__(self, errors, results):
+        super().__init__(f"{len(errors)} index(es) could not be created: " + "; ".join(errors))
+        self.errors = errors
+        self.results = results
+
+
+def registry_digest(registry=None):
+    """
+    Return a short digest identifying a registry revision.
+
+    The migration runner embeds it in the migration id so that editing
+    :data:`INDEX_REGISTRY` re-applies the registry once on the next boot.
+    """
+    registry = INDEX_REGISTRY if registry is None else registry
+    payload = json.dumps(registry, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def ensure_indexes(db=None, registry=None):
+    """
+    Create every index declared in the registry.
+
+    ``create_index`` is idempotent, so re-running is cheap. A failure on one
+    index (e.g. duplicate values blocking a unique index) is logged and does
+    not prevent the remaining indexes from being created, but the call then
+    raises, so the migration runner does not record the registry as applied
+    and retries it on the next boot.
+
+    Parameters
+    ----------
+    db : pymongo.database.Database, optional
+        Defaults to the shared application database.
+    registry : dict, optional
+        ``{collection: [index spec, ...]}``; defaults to :data:`INDEX_REGISTRY`.
+
+    Returns
+    -------
+    dict
+        ``{collection: [index name, ...]}`` for the indexes that exist.
+
+    Raises
+    ------
+    IndexCreationError
+        When at least one index could not be created.
+    """
+    if db is None:
+        from mielenosoitukset_fi.utils.database import get_database_manager
+
+        db = get_database_manager()
+    registry = INDEX_REGISTRY if registry is None else registry
+
+    results = {}
+    errors = []
+    for collection_name, specs in registry.items():
+        for spec in specs:
+            try:
+                name = db[collection_name].create_index(spec["keys"], **spec["options"])
+            except Exception as exc:
+                logger.error("Could not create index %s on %s: %s", spec["keys"], collection_name, exc)
+                errors.append(f"{collection_name}: {spec['keys']}: {exc}")
+                continue
+            results.setdefault(collection_name, []).append(name)
+    if errors:
+        raise IndexCreationError(errors, results)
+    return results
@@ -0,0 +1,129 @@
+"""
+Keyset (cursor) pagination for the public demonstration lists.
+
+Page-number pagination costs a full ``count_documents`` plus a ``skip``
+that walks every earlier row, so deep pages get linearly slower. Cursor
+mode orders by ``(date, start_time, _id)`` and continues from the last row
+of the previous page with a range query on the matching index, so every
+page costs the same.
+
+A cursor is an opaque URL-safe token; clients pass back the
+``next_cursor`` of the previous response. Totals are optional and come
+from :func:`approximate_count`, a cached count that may lag behind writes
+by a few minutes.
+"""
+
+import base64
+import hashlib
+import json
+
+from bson import ObjectId
+from pymongo import ASCENDING
+
+from mielenosoitukset_fi.utils.cache import PUBLIC_LIST_TAG, tagged_cache_key, tiered_cache
+
+KEYSET_SORT = [("date", ASCENDING), ("start_time", ASCENDING), ("_id", ASCENDING)]
+COUNT_CACHE_TIMEOUT = 600
+
+
+def encode_cursor(doc):
+    """Return the cursor pointing just after ``doc``."""
+    position = [doc.get("date"), doc.get("start_time"), str(doc["_id"])]
+    raw = json.dumps(position, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """
+    Decode a cursor from :func:`encode_cursor`.
+
+    Returns
+    -------
+    tuple
+        ``(date, start_time, ObjectId)``.
+
+    Raises
+    ------
+    ValueError
+        The token is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        day, start_time, demo_id = json.loads(raw)
+    except Exception as exc:
+        raise ValueError("Invalid cursor") from exc
+    if not isinstance(day, str) or not (start_time is None or isinstance(start_time, str)):
+        raise ValueError("Invalid cursor")
+    if not ObjectId.is_valid(demo_id):
+        raise ValueError("Invalid cursor")
+    return day, start_time, ObjectId(demo_id)
+
+
+def _after(field, value):
+    # Missing start times sort first; a plain $gt would skip every string
+    # after a null because of MongoDB's type bracketing.
+    if value is None:
+        return {field: {"$ne": None}}
+    return {field: {"$gt": value}}
+
+
+def after_cursor(position):
+    """Return the filter matching rows strictly after ``position`` in :data:`KEYSET_SORT` order."""
+    day, start_time, demo_id = position
+    return {
+        "$or": [
+            {"date": {"$gt": day}},
+            {"date": day, **_after("start_time", start_time)},
+            {"date": day, "start_time": start_time, "_id": {"$gt": demo_id}},
+        ]
+    }
+
+
+def keyset_page(collection, query, projection, cursor, limit):
+    """
+    Fetch one page in cursor mode.
+
+    Parameters
+    ----------
+    collection : pymongo.collection.Collection
+    query : dict
+        The listing filter; not modified.
+    projection : dict
+        Must include ``date`` and ``start_time``.
+    cursor : str
+        ``next_cursor`` of the previous page; empty for the first page.
+    limit : int
+
+    Returns
+    -------
+    tuple
+        ``(documents, next_cursor)``; ``next_cursor`` is None on the last page.
+
+    Raises
+    ------
+    ValueError
+        ``cursor`` is malformed.
+    """
+    if cursor:
+        query = {"$and": [query, after_cursor(decode_cursor(cursor))]}
+    docs = list(collection.find(query, projection).sort(KEYSET_SORT).limit(limit + 1))
+    if len(docs) <= limit:
+        return docs, None
+    docs = docs[:limit]
+    return docs, encode_cursor(docs[-1])
+
+
+def approximate_count(collection, query):
+    """
+    Return a cached ``count_documents`` of ``query``.
+
+    The count is shared through the tiered cache for
+    :data:`COUNT_CACHE_TIMEOUT` seconds and dropped whenever the public lists
+    are invalidated, so it is exact most of the time but may briefly lag.
+    """
+    signature = json.dumps(query, sort_keys=True, default=str)
+    key = tagged_cache_key(
+        f"count:{collection.name}:{hashlib.md5(signature.encode('utf-8')).hexdigest()}",
+        [PUBLIC_LIST_TAG],
+    )
+    return tiered_cache.get_or_set(key, lambda: collection.count_documents(query), COUNT_CACHE_TIMEOUT)
@@ -0,0 +1,119 @@
+"""
+Lazy, per-request memoised template context.
+
+Context processors run for every rendered template, so values they compute
+eagerly (notifications, enabled cities) cost database round trips even on
+pages that never show them. :func:`lazy_value` returns a
+:class:`~werkzeug.local.LocalProxy`, the same mechanism behind
+``current_user``: the loader runs the first time a template iterates,
+tests, indexes or prints the value, and the result is memoised on
+:data:`flask.g` for the rest of the request. :func:`memoized` does the same
+for helper functions that templates call with arguments, such as
+``get_org_name(org_id)``.
+
+Every loader run is counted; :func:`lookup_stats` reports the counts for
+the current request, and debug and testing apps send the lookup count in
+the ``X-Context-Lookups`` response header.
+"""
+
+import functools
+
+from flask import g, has_app_context
+from werkzeug.local import LocalProxy
+
+LOOKUP_HEADER = "X-Context-Lookups"
+
+_MISSING = object()
+
+
+def _request_state():
+    state = g.get("_lazy_context")
+    if state is None:
+        state = g._lazy_context = {"values": {}, "lookups": 0, "hits": 0}
+    return state
+
+
+def resolve(key, loader):
+    """
+    Return the memoised value of ``key``, calling ``loader`` on the first use.
+
+    Outside an application context ``loader`` runs every time.
+    """
+    if not has_app_context():
+        return loader()
+    state = _request_state()
+    value = state["values"].get(key, _MISSING)
+    if value is _MISSING:
+        state["lookups"] += 1
+        value = state["values"][key] = loader()
+    else:
+        state["hits"] += 1
+    return value
+
+
+def lazy_value(key, loader):
+    """
+    Return a proxy that calls ``loader`` when a template first dereferences it.
+
+    Parameters
+    ----------
+    key : str
+        Memoisation key, unique per context value.
+    loader : callable
+        Takes no arguments; runs at most once per request.
+
+    Returns
+    -------
+    werkzeug.local.LocalProxy
+        Not JSON serialisable; pass plain values to ``tojson``.
+    """
+    return LocalProxy(lambda: resolve(key, loader))
+
+
+def memoized(func):
+    """
+    Decorate ``func`` so calls with the same arguments share one result per request.
+
+    Arguments are compared by their ``str`` form, so an ObjectId and its
+    string share an entry.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        signature = (
+            func,
+            tuple(_freeze(arg) for arg in args),
+            tuple(sorted((name, _freeze(value)) for name, value in kwargs.items())),
+        )
+        return resolve(signature, lambda: func(*args, **kwargs))
+
+    return wrapper
+
+
+def _freeze(value):
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(item) for item in value)
+    return str(value)
+
+
+def lookup_stats():
+    """
+    Return ``{"lookups": int, "hits": int}`` for the current request.
+
+    ``lookups`` counts loader runs (database work), ``hits`` the uses served
+    from the request memo.
+    """
+    if not has_app_context():
+        return {"lookups": 0, "hits": 0}
+    state = g.get("_lazy_context") or {}
+    return {"lookups": state.get("lookups", 0), "hits": state.get("hits", 0)}
+
+
+def init_app(app):
+    """Send :data:`LOOKUP_HEADER` on responses of debug and testing apps."""
+
+    @app.after_request
+    def _context_lookup_header(response):
+        if app.debug or app.testing:
+            response.headers[LOOKUP_HEADER] = str(lookup_stats()["lookups"])
+        return response
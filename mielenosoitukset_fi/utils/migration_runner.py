@@ -1,8 +1,15 @@
 from mielenosoitukset_fi.utils.time_utils import utcnow
 from datetime import datetime
 
+from mielenosoitukset_fi.utils.indexes import ensure_indexes, registry_digest
 from mielenosoitukset_fi.utils.logger import logger
-from mielenosoitukset_fi.utils.migrations import migration_003_city_keys
+from mielenosoitukset_fi.utils.migrations import (
+    migration_003_city_keys,
+    migration_005_analytics_buckets,
+    migration_006_derived_demo_fields,
+    migration_007_admin_tasks,
+    migration_008_runtime_flags,
+)
 
 
 MIGRATIONS = [
@@ -11,6 +18,35 @@ MIGRATIONS = [
         "description": "Backfill normalized city keys for city-scoped admin grants.",
         "run": migration_003_city_keys.migrate_city_keys,
     },
+    {
+        # Must run before the index registry: legacy documents have no
+        # demo_id/date and would block the unique bucket index.
+        "id": "005_analytics_buckets",
+        "description": "Convert d_analytics to one document per demo per day.",
+        "run": migration_005_analytics_buckets.migrate_analytics_buckets,
+    },
+    {
+        "id": "006_derived_demo_fields",
+        "description": "Store display date/times, start_datetime and sanitised description HTML on demonstrations.",
+        "run": migration_006_derived_demo_fields.migrate_derived_demo_fields,
+    },
+    {
+        "id": "007_admin_tasks",
+        "description": "Materialise pending demonstrations and open organization suggestions into admin_tasks.",
+        "run": migration_007_admin_tasks.migrate_admin_tasks,
+    },
+    {
+        "id": "008_runtime_flags",
+        "description": "Move panic mode from the panic collection to the shared runtime_flags document.",
+        "run": migration_008_runtime_flags.migrate_runtime_flags,
+    },
+    {
+        # The digest changes whenever INDEX_REGISTRY does, so new indexes are
+        # applied once on the next boot instead of by every worker at import.
+        "id": f"004_index_registry_{registry_digest()}",
+        "description": "Create the indexes declared in utils.indexes.INDEX_REGISTRY.",
+        "run": ensure_indexes,
+    },
 ]
 
 
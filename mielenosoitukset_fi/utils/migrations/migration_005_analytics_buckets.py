@@ -0,0 +1,53 @@
+from collections import defaultdict
+
+from mielenosoitukset_fi.utils.analytics_buckets import COLLECTION, increment_ops
+from mielenosoitukset_fi.utils.database import get_database_manager
+
+
+def _legacy_counts(demo_id, analytics):
+    counts = defaultdict(lambda: defaultdict(int))
+    for day, hours in (analytics or {}).items():
+        if not isinstance(hours, dict):
+            continue
+        for hour, minutes in hours.items():
+            if not isinstance(minutes, dict):
+                continue
+            for minute, views in minutes.items():
+                try:
+                    slot = int(hour) * 60 + int(minute)
+                    views = int(views)
+                except (TypeError, ValueError):
+                    continue
+                if 0 <= slot < 24 * 60 and views > 0:
+                    counts[(demo_id, day)][slot] += views
+    return counts
+
+
+def migrate_analytics_buckets(db=None):
+    """Split legacy one-doc-per-demo ``d_analytics`` documents into day buckets.
+
+    Legacy documents are keyed by the demo id and nest counters as
+    ``analytics.<date>.<hour>.<minute>``. Their counts are added to the
+    matching day buckets and the legacy document is removed, so a demo is
+    converted exactly once even if the migration is interrupted between demos.
+    """
+    db = db if db is not None else get_database_manager()
+    collection = db[COLLECTION]
+    converted = 0
+    buckets = 0
+
+    for doc in collection.find({"analytics": {"$exists": True}}):
+        counts = _legacy_counts(doc["_id"], doc.get("analytics"))
+        ops = increment_ops(counts)
+        if ops:
+            collection.bulk_write(ops, ordered=True)
+        collection.delete_one({"_id": doc["_id"]})
+        converted += 1
+        buckets += len(counts)
+
+    print(f"Converted {converted} legacy d_analytics documents into {buckets} day buckets.")
+    return {"converted": converted, "buckets": buckets}
+
+
+if __name__ == "__main__":
+    migrate_analytics_buckets()
@@ -0,0 +1,38 @@
+from pymongo import UpdateOne
+
+from mielenosoitukset_fi.utils.database import get_database_manager
+from mielenosoitukset_fi.utils.demo_summary import derived_fields
+
+_BATCH_SIZE = 500
+_SOURCE_PROJECTION = {"date": 1, "start_time": 1, "end_time": 1, "description": 1}
+
+
+def migrate_derived_demo_fields(db=None):
+    """Backfill the display fields that writers now store on demonstrations.
+
+    Computes ``formatted_date``, ``start_datetime``, ``start_time_display``,
+    ``end_time_display`` and ``description_html`` (see
+    ``utils.demo_summary.derived_fields``) for every demonstration and writes
+    them in batches. Re-running recomputes the same values.
+    """
+    db = db if db is not None else get_database_manager()
+    collection = db["demonstrations"]
+    updated = 0
+    ops = []
+
+    for doc in collection.find({}, _SOURCE_PROJECTION):
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": derived_fields(doc)}))
+        if len(ops) >= _BATCH_SIZE:
+            collection.bulk_write(ops, ordered=False)
+            updated += len(ops)
+            ops = []
+    if ops:
+        collection.bulk_write(ops, ordered=False)
+        updated += len(ops)
+
+    print(f"Backfilled derived display fields on {updated} demonstrations.")
+    return {"updated": updated}
+
+
+if __name__ == "__main__":
+    migrate_derived_demo_fields()
@@ -0,0 +1,22 @@
+from mielenosoitukset_fi.utils.admin_tasks import rebuild_admin_tasks
+from mielenosoitukset_fi.utils.database import get_database_manager
+
+
+def migrate_admin_tasks(db=None):
+    """Build the ``admin_tasks`` collection from existing data.
+
+    Adds a task for every demonstration waiting for approval and every open
+    organization edit suggestion (see ``utils.admin_tasks``). Re-running
+    rebuilds the same collection.
+    """
+    db = db if db is not None else get_database_manager()
+    counts = rebuild_admin_tasks(db)
+    print(
+        f"Built {counts['demo_tasks']} demonstration tasks and "
+        f"{counts['suggestion_tasks']} suggestion tasks."
+    )
+    return counts
+
+
+if __name__ == "__main__":
+    migrate_admin_tasks()
@@ -0,0 +1,31 @@
+from mielenosoitukset_fi.utils.database import get_database_manager
+from mielenosoitukset_fi.utils.runtime_flags import COLLECTION, DOCUMENT_ID, PANIC
+from mielenosoitukset_fi.utils.time_utils import utcnow
+
+
+def migrate_runtime_flags(db=None):
+    """Carry panic mode over from the legacy ``panic`` collection.
+
+    Copies ``panic.global`` into the shared ``runtime_flags`` document (see
+    ``utils.runtime_flags``) unless that already has a panic flag, so
+    re-running never overrides a toggle made after the upgrade.
+    """
+    db = db if db is not None else get_database_manager()
+    current = db[COLLECTION].find_one({"_id": DOCUMENT_ID}) or {}
+    if PANIC in (current.get("flags") or {}):
+        print("Runtime flags already hold the panic flag; nothing to copy.")
+        return {"copied": False}
+
+    legacy = db["panic"].find_one({"name": "global"}) or {}
+    panic = bool(legacy.get("panic", False))
+    db[COLLECTION].update_one(
+        {"_id": DOCUMENT_ID},
+        {"$set": {f"flags.{PANIC}": panic, "updated_at": utcnow()}, "$inc": {"version": 1}},
+        upsert=True,
+    )
+    print(f"Copied panic mode ({panic}) into runtime flags.")
+    return {"copied": True, "panic": panic}
+
+
+if __name__ == "__main__":
+    migrate_runtime_flags()
@@ -0,0 +1,125 @@
+"""
+Compile a user's permissions into MongoDB filters.
+
+:func:`~mielenosoitukset_fi.utils.wrappers.has_demo_permission` answers for
+one demonstration at a time, so admin listings used to fetch a page and then
+drop the rows the user could not see: one check (and possibly one
+``find_one``) per row, pages shorter than ``per_page`` and totals counted
+before the filtering. :func:`demo_permission_filter` expresses the same rules
+as a single predicate so MongoDB does the filtering and counts stay right.
+
+A user may act on a demonstration when any of these hold, mirroring
+``has_demo_permission``:
+
+* they are a global admin or hold the permission in ``global_permissions``;
+* they are listed in the demonstration's ``editors``;
+* one of its ``organizers`` is an organization where their membership has
+  the permission;
+* an active city-scoped grant (``admin_scope_grants``) gives them the
+  permission for its city.
+"""
+
+from bson import ObjectId
+
+from mielenosoitukset_fi.utils.cities import normalize_city_key
+from mielenosoitukset_fi.utils.variables import CITY_LIST
+
+# Matches no document; used for anonymous users and users without any scope.
+MATCH_NOTHING = {"_id": {"$in": []}}
+
+
+def _id_variants(values):
+    """Return ``values`` as both ObjectIds and strings; ids are stored either way."""
+    variants = []
+    for value in values:
+        if ObjectId.is_valid(str(value)):
+            variants.extend([ObjectId(str(value)), str(value)])
+    return list(dict.fromkeys(variants))
+
+
+def has_global_permission(user, permission_name):
+    """Return True when ``user`` holds ``permission_name`` everywhere."""
+    if user is None or not getattr(user, "is_authenticated", False):
+        return False
+    if getattr(user, "global_admin", False):
+        return True
+    return permission_name in (getattr(user, "global_permissions", None) or [])
+
+
+def organization_ids_with(user, permission_name):
+    """
+    Return the organizations where ``user`` has ``permission_name``.
+
+    Returns
+    -------
+    list of ObjectId or None
+        None means every organization (global admin or global permission).
+    """
+    if has_global_permission(user, permission_name):
+        return None
+    if user is None or not getattr(user, "is_authenticated", False):
+        return []
+    return [
+        membership.organization_id
+        for membership in getattr(user, "memberships", None) or []
+        if permission_name in (membership.permissions or [])
+    ]
+
+
+def demo_permission_filter(user, permission_name):
+    """
+    Compile the demonstrations ``user`` may act on into a MongoDB filter.
+
+    Parameters
+    ----------
+    user : User
+        Usually ``current_user``; anonymous users match nothing.
+    permission_name : str
+        e.g. ``"LIST_DEMOS"`` or ``"EDIT_DEMO"``.
+
+    Returns
+    -------
+    dict
+        ``{}`` when the user may act on every demonstration, otherwise an
+        ``$or`` over editor, organizer and city clauses (or
+        :data:`MATCH_NOTHING`).
+    """
+    if user is None or not getattr(user, "is_authenticated", False):
+        return MATCH_NOTHING
+    if has_global_permission(user, permission_name):
+        return {}
+
+    clauses = []
+    user_ids = _id_variants([getattr(user, "_id", None) or getattr(user, "id", None)])
+    if user_ids:
+        clauses.append({"editors": {"$in": user_ids}})
+
+    org_ids = _id_variants(organization_ids_with(user, permission_name))
+    if org_ids:
+        clauses.append({"organizers.organization_id": {"$in": org_ids}})
+
+    city_keys = (
+        user.scoped_city_keys_for(permission_name)
+        if hasattr(user, "scoped_city_keys_for")
+        else []
+    )
+    if city_keys:
+        clauses.append({"city_key": {"$in": city_keys}})
+        # Documents written before city keys were backfilled.
+        city_names = [city for city in CITY_LIST if normalize_city_key(city) in city_keys]
+        if city_names:
+            clauses.append({"city_key": {"$exists": False}, "city": {"$in": city_names}})
+
+    if not clauses:
+        return MATCH_NOTHING
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def restrict_demo_query(query, user, permission_name):
+    """Return ``query`` narrowed to the demonstrations ``user`` may act on."""
+    predicate = demo_permission_filter(user, permission_name)
+    if not predicate:
+        return query
+    if not query:
+        return predicate
+    return {"$and": [query, predicate]}
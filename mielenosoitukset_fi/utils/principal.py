@@ -0,0 +1,214 @@
+"""
+Per-process cache of user permission snapshots.
+
+Every authenticated request loads the user document in ``load_user``; the
+first permission check then queries ``memberships`` and
+``admin_scope_grants``, once per request and per ``User`` instance. A
+:class:`PrincipalSnapshot` holds those rows plus the permission sets derived
+from them, cached in-process for :data:`PRINCIPAL_CACHE_TTL` seconds and
+keyed by user id and the ``permissions_version`` counter stored on the user
+document.
+
+The user document itself is still read on every request: profile, follow
+and ban state change through many writers, and reading it is what lets
+every worker notice a version bump. Writers that change memberships, scoped
+grants, roles or global permissions call :func:`bump_permissions_version`,
+so the next request of that user in any worker builds a fresh snapshot.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from bson import ObjectId
+
+from mielenosoitukset_fi.utils.cities import normalize_city_key
+from mielenosoitukset_fi.utils.classes.MemberShip import MemberShip
+
+PRINCIPAL_CACHE_TTL = 60
+PRINCIPAL_CACHE_SIZE = 2048
+
+
+def _active_grant_query(user_id):
+    return {
+        "user_id": {"$in": [user_id, str(user_id)]},
+        "$or": [
+            {"revoked_at": {"$exists": False}},
+            {"revoked_at": None},
+        ],
+    }
+
+
+def _grant_city_keys(grant):
+    raw_keys = grant.get("scope_keys")
+    if raw_keys is None and grant.get("scope_key"):
+        raw_keys = [grant.get("scope_key")]
+    if isinstance(raw_keys, str):
+        raw_keys = [raw_keys]
+    return [key for key in (normalize_city_key(raw) for raw in raw_keys or []) if key]
+
+
+class PrincipalSnapshot:
+    """
+    Memberships, scoped grants and derived permission sets of one user.
+
+    Parameters
+    ----------
+    user_id : ObjectId
+    version : int
+        ``permissions_version`` of the user document the snapshot was built for.
+    memberships : list of MemberShip
+    admin_scope_grants : list of dict
+        Active (unrevoked) grants.
+    """
+
+    __slots__ = (
+        "user_id",
+        "version",
+        "memberships",
+        "admin_scope_grants",
+        "permissions_by_org",
+        "city_keys_by_permission",
+        "built_at",
+    )
+
+    def __init__(self, user_id, version, memberships, admin_scope_grants):
+        self.user_id = user_id
+        self.version = version
+        self.memberships = tuple(memberships)
+        self.admin_scope_grants = tuple(admin_scope_grants)
+        self.permissions_by_org = {
+            membership.organization_id: frozenset(membership.permissions or [])
+            for membership in self.memberships
+        }
+        city_keys = {}
+        for grant in self.admin_scope_grants:
+            if grant.get("scope_type") != "city":
+                continue
+            for permission in grant.get("permissions") or []:
+                keys = city_keys.setdefault(permission, [])
+                keys.extend(key for key in _grant_city_keys(grant) if key not in keys)
+        self.city_keys_by_permission = {
+            permission: tuple(keys) for permission, keys in city_keys.items()
+        }
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def build(cls, db, user_doc):
+        """Query the memberships and active grants of ``user_doc``."""
+        user_id = user_doc["_id"]
+        memberships = [
+            MemberShip.from_dict(doc) for doc in db.memberships.find({"user_id": user_id})
+        ]
+        grants = list(db.admin_scope_grants.find(_active_grant_query(user_id)))
+        return cls(user_id, user_doc.get("permissions_version", 0), memberships, grants)
+
+
+class PrincipalCache:
+    """
+    Thread-safe LRU of :class:`PrincipalSnapshot` with a time-to-live.
+
+    Parameters
+    ----------
+    maxsize : int
+    ttl : float
+        Seconds a snapshot is served; bounds staleness for writers that do
+        not bump ``permissions_version``.
+    """
+
+    def __init__(self, maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def get(self, user_id, version):
+        with self._lock:
+            snapshot = self._entries.get(user_id)
+            if (
+                snapshot is None
+                or snapshot.version != version
+                or time.monotonic() - snapshot.built_at >= self.ttl
+            ):
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self._counters["hits"] += 1
+            return snapshot
+
+    def set(self, snapshot):
+        with self._lock:
+            self._entries[snapshot.user_id] = snapshot
+            self._entries.move_to_end(snapshot.user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                if self._entries.pop(user_id, None) is not None:
+                    self._counters["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss counters, hit rate and size."""
+        with self._lock:
+            stats = dict(self._counters)
+            lookups = stats["hits"] + stats["misses"]
+            stats["size"] = len(self._entries)
+            stats["maxsize"] = self.maxsize
+            stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+principal_cache = PrincipalCache()
+
+
+def principal_for(db, user_doc):
+    """Return the cached snapshot for ``user_doc``, building it on a miss."""
+    snapshot = principal_cache.get(user_doc["_id"], user_doc.get("permissions_version", 0))
+    if snapshot is None:
+        snapshot = PrincipalSnapshot.build(db, user_doc)
+        principal_cache.set(snapshot)
+    return snapshot
+
+
+def load_user_principal(db, user_id):
+    """
+    Load a :class:`~mielenosoitukset_fi.users.models.User` with its snapshot applied.
+
+    Used by the Flask-Login user loader: one ``users`` read, and no
+    membership or grant queries while the snapshot is cached.
+
+    Returns
+    -------
+    User or None
+    """
+    from mielenosoitukset_fi.users.models import User  # users.models imports utils
+
+    if not ObjectId.is_valid(str(user_id)):
+        return None
+    user_doc = db.users.find_one({"_id": ObjectId(str(user_id))})
+    if not user_doc:
+        return None
+    user = User.from_db(user_doc)
+    user.apply_principal(principal_for(db, user_doc))
+    return user
+
+
+def bump_permissions_version(db, *user_ids):
+    """
+    Invalidate the permission snapshots of ``user_ids`` in every worker.
+
+    Call after changing a user's memberships, scoped grants, role or global
+    permissions.
+    """
+    oids = [ObjectId(str(user_id)) for user_id in user_ids if user_id and ObjectId.is_valid(str(user_id))]
+    if not oids:
+        return
+    db.users.update_many({"_id": {"$in": oids}}, {"$inc": {"permissions_version": 1}})
+    principal_cache.invalidate(*oids)
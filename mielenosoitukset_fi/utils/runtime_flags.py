@@ -0,0 +1,149 @@
+"""
+Shared runtime flags (panic mode and other kill switches).
+
+Flags live in one ``runtime_flags`` document (``_id: "global"``) holding a
+``flags`` mapping and a ``version`` counter that every change increments.
+Each worker keeps the flags in memory and, piggybacked on the requests
+that ask for a flag, re-reads only the version at most once per
+``RUNTIME_FLAGS_CHECK_INTERVAL_MS``; the full document is fetched only when
+the version moved. Changes made through :meth:`RuntimeFlags.set` apply to
+the local copy immediately, so the worker that served the admin toggle
+never serves a stale value and other workers follow within one interval.
+
+This replaces the per-worker thread that polled the ``panic`` collection
+every 15 seconds; migration ``008_runtime_flags`` carries its state over.
+"""
+
+import threading
+import time
+
+from pymongo import ReturnDocument
+
+from config import Config
+from mielenosoitukset_fi.utils.logger import logger
+from mielenosoitukset_fi.utils.time_utils import utcnow
+
+COLLECTION = "runtime_flags"
+DOCUMENT_ID = "global"
+
+# Public pages render ``heavy.html`` while this flag is set.
+PANIC = "panic"
+
+
+class RuntimeFlags:
+    """
+    Per-process view of the shared flags document.
+
+    Parameters
+    ----------
+    collection_getter : callable
+        Returns the ``runtime_flags`` collection; called lazily so importing
+        the module does not connect to MongoDB.
+    check_interval_ms : int
+        Minimum time between version checks. 0 checks on every lookup.
+    """
+
+    def __init__(self, collection_getter, check_interval_ms=1000):
+        self._collection_getter = collection_getter
+        self.check_interval = check_interval_ms / 1000
+        self._flags = {}
+        self._version = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+        self._counters = {"version_checks": 0, "reloads": 0}
+
+    def _collection(self):
+        return self._collection_getter()
+
+    def _apply(self, doc):
+        self._flags = dict((doc or {}).get("flags") or {})
+        self._version = (doc or {}).get("version", 0)
+        self._checked_at = time.monotonic()
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            if self._checked_at is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return
+            try:
+                self._counters["version_checks"] += 1
+                head = self._collection().find_one({"_id": DOCUMENT_ID}, {"version": 1})
+                version = (head or {}).get("version", 0)
+                if version == self._version:
+                    self._checked_at = time.monotonic()
+                    return
+                self._counters["reloads"] += 1
+                self._apply(self._collection().find_one({"_id": DOCUMENT_ID}))
+            except Exception:
+                # Keep serving the last known flags; retry after the interval.
+                logger.exception("Failed to refresh runtime flags")
+                self._checked_at = time.monotonic()
+
+    def get(self, name, default=False):
+        """Return flag ``name``, checking the shared version if it is due."""
+        self._refresh()
+        return self._flags.get(name, default)
+
+    def set(self, name, value, actor=None):
+        """
+        Set flag ``name`` for every worker.
+
+        The version is bumped in the same write and the returned document
+        replaces the local copy, so this process sees the change at once.
+
+        Returns
+        -------
+        int
+            The new version.
+        """
+        doc = self._collection().find_one_and_update(
+            {"_id": DOCUMENT_ID},
+            {
+                "$set": {
+                    f"flags.{name}": value,
+                    "updated_at": utcnow(),
+                    "updated_by": actor,
+                },
+                "$inc": {"version": 1},
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        with self._lock:
+            self._apply(doc)
+        return self._version
+
+    def invalidate(self):
+        """Force the next lookup to check the shared version."""
+        with self._lock:
+            self._checked_at = None
+
+    def snapshot(self):
+        """Return the current flags, version and check counters."""
+        self._refresh()
+        with self._lock:
+            return {
+                "flags": dict(self._flags),
+                "version": self._version,
+                "check_interval_ms": int(self.check_interval * 1000),
+                **self._counters,
+            }
+
+
+def _flags_collection():
+    from mielenosoitukset_fi.utils.database import get_database_manager
+
+    return get_database_manager()[COLLECTION]
+
+
+runtime_flags = RuntimeFlags(
+    _flags_collection,
+    check_interval_ms=Config.RUNTIME_FLAGS_CHECK_INTERVAL_MS,
+)
+
+
+def panic_mode():
+    """Return True while panic mode is active."""
+    return bool(runtime_flags.get(PANIC))
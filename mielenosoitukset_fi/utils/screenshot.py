@@ -11,6 +11,7 @@ from bson import ObjectId
 from mielenosoitukset_fi.database_manager import DatabaseManager
 
 from mielenosoitukset_fi.utils.logger import logger
+from mielenosoitukset_fi.utils.demo_summary import format_date_display, format_time_display
 from mielenosoitukset_fi.utils import _CUR_DIR
 from mielenosoitukset_fi.utils.classes.Demonstration import Demonstration
 
@@ -66,35 +67,16 @@ def create_screenshot(demo_data, output_path=save_path, return_bytes=False):
                 raise ValueError("Invalid demonstration data provided.")
 
         try:
-            # Prepare a copy of the demo data for the template to avoid mutating the source
+            # Prepare a copy of the demo data for the template to avoid mutating the source.
+            # Display values are stored at write time; older documents are formatted here.
             demo_for_template = dict(demo_data)
-            # Format date to Finnish format DD.MM.YYYY if possible
-            try:
-                if demo_for_template.get("date"):
-                    from datetime import datetime as _dt
-
-                    try:
-                        parsed = _dt.strptime(demo_for_template["date"], "%Y-%m-%d")
-                        demo_for_template["date"] = parsed.strftime("%d.%m.%Y")
-                    except Exception:
-                        # leave date as-is if it can't be parsed
-                        pass
-                # Format start_time and end_time to HH:MM if present
-                for tkey in ("start_time", "end_time"):
-                    tval = demo_for_template.get(tkey)
-                    if tval:
-                        try:
-                            # Try HH:MM:SS then HH:MM
-                            try:
-                                parsed_t = _dt.strptime(tval, "%H:%M:%S")
-                            except Exception:
-                                parsed_t = _dt.strptime(tval, "%H:%M")
-                            demo_for_template[tkey] = parsed_t.strftime("%H:%M")
-                        except Exception:
-                            # leave as-is on failure
-                            pass
-            except Exception:
-                pass
+            demo_for_template["date"] = demo_data.get("formatted_date") or format_date_display(
+                demo_data.get("date")
+            )
+            for tkey in ("start_time", "end_time"):
+                demo_for_template[tkey] = demo_data.get(f"{tkey}_display") or format_time_display(
+                    demo_data.get(tkey)
+                )
 
             env = Environment(
                 loader=FileSystemLoader(os.path.join(_CUR_DIR, '../templates')),
@@ -178,7 +160,6 @@ def trigger_screenshot(demo_id, wait=False, force=False):
         True/False for success, message.
     """
     def create_screenshot_thread(demo_id, force_generate):
-        from mielenosoitukset_fi.utils.classes.Demonstration import Demonstration
         from mielenosoitukset_fi.utils.s3 import upload_image_fileobj
         from config import Config
 
@@ -193,12 +174,11 @@ def trigger_screenshot(demo_id, wait=False, force=False):
                 logger.info(f"Preview already exists for demo {demo_id}; skipping screenshot generation.")
                 return
 
-            demo = Demonstration.from_dict(data)
-
-            # Render screenshot bytes inside app context
+            # create_screenshot renders plain documents; building a model
+            # here would only add queries (and possible saves).
             try:
                 with current_app.app_context():
-                    png_bytes = create_screenshot(demo, return_bytes=True)
+                    png_bytes = create_screenshot(data, return_bytes=True)
             except Exception as e:
                 logger.error(f"Failed to render screenshot for {demo_id}: {e}")
                 return
@@ -0,0 +1,421 @@
+"""
+Sharded, incrementally rebuilt sitemap.
+
+The sitemap is split into shards -- static pages, cities, organizations, tags
+and one shard per demonstration month -- that the ``sitemap_refresh``
+background job precomputes into the ``sitemap_shards`` collection. Shards
+store URL *paths* (resolved once with ``url_for`` at build time), so serving a
+shard only prefixes the request host and serialises the stored entries.
+
+Between full rebuilds the job only rebuilds shards whose source documents have
+``last_modified``/``updated_at`` newer than the watermark kept in
+``sitemap_state``. Month shard entries record their ``demo_id``, so a demo that
+moved to another month, was deleted or is no longer public also rebuilds the
+shard that still lists it.
+"""
+
+import hashlib
+import json
+from datetime import date, datetime, timedelta
+from xml.sax.saxutils import escape, quoteattr
+
+from bson import ObjectId
+from flask import current_app, has_request_context, url_for
+
+from mielenosoitukset_fi.utils.city_settings import city_stats
+from mielenosoitukset_fi.utils.database import DEMO_FILTER, get_database_manager
+from mielenosoitukset_fi.utils.logger import logger
+from mielenosoitukset_fi.utils.time_utils import utcnow
+
+SHARD_COLLECTION = "sitemap_shards"
+STATE_COLLECTION = "sitemap_state"
+STATE_ID = "state"
+
+MAX_URLS_PER_SHARD = 40000  # protocol limit is 50k URLs / 50 MB per file
+FULL_REBUILD_INTERVAL = timedelta(hours=24)
+DEMO_WINDOW_PAST_DAYS = 365
+DEMO_WINDOW_FUTURE_DAYS = 365 * 2
+
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+XHTML_NS = "http://www.w3.org/1999/xhtml"
+
+STATIC_ROUTES = [
+    {"loc": "index"},
+    {"loc": "submit"},
+    {"loc": "demonstrations"},
+    {"loc": "today_demos"},
+    {"loc": "cities"},
+    {"loc": "calendar_month_view"},
+    {"loc": "calendar_year_view", "values": {"year": None}},
+    {"loc": "public_guides"},
+    {"loc": "info"},
+    {"loc": "terms"},
+    {"loc": "privacy"},
+    {"loc": "contact"},
+    {"loc": "api_docs"},
+    {"loc": "pride_nakyvaksi"},
+    {"loc": "campaign.index"},
+]
+
+_LASTMOD_FIELDS = ("updated_at", "modified_at", "last_modified", "lastmod", "updated", "modified")
+_DEMO_PROJECTION = {"_id": 1, "slug": 1, "running_number": 1, "date": 1, **{f: 1 for f in _LASTMOD_FIELDS}}
+
+
+# --------------------------------------------------------------------------- #
+# Entry builders
+# --------------------------------------------------------------------------- #
+def _alternate_locales():
+    """Return locales for hreflang links, or [] when only Finnish is enabled."""
+    locales = [l for l in (current_app.config.get("BABEL_SUPPORTED_LOCALES") or ["fi"]) if l]
+    if len(locales) == 1 and locales[0].lower().startswith("fi"):
+        return []
+    return locales
+
+
+def _entry(endpoint, locales, lastmod=None, **values):
+    return {
+        "loc": url_for(endpoint, **values),
+        "lastmod": lastmod,
+        "alternates": [[lang, url_for(endpoint, lang_code=lang, **values)] for lang in locales],
+    }
+
+
+def _to_date_str(value):
+    """Normalise a datetime/date/ISO-ish string to ``YYYY-MM-DD`` (or None)."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, str):
+        text = value.strip()
+        if not text:
+            return None
+        try:
+            return datetime.fromisoformat(text.replace("Z", "+00:00")).date().isoformat()
+        except ValueError:
+            pass
+        for fmt in ("%Y-%m-%d", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S"):
+            try:
+                return datetime.strptime(text, fmt).date().isoformat()
+            except ValueError:
+                continue
+        return text
+    return None
+
+
+def lastmod_for_doc(doc):
+    """Prefer explicit modification timestamps, falling back to the doc ``date``."""
+    for key in _LASTMOD_FIELDS:
+        date_str = _to_date_str(doc.get(key))
+        if date_str:
+            return date_str
+    return _to_date_str(doc.get("date"))
+
+
+def _static_entries(db, locales):
+    entries = []
+    for route in STATIC_ROUTES:
+        values = dict(route.get("values") or {})
+        if "year" in values:
+            values["year"] = date.today().year
+        entries.append(_entry(route["loc"], locales, **values))
+    return entries
+
+
+def _city_entries(db, locales):
+    entries = []
+    for row in city_stats(db):
+        city = row["name"].lower()
+        entries.append(_entry("city_demos", locales, city=city))
+        entries.append(_entry("today_city_demos", locales, city=city))
+    return entries
+
+
+def _org_entries(db, locales):
+    projection = {"_id": 1, "name": 1, **{f: 1 for f in _LASTMOD_FIELDS}}
+    return [
+        _entry("org", locales, lastmod=lastmod_for_doc(org), org_id=str(org["_id"]))
+        for org in db.organizations.find({}, projection).sort("name", 1)
+    ]
+
+
+def _tag_entries(db, locales):
+    pipeline = [
+        {"$match": DEMO_FILTER},
+        {"$unwind": "$tags"},
+        {"$match": {"tags": {"$type": "string", "$ne": ""}}},
+        {"$group": {"_id": "$tags"}},
+        {"$sort": {"_id": 1}},
+    ]
+    entries = []
+    for row in db.demonstrations.aggregate(pipeline):
+        tag_name = str(row.get("_id") or "").strip().lstrip("#")
+        if tag_name:
+            entries.append(_entry("tag_detail", locales, tag_name=tag_name))
+    return entries
+
+
+def _demo_month_entries(db, locales, year, month, window):
+    start = max(f"{year:04d}-{month:02d}-01", window[0])
+    end = f"{year + 1:04d}-01-01" if month == 12 else f"{year:04d}-{month + 1:02d}-01"
+    query = {**DEMO_FILTER, "date": {"$gte": start, "$lt": end, "$lte": window[1]}}
+    entries = []
+    for demo in db.demonstrations.find(query, _DEMO_PROJECTION).sort("date", 1):
+        identifier = demo.get("slug") or demo.get("running_number") or str(demo.get("_id"))
+        entry = _entry("demonstration_detail", locales, lastmod=lastmod_for_doc(demo), demo_id=identifier)
+        # Not rendered; lets the incremental pass find the shard listing a demo.
+        entry["demo_id"] = str(demo["_id"])
+        entries.append(entry)
+    return entries
+
+
+def _month_of_group(group):
+    """Return ``(year, month)`` of a ``demos-YYYY-MM[-N]`` shard group."""
+    return int(group[6:10]), int(group[11:13])
+
+
+def _stale_listed_months(db, changed_ids):
+    """
+    Return the months whose shards list a changed or vanished demonstration.
+
+    A demo is vanished when a month shard lists it but it is deleted or no
+    longer matches ``DEMO_FILTER``; deletes leave no ``last_modified`` to
+    find, so listed ids are checked against the collection.
+    """
+    shards = db[SHARD_COLLECTION]
+    month_query = {"group": {"$regex": "^demos-"}}
+    listed = set(shards.distinct("entries.demo_id", month_query))
+    if not listed:
+        return set()
+    listed_oids = [ObjectId(demo_id) for demo_id in listed if ObjectId.is_valid(demo_id)]
+    public = {
+        str(doc["_id"])
+        for doc in db.demonstrations.find({**DEMO_FILTER, "_id": {"$in": listed_oids}}, {"_id": 1})
+    }
+    stale = (listed - public) | (listed & {str(demo_id) for demo_id in changed_ids})
+    if not stale:
+        return set()
+    return {
+        _month_of_group(group)
+        for group in shards.distinct("group", {**month_query, "entries.demo_id": {"$in": sorted(stale)}})
+    }
+
+
+# --------------------------------------------------------------------------- #
+# Shard storage
+# --------------------------------------------------------------------------- #
+def _demo_window(today=None):
+    today = today or date.today()
+    return (
+        (today - timedelta(days=DEMO_WINDOW_PAST_DAYS)).isoformat(),
+        (today + timedelta(days=DEMO_WINDOW_FUTURE_DAYS)).isoformat(),
+    )
+
+
+def _window_months(window):
+    year, month = int(window[0][:4]), int(window[0][5:7])
+    last = (int(window[1][:4]), int(window[1][5:7]))
+    months = []
+    while (year, month) <= last:
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def _month_group(year, month):
+    return f"demos-{year:04d}-{month:02d}"
+
+
+def _digest(entries):
+    return hashlib.sha1(json.dumps(entries, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _store_group(db, group, entries, now):
+    """Replace the shard(s) of ``group``; unchanged chunks keep their Last-Modified."""
+    shards = db[SHARD_COLLECTION]
+    chunks = [entries[i:i + MAX_URLS_PER_SHARD] for i in range(0, len(entries), MAX_URLS_PER_SHARD)]
+    names = []
+    for index, chunk in enumerate(chunks or [[]]):
+        name = group if index == 0 else f"{group}-{index + 1}"
+        names.append(name)
+        digest = _digest(chunk)
+        existing = shards.find_one({"_id": name}, {"digest": 1})
+        if existing and existing.get("digest") == digest:
+            continue
+        shards.replace_one(
+            {"_id": name},
+            {
+                "_id": name,
+                "group": group,
+                "entries": chunk,
+                "url_count": len(chunk),
+                "digest": digest,
+                "last_modified": now,
+            },
+            upsert=True,
+        )
+    shards.delete_many({"group": group, "_id": {"$nin": names}})
+
+
+def refresh_sitemaps(db=None, force=False):
+    """
+    Rebuild stale sitemap shards.
+
+    Parameters
+    ----------
+    db : pymongo.database.Database, optional
+    force : bool, optional
+        Rebuild every shard regardless of the watermark.
+
+    Returns
+    -------
+    dict
+        ``{"full": bool, "rebuilt": [group, ...]}``
+    """
+    db = db if db is not None else get_database_manager()
+    if has_request_context():
+        return _refresh(db, force)
+    # url_for needs a request context; paths are host-independent.
+    with current_app.test_request_context("/"):
+        return _refresh(db, force)
+
+
+def _refresh(db, force):
+    now = utcnow()
+    state = db[STATE_COLLECTION].find_one({"_id": STATE_ID}) or {}
+    locales = _alternate_locales()
+    signature = "|".join(locales)
+    window = _demo_window()
+    window_months = _window_months(window)
+    window_groups = {_month_group(*ym) for ym in window_months}
+    watermark = state.get("watermark")
+    org_count = db.organizations.count_documents({})
+
+    full = (
+        force
+        or not watermark
+        or state.get("signature") != signature
+        or not state.get("full_built_at")
+        or now - state["full_built_at"] >= FULL_REBUILD_INTERVAL
+    )
+
+    if full:
+        groups = {"static", "cities", "orgs", "tags"}
+        months = set(window_months)
+    else:
+        groups = set()
+        months = set()
+        changed_since = {"$gt": watermark}
+        changed_ids = []
+        for doc in db.demonstrations.find(
+            {"$or": [{"last_modified": changed_since}, {"updated_at": changed_since}]},
+            {"date": 1},
+        ):
+            changed_ids.append(doc["_id"])
+            raw = str(doc.get("date") or "")
+            try:
+                ym = (int(raw[:4]), int(raw[5:7]))
+            except ValueError:
+                continue
+            if _month_group(*ym) in window_groups:
+                months.add(ym)
+            groups.update({"cities", "tags"})
+        stale_months = _stale_listed_months(db, changed_ids)
+        if stale_months:
+            months.update(ym for ym in stale_months if _month_group(*ym) in window_groups)
+            groups.update({"cities", "tags"})
+        if org_count != state.get("org_count") or db.organizations.find_one(
+            {"$or": [{"last_modified": changed_since}, {"updated_at": changed_since}]},
+            {"_id": 1},
+        ):
+            groups.add("orgs")
+        existing_groups = set(db[SHARD_COLLECTION].distinct("group"))
+        months.update(ym for ym in window_months if _month_group(*ym) not in existing_groups)
+        groups.update(g for g in ("static", "cities", "orgs", "tags") if g not in existing_groups)
+
+    builders = {
+        "static": _static_entries,
+        "cities": _city_entries,
+        "orgs": _org_entries,
+        "tags": _tag_entries,
+    }
+    rebuilt = []
+    for group in ("static", "cities", "orgs", "tags"):
+        if group in groups:
+            _store_group(db, group, builders[group](db, locales), now)
+            rebuilt.append(group)
+    for year, month in sorted(months):
+        group = _month_group(year, month)
+        _store_group(db, group, _demo_month_entries(db, locales, year, month, window), now)
+        rebuilt.append(group)
+
+    db[SHARD_COLLECTION].delete_many(
+        {"group": {"$regex": "^demos-", "$nin": sorted(window_groups)}}
+    )
+
+    update = {"watermark": now, "signature": signature, "org_count": org_count}
+    if full:
+        update["full_built_at"] = now
+    db[STATE_COLLECTION].update_one({"_id": STATE_ID}, {"$set": update}, upsert=True)
+    logger.info("Sitemap refresh (full=%s) rebuilt %d shard group(s)", full, len(rebuilt))
+    return {"full": full, "rebuilt": rebuilt}
+
+
+def run_sitemap_refresh():
+    """Background job entry point."""
+    return refresh_sitemaps()
+
+
+# --------------------------------------------------------------------------- #
+# Serving
+# --------------------------------------------------------------------------- #
+def list_shards(db):
+    """Return shard metadata (without entries) sorted by name."""
+    return list(
+        db[SHARD_COLLECTION].find({}, {"entries": 0}).sort("_id", 1)
+    )
+
+
+def get_shard(db, name):
+    return db[SHARD_COLLECTION].find_one({"_id": name})
+
+
+def _abs(base_url, path):
+    return escape(base_url + path)
+
+
+def render_index(shards, base_url, shard_url):
+    """Serialise a ``<sitemapindex>``; ``shard_url(name)`` returns a shard path."""
+    parts = ['<?xml version="1.0" encoding="utf-8"?>\n', f'<sitemapindex xmlns="{SITEMAP_NS}">']
+    for shard in shards:
+        parts.append("<sitemap><loc>")
+        parts.append(_abs(base_url, shard_url(shard["_id"])))
+        parts.append("</loc>")
+        if shard.get("last_modified"):
+            parts.append(f"<lastmod>{shard['last_modified'].date().isoformat()}</lastmod>")
+        parts.append("</sitemap>")
+    parts.append("</sitemapindex>")
+    return "".join(parts).encode("utf-8")
+
+
+def render_shard(shard, base_url):
+    """Serialise one shard as a ``<urlset>`` with hreflang alternates."""
+    parts = [
+        '<?xml version="1.0" encoding="utf-8"?>\n',
+        f'<urlset xmlns="{SITEMAP_NS}" xmlns:xhtml="{XHTML_NS}">',
+    ]
+    for entry in shard.get("entries") or []:
+        parts.append("<url><loc>")
+        parts.append(_abs(base_url, entry["loc"]))
+        parts.append("</loc>")
+        if entry.get("lastmod"):
+            parts.append(f"<lastmod>{escape(entry['lastmod'])}</lastmod>")
+        for lang, path in entry.get("alternates") or []:
+            parts.append(
+                f'<xhtml:link rel="alternate" hreflang={quoteattr(lang)} href={quoteattr(base_url + path)} />'
+            )
+        parts.append("</url>")
+    parts.append("</urlset>")
+    return "".join(parts).encode("utf-8")
@@ -0,0 +1,172 @@
+"""
+In-process write buffer for high-volume, loss-tolerant inserts.
+
+Documents are queued in memory and written with ``insert_many`` by a daemon
+thread once ``max_batch`` documents are pending or ``flush_interval``
+seconds have passed. The queue is bounded: when it is full new documents
+are dropped and counted instead of blocking the request. At interpreter
+exit :meth:`BatchWriter.close` stops the worker, letting it write the batch
+it is holding, and then flushes whatever is still queued.
+"""
+
+import atexit
+import os
+import queue
+import threading
+import time
+
+from mielenosoitukset_fi.utils.logger import logger
+
+# Queued by close() to wake the worker; never written.
+_STOP = object()
+
+
+class BatchWriter:
+    """
+    Buffer documents for one collection and insert them in batches.
+
+    Parameters
+    ----------
+    get_collection : callable
+        Returns the target ``pymongo.collection.Collection``; resolved at
+        flush time so the writer can be created at import.
+    name : str
+        Used for the worker thread name and log messages.
+    max_batch : int
+        Flush as soon as this many documents are pending.
+    flush_interval : float
+        Flush at least this often (seconds) while documents are pending.
+    max_queue : int
+        Upper bound on pending documents; further documents are dropped.
+    """
+
+    def __init__(self, get_collection, name, max_batch=500, flush_interval=2.0, max_queue=10000):
+        self._get_collection = get_collection
+        self.name = name
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._atexit_registered = False
+        self._counters = {"enqueued": 0, "written": 0, "dropped": 0, "failed": 0, "flushes": 0}
+
+    def add(self, document):
+        """
+        Queue ``document`` for insertion.
+
+        Returns
+        -------
+        bool
+            False when the queue was full and the document was dropped.
+        """
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(document)
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("enqueued")
+        return True
+
+    def flush(self):
+        """Write every pending document now. Safe to call from any thread."""
+        with self._flush_lock:
+            while True:
+                batch = self._drain(self.max_batch)
+                if not batch:
+                    return
+                self._write(batch)
+
+    def close(self, timeout=None):
+        """
+        Stop the worker and write every pending document.
+
+        The worker writes the batch it has already taken off the queue
+        before exiting; ``flush`` alone would miss it. Waits at most
+        ``timeout`` seconds (default ``2 * flush_interval``) for the worker.
+        """
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+            try:
+                self._queue.put_nowait(_STOP)
+            except queue.Full:
+                pass  # the worker is busy and will see the stop flag
+            thread.join(self.flush_interval * 2 if timeout is None else timeout)
+        self.flush()
+
+    def stats(self):
+        """Return counters plus the number of pending documents."""
+        with self._lock:
+            stats = dict(self._counters)
+        stats["pending"] = self._queue.qsize()
+        return stats
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._counters[key] += amount
+
+    def _ensure_worker(self):
+        # Threads do not survive a fork, so pre-fork servers get a fresh
+        # worker in each child process on first use.
+        pid = os.getpid()
+        if self._stop.is_set() or (self._pid == pid and self._thread is not None and self._thread.is_alive()):
+            return
+        with self._lock:
+            if self._stop.is_set() or (self._pid == pid and self._thread is not None and self._thread.is_alive()):
+                return
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-writer", daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.close)
+                self._atexit_registered = True
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            if first is _STOP:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch and not self._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    document = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if document is _STOP:
+                    break
+                batch.append(document)
+            with self._flush_lock:
+                self._write(batch)
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                document = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if document is not _STOP:
+                batch.append(document)
+        return batch
+
+    def _write(self, batch):
+        try:
+            self._get_collection().insert_many(batch, ordered=False)
+        except Exception:
+            self._count("failed", len(batch))
+            logger.exception("%s: failed to write %d buffered documents", self.name, len(batch))
+            return
+        self._count("written", len(batch))
+        self._count("flushes")
@@ -44,7 +44,8 @@ _CONFIG_PATH.write_text(
             "TESTING": True,
             "ENABLE_CHAT": False,
             "ENABLE_EMAIL_WORKER": False,
-            "ENABLE_PANIC_THREAD": False,
+            "RUNTIME_FLAGS_CHECK_INTERVAL_MS": 0,
+            "ANALYTICS_BUFFERED_VIEWS": False,
             "ENABLE_BACKGROUND_JOBS": True,
             "DISABLE_BACKGROUND_JOBS": True,
             "ENFORCE_RATELIMIT": False,
@@ -821,7 +822,6 @@ def app_factory(external_side_effects):
             "TESTING": True,
             "ENABLE_BACKGROUND_JOBS": True,
             "DISABLE_BACKGROUND_JOBS": True,
-            "ENABLE_PANIC_THREAD": False,
             "ENABLE_EMAIL_WORKER": False,
             "ENABLE_CHAT": False,
             "SOCKETIO_MESSAGE_QUEUE": "",
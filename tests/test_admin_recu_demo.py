@@ -430,3 +430,32 @@ def test_recurring_demo_no_change_save_preserves_schedule_and_nullable_values(
     assert saved["organizers"][0]["url"] == "/stored-organizer"
     assert saved["organizers"][0]["is_private"] is True
     assert saved["organizers"][0]["show_email_public"] is False
+
+
+def test_demonstration_parent_is_loaded_lazily(seeded_data, db):
+    from mielenosoitukset_fi.utils.classes import Demonstration
+
+    child = db.demonstrations.find_one({"_id": seeded_data["child_demo_id"]})
+    child["parent"] = seeded_data["recu_demo_id"]
+    child["recurs"] = True
+
+    demo = Demonstration.from_dict(child)
+
+    assert "_parent_object" not in demo.__dict__
+    assert demo.parent_object["_id"] == seeded_data["recu_demo_id"]
+    assert demo.repeat_schedule is not None
+    assert "_parent_object" not in demo.to_dict()
+
+
+def test_demonstration_from_dicts_prefetches_parents(seeded_data, db):
+    from mielenosoitukset_fi.utils.classes import Demonstration
+
+    child = db.demonstrations.find_one({"_id": seeded_data["child_demo_id"]})
+    child["parent"] = seeded_data["recu_demo_id"]
+    plain = db.demonstrations.find_one({"_id": seeded_data["demo_id"]})
+
+    with_parent, without_parent = Demonstration.from_dicts([child, plain])
+
+    assert with_parent.__dict__["_parent_object"]["_id"] == seeded_data["recu_demo_id"]
+    assert without_parent.parent_object is None
+    assert without_parent.repeat_schedule is None
@@ -64,6 +64,123 @@ def test_background_job_manager_executes_prep_job_and_records_audit(app, seeded_
     assert run_doc["status"] == "success"
 
 
+@pytest.mark.integration
+@pytest.mark.jobs
+def test_prep_rolls_up_new_view_events_incrementally(app, seeded_data, db, monkeypatch):
+    from mielenosoitukset_fi.utils import analytics
+
+    monkeypatch.setattr(analytics, "ROLLUP_SETTLE_SECONDS", 0)
+    demo_id = seeded_data["demo_id"]
+
+    def views():
+        return db.prepped_analytics.find_one({"demo_id": demo_id})["views"]
+
+    with app.app_context():
+        analytics.prep()
+        assert views() == 2
+
+        db.analytics.insert_one({"demo_id": demo_id, "timestamp": utcnow(), "session_id": "s4"})
+        watermark_before = db["_meta"].find_one({"_id": analytics.ROLLUP_META_ID})["last_seen_id"]
+        result = analytics.prep()
+        assert result["batches"] == 1
+        assert views() == 3
+
+        # Nothing new: totals are untouched.
+        analytics.prep()
+        assert views() == 3
+
+        # A batch retried after a crash before the watermark moved is a no-op.
+        db["_meta"].update_one(
+            {"_id": analytics.ROLLUP_META_ID}, {"$set": {"last_seen_id": watermark_before}}
+        )
+        analytics.prep()
+        assert views() == 3
+        assert db.prepped_analytics.count_documents({"demo_id": demo_id}) == 1
+
+
+@pytest.mark.integration
+@pytest.mark.jobs
+def test_prep_retry_after_crash_reuses_the_interrupted_batch(app, seeded_data, db, monkeypatch):
+    from mielenosoitukset_fi.utils import analytics
+
+    monkeypatch.setattr(analytics, "ROLLUP_SETTLE_SECONDS", 0)
+    demo_id = seeded_data["demo_id"]
+
+    def views():
+        return db.prepped_analytics.find_one({"demo_id": demo_id})["views"]
+
+    with app.app_context():
+        analytics.prep()
+        assert views() == 2
+
+        db.analytics.insert_one({"demo_id": demo_id, "timestamp": utcnow(), "session_id": "s4"})
+        set_watermark = analytics._set_rollup_watermark
+
+        def crash(last_seen_id):
+            raise RuntimeError("worker killed")
+
+        monkeypatch.setattr(analytics, "_set_rollup_watermark", crash)
+        with pytest.raises(RuntimeError):
+            analytics.prep()
+        assert views() == 3  # written, but the watermark did not move
+
+        # New events settle before the retry, so a fresh bound would be larger.
+        db.analytics.insert_one({"demo_id": demo_id, "timestamp": utcnow(), "session_id": "s5"})
+        monkeypatch.setattr(analytics, "_set_rollup_watermark", set_watermark)
+        analytics.prep()
+        assert views() == 4
+
+
+@pytest.mark.integration
+@pytest.mark.jobs
+def test_prep_trims_only_rolled_up_events_past_retention(app, seeded_data, db, monkeypatch):
+    from mielenosoitukset_fi.utils import analytics
+
+    monkeypatch.setattr(analytics, "ROLLUP_SETTLE_SECONDS", 0)
+    monkeypatch.setattr(analytics.Config, "ANALYTICS_RAW_RETENTION_DAYS", 365)
+    old_id = ObjectId.from_datetime(utcnow() - timedelta(days=400))
+    db.analytics.insert_one({"_id": old_id, "demo_id": seeded_data["demo_id"], "timestamp": utcnow()})
+
+    with app.app_context():
+        assert analytics.trim_rolled_up_events() == 0  # not rolled up yet
+        # The d_analytics poller has never run, so nothing may go yet.
+        assert analytics.prep()["trimmed"] == 0
+        assert db.analytics.find_one({"_id": old_id})
+
+        db["_meta"].insert_one({"_id": "analytics_rollup", "last_seen_id": ObjectId()})
+        result = analytics.prep()
+
+    assert result["trimmed"] == 1
+
+    assert db.analytics.find_one({"_id": old_id}) is None
+    assert db.analytics.count_documents({}) == 3
+    assert db.prepped_analytics.find_one({"demo_id": seeded_data["demo_id"]})["views"] == 3
+
+
+@pytest.mark.integration
+@pytest.mark.jobs
+def test_trim_keeps_events_the_minute_poller_has_not_reached(app, seeded_data, db, monkeypatch):
+    from mielenosoitukset_fi.utils import analytics
+
+    monkeypatch.setattr(analytics, "ROLLUP_SETTLE_SECONDS", 0)
+    monkeypatch.setattr(analytics.Config, "ANALYTICS_RAW_RETENTION_DAYS", 365)
+    older_id = ObjectId.from_datetime(utcnow() - timedelta(days=400))
+    newer_id = ObjectId.from_datetime(utcnow() - timedelta(days=390))
+    for event_id in (older_id, newer_id):
+        db.analytics.insert_one({"_id": event_id, "demo_id": seeded_data["demo_id"], "timestamp": utcnow()})
+    # Prep is fully caught up but the poller lags behind the newer old event.
+    db["_meta"].insert_one(
+        {"_id": "analytics_rollup", "last_seen_id": ObjectId.from_datetime(utcnow() - timedelta(days=395))}
+    )
+
+    with app.app_context():
+        result = analytics.prep()
+
+    assert result["trimmed"] == 1
+    assert db.analytics.find_one({"_id": older_id}) is None
+    assert db.analytics.find_one({"_id": newer_id})
+
+
 @pytest.mark.integration
 @pytest.mark.jobs
 def test_background_job_audit_records_history_for_all_demo_write_paths(db):
@@ -647,3 +764,23 @@ def test_admin_pending_reminder_keeps_recent_completed_notifications_as_blockers
         )
         == 1
     )
+
+
+def test_demo_scores_job_ranks_demos_and_drops_unviewed_ones(db, seeded_data):
+    from mielenosoitukset_fi.utils import analytics_buckets
+    from mielenosoitukset_fi.utils.demo_scores import compute_demo_scores, top_scores
+
+    demo_id, pending_demo_id = seeded_data["demo_id"], seeded_data["pending_demo_id"]
+    db.d_analytics.delete_many({})
+    db.demo_scores.delete_many({})
+    for oid in (demo_id, pending_demo_id):
+        analytics_buckets.rebuild_demo(db, oid)
+
+    assert compute_demo_scores(db) == {"scored": 2, "removed": 0}
+    ranked = top_scores(db, 5, sort_field="trending_views")
+    assert [(doc["demo_id"], doc["trending_views"]) for doc in ranked] == [(demo_id, 2), (pending_demo_id, 1)]
+    assert ranked[0]["trending"] == 1.0 and ranked[1]["trending"] == 0.5
+
+    db.d_analytics.delete_many({"demo_id": pending_demo_id})
+    assert compute_demo_scores(db) == {"scored": 1, "removed": 1}
+    assert [doc["demo_id"] for doc in top_scores(db, 5)] == [demo_id]
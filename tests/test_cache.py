@@ -0,0 +1,67 @@
+import threading
+import time
+
+from cachelib import SimpleCache
+
+from mielenosoitukset_fi.utils.cache import TieredCache
+
+
+def test_tiered_cache_serves_l1_then_l2_and_rebuilds_after_expiry():
+    backend = SimpleCache()
+    tiered = TieredCache(backend, beta=0)
+    calls = []
+
+    def build():
+        calls.append(1)
+        return {"n": len(calls)}
+
+    assert tiered.get_or_set("key", build, timeout=60) == {"n": 1}
+    assert tiered.get_or_set("key", build, timeout=60) == {"n": 1}
+    tiered.clear_local()
+    assert tiered.get_or_set("key", build, timeout=60) == {"n": 1}
+    assert calls == [1]
+    stats = tiered.stats()
+    assert (stats["l1_hits"], stats["l2_hits"], stats["misses"]) == (1, 1, 1)
+
+    entry = backend.get("key")
+    backend.set("key", dict(entry, expires=time.time() - 1))
+    tiered.clear_local()
+    assert tiered.get_or_set("key", build, timeout=60) == {"n": 2}
+
+
+def test_tiered_cache_serves_stale_while_another_worker_rebuilds():
+    backend = SimpleCache()
+    tiered = TieredCache(backend, beta=0)
+    tiered.get_or_set("key", lambda: "old", timeout=60)
+    backend.set("key", dict(backend.get("key"), expires=time.time() - 1))
+    tiered.clear_local()
+    backend.add("key:lock", "other-worker")
+
+    assert tiered.get_or_set("key", lambda: "new", timeout=60) == "old"
+    assert tiered.stats()["stale_served"] == 1
+
+
+def test_tiered_cache_builds_a_missing_key_once_for_concurrent_readers():
+    tiered = TieredCache(SimpleCache(), beta=0)
+    calls = []
+    release = threading.Event()
+
+    def build():
+        calls.append(1)
+        release.wait(timeout=5)
+        return "value"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(tiered.get_or_set("key", build, timeout=60)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert results == ["value"] * 4
+    assert calls == [1]
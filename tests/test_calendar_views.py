@@ -0,0 +1,39 @@
+from mielenosoitukset_fi.utils.calendar_data import month_date_range
+
+
+def test_month_date_range_is_half_open_and_wraps_december():
+    assert month_date_range(2026, 5) == ("2026-05-01", "2026-06-01")
+    assert month_date_range(2026, 12) == ("2026-12-01", "2027-01-01")
+
+
+def test_calendar_month_view_only_lists_requested_month(app, seeded_data):
+    client = app.test_client()
+
+    may_page = client.get("/calendar/2026/5/").get_data(as_text=True)
+    june_page = client.get("/calendar/2026/6/").get_data(as_text=True)
+
+    assert "Climate March Helsinki" in may_page
+    assert "Climate March Helsinki" not in june_page
+
+
+def test_calendar_year_view_groups_demos_by_month(app, seeded_data):
+    response = app.test_client().get("/calendar/2026/")
+
+    assert response.status_code == 200
+    assert "Climate March Helsinki" in response.get_data(as_text=True)
+
+
+def test_calendar_month_cache_is_invalidated_when_demo_moves(app, db, seeded_data):
+    from mielenosoitukset_fi.utils.classes import Demonstration
+
+    client = app.test_client()
+    assert "Climate March Helsinki" not in client.get("/calendar/2026/6/").get_data(as_text=True)
+    assert "Climate March Helsinki" in client.get("/calendar/2026/5/").get_data(as_text=True)
+
+    with app.app_context():
+        demo = Demonstration.load_by_id(str(seeded_data["demo_id"]))
+        demo.date = "2026-06-10"
+        demo.save()
+
+    assert "Climate March Helsinki" in client.get("/calendar/2026/6/").get_data(as_text=True)
+    assert "Climate March Helsinki" not in client.get("/calendar/2026/5/").get_data(as_text=True)
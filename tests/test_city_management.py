@@ -1,3 +1,5 @@
+from datetime import date
+
 from tests.conftest import _client_for_user
 
 
@@ -11,6 +13,30 @@ def test_public_cities_lists_enabled_contact_cities_and_demo_cities(app, db, see
     assert "Varkaus" not in page
 
 
+def test_city_stats_counts_city_keys_and_legacy_city_names_in_one_pass(app, db, seeded_data):
+    from mielenosoitukset_fi.utils.city_settings import city_stats
+
+    today = date.today().isoformat()
+    db.demonstrations.insert_many(
+        [
+            {"title": "Tampere today", "city": "Tampere", "city_key": "tampere",
+             "date": today, "approved": True, "hide": False},
+            {"title": "Tampere legacy", "city": "TAMPERE", "date": "2099-01-01",
+             "approved": True},
+            {"title": "Tampere hidden", "city": "Tampere", "city_key": "tampere",
+             "date": today, "approved": True, "hide": True},
+        ]
+    )
+
+    with app.test_request_context("/"):
+        stats = {row["key"]: row for row in city_stats(db)}
+
+    assert stats["tampere"]["demo_count"] == 2
+    assert stats["tampere"]["today_count"] == 1
+    assert stats["helsinki"]["demo_count"] >= 1
+    assert "varkaus" not in stats
+
+
 def test_admin_city_control_can_toggle_enabled_city(app, db, seeded_data):
     client = _client_for_user(app, seeded_data["admin_id"])
 
@@ -3,7 +3,12 @@ from copy import deepcopy
 from bson import ObjectId
 
 from mielenosoitukset_fi.users.models import User
+from mielenosoitukset_fi.utils.admin_tasks import rebuild_admin_tasks, sync_demo_tasks, tasks_for_user
 from mielenosoitukset_fi.utils.cities import normalize_city_key
+from mielenosoitukset_fi.utils.classes.MemberShip import MemberShip
+from mielenosoitukset_fi.utils.permission_filters import MATCH_NOTHING, demo_permission_filter
+from mielenosoitukset_fi.utils.principal import bump_permissions_version, load_user_principal, principal_cache
+from mielenosoitukset_fi.utils.wrappers import has_demo_permission
 from tests.conftest import _client_for_user
 
 
@@ -137,3 +142,117 @@ def test_edit_user_revokes_object_id_backed_city_scope_grant(app, db, seeded_dat
         {"user_id": scoped_user_id, "scope_type": "city"}
     )
     assert grant["revoked_at"] is not None
+
+
+def test_compiled_demo_permission_filter_matches_per_demo_checks(app, db, seeded_data):
+    scoped_user_id = _create_scoped_admin(db, ["helsinki"], ["LIST_DEMOS"])
+    member_org_id = ObjectId()
+    db.memberships.insert_one(
+        {
+            "_id": ObjectId(),
+            "user_id": scoped_user_id,
+            "organization_id": member_org_id,
+            "role": "admin",
+            "permissions": ["LIST_DEMOS"],
+        }
+    )
+
+    template = db.demonstrations.find_one({"_id": seeded_data["pending_demo_id"]})
+    extra = {
+        "turku_org": {"organizers": [{"name": "Member Org", "organization_id": str(member_org_id)}]},
+        "turku_editor": {"editors": [str(scoped_user_id)]},
+        "turku_other": {},
+    }
+    extra_ids = {}
+    for slug, fields in extra.items():
+        doc = deepcopy(template)
+        doc.update(
+            {
+                "_id": ObjectId(),
+                "slug": slug,
+                "city": "Turku",
+                "city_key": normalize_city_key("Turku"),
+                "editors": [],
+                "organizers": [],
+                **fields,
+            }
+        )
+        db.demonstrations.insert_one(doc)
+        extra_ids[slug] = doc["_id"]
+
+    user = User.from_db(db.users.find_one({"_id": scoped_user_id}))
+    with app.test_request_context():
+        compiled = {
+            doc["_id"]
+            for doc in db.demonstrations.find(demo_permission_filter(user, "LIST_DEMOS"), {"_id": 1})
+        }
+        per_demo = {
+            doc["_id"]
+            for doc in db.demonstrations.find({}, {"_id": 1})
+            if has_demo_permission(user, doc["_id"], "LIST_DEMOS")
+        }
+
+    assert compiled == per_demo
+    assert {extra_ids["turku_org"], extra_ids["turku_editor"], seeded_data["pending_demo_id"]} <= compiled
+    assert extra_ids["turku_other"] not in compiled
+    assert demo_permission_filter(None, "LIST_DEMOS") == MATCH_NOTHING
+
+
+def test_principal_snapshot_is_reused_until_permissions_version_changes(app, db, seeded_data):
+    scoped_user_id = _create_scoped_admin(db, ["helsinki"], ["LIST_DEMOS"])
+    principal_cache.clear()
+
+    first = load_user_principal(db, scoped_user_id)
+    assert first.scoped_city_keys_for("LIST_DEMOS") == ["helsinki"]
+
+    # Without a version bump the cached snapshot is served as is.
+    db.admin_scope_grants.delete_many({"user_id": scoped_user_id})
+    cached = load_user_principal(db, scoped_user_id)
+    assert cached._principal is first._principal
+    assert cached.has_scoped_permission("LIST_DEMOS", scope_type="city", scope_key="helsinki")
+
+    bump_permissions_version(db, scoped_user_id)
+    fresh = load_user_principal(db, scoped_user_id)
+    assert fresh._principal is not first._principal
+    assert fresh.scoped_city_keys_for("LIST_DEMOS") == []
+
+    MemberShip(scoped_user_id, seeded_data["org_id"], role="admin").save()
+    member = load_user_principal(db, scoped_user_id)
+    assert member.has_permission("EDIT_DEMO", seeded_data["org_id"])
+    assert db.users.find_one({"_id": scoped_user_id})["permissions_version"] == 2
+
+
+def test_admin_tasks_follow_writers_and_permission_scope(app, db, seeded_data):
+    scoped_user_id = _create_scoped_admin(db, ["helsinki"], ["LIST_DEMOS", "VIEW_DEMO", "ACCEPT_DEMO"])
+    helsinki_demo_id = seeded_data["pending_demo_id"]
+    rebuild_admin_tasks(db)
+
+    turku_demo = deepcopy(db.demonstrations.find_one({"_id": helsinki_demo_id}))
+    turku_demo.update(
+        {
+            "_id": ObjectId(),
+            "title": "Turku Task Outside Scope",
+            "city": "Turku",
+            "city_key": normalize_city_key("Turku"),
+            "slug": "turku-task-outside-scope",
+            "editors": [],
+        }
+    )
+    db.demonstrations.insert_one(turku_demo)
+    sync_demo_tasks(db, turku_demo["_id"])
+
+    user = User.from_db(db.users.find_one({"_id": scoped_user_id}))
+    admin = User.from_db(db.users.find_one({"_id": seeded_data["admin_id"]}))
+    with app.test_request_context():
+        scoped_ids = {task["id"] for task in tasks_for_user(db, user)}
+        admin_ids = {task["id"] for task in tasks_for_user(db, admin)}
+        assert tasks_for_user(db, None) == []
+
+    assert str(helsinki_demo_id) in scoped_ids
+    assert str(turku_demo["_id"]) not in scoped_ids
+    assert {str(helsinki_demo_id), str(turku_demo["_id"])} <= admin_ids
+
+    client = _client_for_user(app, scoped_user_id)
+    assert client.post(f"/api/admin/demo/{helsinki_demo_id}/approve").status_code == 200
+    assert db.admin_tasks.find_one({"ref_id": helsinki_demo_id}) is None
+    assert db.admin_tasks.find_one({"ref_id": turku_demo["_id"]}) is not None
@@ -0,0 +1,71 @@
+from bson import ObjectId
+
+from mielenosoitukset_fi.utils.demo_identifiers import (
+    IdentifierCache,
+    identifier_cache,
+    invalidate_demo_identifiers,
+    resolve_demo,
+)
+
+
+class _CountingCollection:
+    def __init__(self, collection):
+        self._collection = collection
+        self.calls = 0
+
+    def find(self, *args, **kwargs):
+        self.calls += 1
+        return self._collection.find(*args, **kwargs)
+
+    def find_one(self, *args, **kwargs):
+        self.calls += 1
+        return self._collection.find_one(*args, **kwargs)
+
+
+def test_identifier_cache_evicts_least_recently_used():
+    cache = IdentifierCache(maxsize=2)
+    first, second, third = ObjectId(), ObjectId(), ObjectId()
+
+    cache.set("a", first)
+    cache.set("b", second)
+    assert cache.get("a") == first
+    cache.set("c", third)
+
+    assert cache.get("b") is None
+    assert cache.get("c") == third
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 1, 2)
+    assert stats["hit_rate"] == round(2 / 3, 4)
+
+
+def test_resolve_demo_uses_one_query_per_lookup(db, seeded_data):
+    identifier_cache.clear()
+    demo_id = seeded_data["demo_id"]
+    alias = ObjectId()
+    db.demonstrations.update_one({"_id": demo_id}, {"$set": {"aliases": [str(alias)]}})
+    collection = _CountingCollection(db.demonstrations)
+
+    for identifier in ("climate-march-helsinki", "1001", str(alias), str(demo_id)):
+        collection.calls = 0
+        assert resolve_demo(collection, identifier)["_id"] == demo_id
+        assert collection.calls == 1
+        # The second lookup is a point read by the cached _id.
+        assert resolve_demo(collection, identifier)["_id"] == demo_id
+        assert collection.calls == 2
+
+    assert resolve_demo(collection, "no-such-demo") is None
+
+
+def test_resolve_demo_revalidates_and_invalidates_moved_slugs(db, seeded_data):
+    identifier_cache.clear()
+    demo_id, other_id = seeded_data["demo_id"], seeded_data["pending_demo_id"]
+    assert resolve_demo(db.demonstrations, "climate-march-helsinki")["_id"] == demo_id
+
+    # Another worker moves the slug: the cached mapping no longer matches.
+    db.demonstrations.update_one({"_id": demo_id}, {"$set": {"slug": "renamed"}})
+    db.demonstrations.update_one({"_id": other_id}, {"$set": {"slug": "climate-march-helsinki"}})
+    assert resolve_demo(db.demonstrations, "climate-march-helsinki")["_id"] == other_id
+    assert identifier_cache.stats()["stale"] >= 1
+
+    invalidate_demo_identifiers(other_id)
+    assert identifier_cache.get("climate-march-helsinki") is None
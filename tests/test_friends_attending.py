@@ -0,0 +1,38 @@
+from bson import ObjectId
+
+
+def test_friends_attending_groups_friends_per_demo(user_client, db, seeded_data):
+    demo_id, other_id = seeded_data["demo_id"], seeded_data["pending_demo_id"]
+    db.demo_attending.insert_many(
+        [
+            {"demo_id": demo_id, "user_id": seeded_data["friend_id"], "attending": True},
+            {"demo_id": other_id, "user_id": seeded_data["friend_id"], "attending": False},
+            {"demo_id": demo_id, "user_id": seeded_data["admin_id"], "attending": True},
+        ]
+    )
+
+    response = user_client.post(
+        "/api/friends-attending",
+        json={"demo_ids": [str(demo_id), str(other_id), "not-an-id"]},
+    )
+
+    assert response.status_code == 200
+    assert response.get_json() == {
+        str(demo_id): [{"user_id": str(seeded_data["friend_id"]), "name": "Bob Friend", "avatar": None}],
+        str(other_id): [],
+    }
+
+
+def test_friends_attending_rejects_oversized_requests(user_client):
+    response = user_client.post(
+        "/api/friends-attending", json={"demo_ids": [str(ObjectId()) for _ in range(101)]}
+    )
+
+    assert response.status_code == 400
+
+
+def test_friends_attending_is_empty_for_anonymous_users(client, seeded_data):
+    response = client.post("/api/friends-attending", json={"demo_ids": [str(seeded_data["demo_id"])]})
+
+    assert response.status_code == 200
+    assert response.get_json() == {str(seeded_data["demo_id"]): []}
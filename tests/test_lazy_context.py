@@ -0,0 +1,64 @@
+from bson import ObjectId
+from flask import Flask, render_template_string
+
+from mielenosoitukset_fi.utils.lazy_context import LOOKUP_HEADER, lazy_value, lookup_stats, memoized
+from tests.conftest import _client_for_user
+
+
+def test_lazy_value_loads_on_first_use_and_memoises_per_request():
+    app = Flask(__name__)
+    calls = []
+
+    def load():
+        calls.append(1)
+        return ["Helsinki", "Turku"]
+
+    with app.test_request_context("/"):
+        value = lazy_value("cities", load)
+        assert render_template_string("static") == "static"
+        assert calls == []
+
+        html = render_template_string(
+            "{% for city in cities %}{{ city }} {% endfor %}{{ cities|length }}", cities=value
+        )
+        assert html == "Helsinki Turku 2"
+        assert "Turku" in value
+        assert calls == [1]
+        assert lookup_stats() == {"lookups": 1, "hits": 2}
+
+    with app.test_request_context("/"):
+        assert list(lazy_value("cities", load)) == ["Helsinki", "Turku"]
+        assert calls == [1, 1]
+
+
+def test_memoized_shares_results_between_object_id_and_string_arguments():
+    app = Flask(__name__)
+    calls = []
+
+    @memoized
+    def org_name(org_id):
+        calls.append(org_id)
+        return f"Org {org_id}"
+
+    org_id = ObjectId()
+    with app.test_request_context("/"):
+        assert org_name(org_id) == org_name(str(org_id))
+        org_name(ObjectId())
+        assert len(calls) == 2
+        assert lookup_stats()["lookups"] == 2
+
+
+def test_pages_only_count_context_lookups_they_render(app, seeded_data):
+    anonymous = app.test_client().get("/info")
+    assert anonymous.status_code == 200
+    assert anonymous.headers[LOOKUP_HEADER] == "0"
+
+    client = _client_for_user(app, seeded_data["user_id"])
+    signed_in = client.get("/info")
+    assert signed_in.status_code == 200
+    assert "notif-btn" in signed_in.get_data(as_text=True)
+    # The header's notification badge reads user_notifications once.
+    assert signed_in.headers[LOOKUP_HEADER] == "1"
+
+    api = client.get("/api/v1/demonstrations")
+    assert api.headers[LOOKUP_HEADER] == "0"
@@ -4,7 +4,7 @@ from pathlib import Path
 TEMPLATE_ROOT = Path("mielenosoitukset_fi/templates")
 ORGANIZATION_LOGO_TEMPLATES = (
     "admin_V2/organizations/form.html",
-    "detail.html",
+    "demo_views/_detail_content.html",
     "organizations/fill_info.html",
     "organizations/details.html",
     "users/profile/profile.html",
@@ -1,4 +1,7 @@
-from datetime import date, timedelta
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
 
 
 def test_public_demonstrations_list_uses_summary_payload(client, db, seeded_data):
@@ -37,3 +40,384 @@ def test_public_demonstrations_list_uses_summary_payload(client, db, seeded_data
     assert "large_internal_payload" not in demo
     assert "edit_history" not in demo
     assert "private_notes" not in demo
+
+
+def test_v1_city_filter_matches_city_key_and_paginates_in_db(client, db, seeded_data):
+    future_date = (date.today() + timedelta(days=7)).isoformat()
+    db.demonstrations.update_many(
+        {"_id": {"$in": [seeded_data["demo_id"], seeded_data["child_demo_id"]]}},
+        {"$set": {"date": future_date, "city": "Helsinki", "city_key": "helsinki"}},
+    )
+    db.demonstrations.update_one(
+        {"_id": seeded_data["child_demo_id"]},
+        {"$set": {"start_time": "15:00"}},
+    )
+
+    first = client.get("/api/v1/demonstrations", query_string={"city": "Helsinki", "per_page": "1"})
+    second = client.get(
+        "/api/v1/demonstrations", query_string={"city": "helsinki", "per_page": "1", "page": "2"}
+    )
+    other_city = client.get("/api/v1/demonstrations", query_string={"city": "Tampere"})
+
+    assert first.get_json()["total_pages"] == 2
+    assert [demo["_id"] for demo in first.get_json()["demonstrations"]] == [str(seeded_data["demo_id"])]
+    assert [demo["_id"] for demo in second.get_json()["demonstrations"]] == [str(seeded_data["child_demo_id"])]
+    assert other_city.get_json()["demonstrations"] == []
+
+
+def test_city_page_locks_its_city_and_lists_only_its_demos(app, db, seeded_data):
+    future_date = (date.today() + timedelta(days=7)).isoformat()
+    db.demonstrations.update_many(
+        {"_id": {"$in": [seeded_data["demo_id"], seeded_data["child_demo_id"]]}},
+        {"$set": {"date": future_date}},
+    )
+    db.demonstrations.update_one(
+        {"_id": seeded_data["demo_id"]}, {"$set": {"city": "Helsinki", "city_key": "helsinki"}}
+    )
+    db.demonstrations.update_one(
+        {"_id": seeded_data["child_demo_id"]}, {"$set": {"city": "Tampere", "city_key": "tampere"}}
+    )
+    client = app.test_client()
+
+    page = client.get("/city/helsinki").get_data(as_text=True)
+    # The list itself is rendered client-side from the API, with the city locked.
+    assert 'const cityList = ["Helsinki"];' in page
+    assert 'query.city = "Helsinki";' in page
+
+    listed = client.get("/api/v1/demonstrations", query_string={"city": "Helsinki"}).get_json()
+    assert [demo["_id"] for demo in listed["demonstrations"]] == [str(seeded_data["demo_id"])]
+
+
+def test_v1_list_serves_demo_summaries(client, db, seeded_data):
+    from mielenosoitukset_fi.utils.demo_summary import with_derived_fields
+
+    future_date = (date.today() + timedelta(days=7)).isoformat()
+    update = {
+        "date": future_date,
+        "city_key": "helsinki",
+        "start_time": "12:00:00",
+        "description": "<p>" + "x" * 5000 + "</p>",
+    }
+    db.demonstrations.update_one({"_id": seeded_data["demo_id"]}, {"$set": with_derived_fields(update)})
+
+    response = client.get("/api/v1/demonstrations", query_string={"city": "Helsinki"})
+
+    demo = next(
+        item for item in response.get_json()["demonstrations"] if item["_id"] == str(seeded_data["demo_id"])
+    )
+    assert demo["slug"] == "climate-march-helsinki"
+    assert demo["start_time_display"] == "12:00"
+    assert demo["date_display"] == date.fromisoformat(future_date).strftime("%d.%m.%Y")
+    assert "description" not in demo
+
+
+def test_demo_summary_survives_cache_round_trip():
+    import pickle
+
+    from bson import ObjectId
+
+    from mielenosoitukset_fi.utils.demo_summary import DemoSummary
+
+    summary = DemoSummary(
+        {"_id": ObjectId(), "title": "Demo", "date": "2026-05-01", "start_time": "10:00", "end_time": "11:30"},
+        with_description=True,
+    )
+    restored = pickle.loads(pickle.dumps(summary))
+
+    assert not hasattr(restored, "__dict__")
+    assert restored.to_api() == summary.to_api()
+    assert restored.time_display == "10:00 - 11:30"
+    assert restored.detail_identifier == str(summary._id)
+
+
+def test_derived_display_fields_are_stored_and_backfilled(db, seeded_data):
+    from datetime import datetime
+
+    from mielenosoitukset_fi.utils.classes import Demonstration
+    from mielenosoitukset_fi.utils.migrations.migration_006_derived_demo_fields import (
+        migrate_derived_demo_fields,
+    )
+
+    demo_id = seeded_data["demo_id"]
+    db.demonstrations.update_one(
+        {"_id": demo_id},
+        {
+            "$set": {"date": "2026-06-01", "start_time": "12:00:00", "description": "<p>Hi<script>x</script></p>"},
+            "$unset": {"start_datetime": "", "description_html": ""},
+        },
+    )
+
+    assert migrate_derived_demo_fields(db=db)["updated"] == db.demonstrations.count_documents({})
+    stored = db.demonstrations.find_one({"_id": demo_id})
+    assert stored["formatted_date"] == "01.06.2026"
+    assert stored["start_time_display"] == "12:00"
+    assert stored["start_datetime"] == datetime(2026, 6, 1, 9, 0)  # 12:00 EEST
+    assert "<script>" not in stored["description_html"]
+
+    demo = Demonstration.from_dict(stored)
+    demo.start_time = "18:30"
+    demo.save()
+    resaved = db.demonstrations.find_one({"_id": demo_id})
+    assert resaved["start_time_display"] == "18:30"
+    assert resaved["start_datetime"] == datetime(2026, 6, 1, 15, 30)
+
+
+def test_rollback_recomputes_derived_display_fields(admin_client, db, seeded_data):
+    demo_id = seeded_data["demo_id"]
+    old_demo = db.demonstrations.find_one({"_id": demo_id})
+    # History written before the derived fields existed carries stale ones.
+    old_demo.update({"date": "2026-07-04", "start_time": "09:15", "formatted_date": "01.01.2020"})
+    history_id = db.demo_edit_history.insert_one(
+        {"demo_id": str(demo_id), "old_demo": old_demo, "new_demo": None}
+    ).inserted_id
+
+    response = admin_client.post(f"/admin/demo/rollback_demo/{history_id}")
+
+    assert response.status_code == 302
+    stored = db.demonstrations.find_one({"_id": demo_id})
+    assert stored["formatted_date"] == "04.07.2026"
+    assert stored["start_time_display"] == "09:15"
+
+
+def _follow_state(response):
+    import json
+    import re
+
+    match = re.search(
+        r'<script type="application/json" id="demo-follow-state">(.*?)</script>',
+        response.get_data(as_text=True),
+        re.S,
+    )
+    return json.loads(match.group(1))
+
+
+def test_detail_fragment_is_shared_between_signed_in_viewers(app, admin_client, user_client, db, seeded_data, monkeypatch):
+    from mielenosoitukset_fi.utils.cache import cache
+
+    # Test requests come from localhost, which always bypasses the cache.
+    view_globals = app.view_functions["demonstration_detail"].__globals__
+    monkeypatch.setitem(view_globals, "should_skip_cache", lambda public_only=True: False)
+
+    cache.clear()
+    org_id = str(db.demonstrations.find_one({"_id": seeded_data["demo_id"]})["organizers"][0]["organization_id"])
+    db.users.update_one({"_id": seeded_data["user_id"]}, {"$set": {"followed_organizations": [org_id]}})
+    url = f"/demonstration/{seeded_data['demo_id']}"
+
+    first = admin_client.get(url)
+    second = user_client.get(url)
+
+    assert first.status_code == second.status_code == 200
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"].startswith("HIT")
+    assert 'data-following="1"' not in second.get_data(as_text=True)
+    assert _follow_state(first)["organizer_follow_map"] == {org_id: False}
+    assert _follow_state(second)["organizer_follow_map"] == {org_id: True}
+
+
+def test_demo_writes_bump_only_their_cache_tags(app, db, seeded_data):
+    from mielenosoitukset_fi.utils.cache import (
+        PUBLIC_LIST_TAG,
+        city_tag,
+        demo_tag,
+        invalidate_tags,
+        tagged_cache_key,
+    )
+    from mielenosoitukset_fi.utils.classes import Demonstration
+
+    demo_key = tagged_cache_key("detail", [demo_tag(seeded_data["demo_id"])])
+    other_key = tagged_cache_key("detail", [demo_tag(seeded_data["pending_demo_id"])])
+    city_key = tagged_cache_key("city", [city_tag("Helsinki")])
+    list_key = tagged_cache_key("list", [PUBLIC_LIST_TAG])
+
+    demo = Demonstration.load_by_id(str(seeded_data["demo_id"]))
+    demo.title = "Climate March Helsinki, updated"
+    demo.save()
+
+    assert tagged_cache_key("detail", [demo_tag(seeded_data["demo_id"])]) != demo_key
+    assert tagged_cache_key("detail", [demo_tag(seeded_data["pending_demo_id"])]) == other_key
+    assert tagged_cache_key("city", [city_tag("helsinki")]) != city_key
+    assert tagged_cache_key("list", [PUBLIC_LIST_TAG]) != list_key
+
+    list_key = tagged_cache_key("list", [PUBLIC_LIST_TAG])
+    invalidate_tags(city_tag("Tampere"))
+    assert tagged_cache_key("list", [PUBLIC_LIST_TAG]) == list_key
+
+
+def test_admin_delete_and_case_edit_bump_demo_cache_tags(app, admin_client, db, seeded_data):
+    from mielenosoitukset_fi.utils.cache import PUBLIC_LIST_TAG, demo_tag, tagged_cache_key
+
+    with app.app_context():
+        pending_key = tagged_cache_key("detail", [demo_tag(seeded_data["pending_demo_id"])])
+        list_key = tagged_cache_key("list", [PUBLIC_LIST_TAG])
+
+    admin_client.post(
+        f"/admin/case/{seeded_data['case_id']}/update_demo/",
+        data={"name": "Renamed", "date": "2026-08-01", "description": "Updated"},
+    )
+    with app.app_context():
+        assert tagged_cache_key("detail", [demo_tag(seeded_data["pending_demo_id"])]) != pending_key
+
+    response = admin_client.post(
+        "/admin/demo/delete_demo",
+        json={"demo_id": str(seeded_data["demo_id"])},
+        headers={"Content-Type": "application/json"},
+    )
+    assert response.status_code == 200
+    assert db.demonstrations.find_one({"_id": seeded_data["demo_id"]}) is None
+    with app.app_context():
+        assert tagged_cache_key("list", [PUBLIC_LIST_TAG]) != list_key
+
+
+def test_cached_list_responses_support_etags(app, client, seeded_data, monkeypatch):
+    for endpoint in ("api_demonstrations", "api.list_demonstrations"):
+        view_globals = app.view_functions[endpoint].__globals__
+        monkeypatch.setitem(view_globals, "should_skip_cache", lambda public_only=True: False)
+
+    first = client.get("/api/demonstrations?city=Helsinki")
+    second = client.get("/api/demonstrations?city=Helsinki")
+    assert first.get_json()["cached"] is False
+    assert second.get_json()["cached"] is True
+    assert first.headers["ETag"] == second.headers["ETag"]
+
+    listed = client.get("/api/v1/demonstrations?per_page=5")
+    assert listed.status_code == 200
+    assert listed.headers["X-Cache"] == "MISS"
+    etag = listed.headers["ETag"]
+
+    not_modified = client.get("/api/v1/demonstrations?per_page=5", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.data == b""
+
+    hit = client.get("/api/v1/demonstrations?per_page=5")
+    assert hit.headers["X-Cache"] == "HIT"
+    assert hit.data == listed.data
+
+
+def test_cursor_pagination_walks_every_demonstration_once(client, db, seeded_data):
+    # Several rows share a date so the walk exercises the start_time/_id tie-breaks.
+    future_date = (date.today() + timedelta(days=3)).isoformat()
+    db.demonstrations.update_many({}, {"$set": {"date": future_date}})
+
+    def walk(path, key):
+        seen, cursor = [], ""
+        while True:
+            response = client.get(path, query_string={"cursor": cursor, "per_page": 1})
+            assert response.status_code == 200
+            payload = response.get_json()
+            assert "total_pages" not in payload
+            seen.extend(item["_id"] for item in payload[key])
+            cursor = payload["next_cursor"]
+            if cursor is None:
+                return seen
+
+    paged = client.get("/api/v1/demonstrations", query_string={"per_page": 100}).get_json()
+    expected = sorted(item["_id"] for item in paged["demonstrations"])
+    assert len(expected) > 1
+
+    walked = walk("/api/v1/demonstrations", "demonstrations")
+    assert len(walked) == len(set(walked))
+    assert sorted(walked) == expected
+
+    listed = client.get("/api/demonstrations", query_string={"per_page": 100}).get_json()
+    walked = walk("/api/demonstrations", "results")
+    assert sorted(walked) == sorted(item["_id"] for item in listed["results"])
+
+    with_total = client.get(
+        "/api/v1/demonstrations", query_string={"cursor": "", "per_page": 1, "include_total": "true"}
+    ).get_json()
+    assert with_total["total"] == len(expected)
+
+    assert client.get("/api/v1/demonstrations?cursor=bm9wZQ").status_code == 400
+    assert client.get("/api/demonstrations?cursor=bm9wZQ").status_code == 400
+
+
+def test_export_streams_ndjson_and_csv_with_updated_since(client, db, seeded_data):
+    future_date = (date.today() + timedelta(days=3)).isoformat()
+    db.demonstrations.update_many({}, {"$set": {"date": future_date, "last_modified": datetime(2024, 1, 1)}})
+    db.demonstrations.update_one(
+        {"_id": seeded_data["demo_id"]}, {"$set": {"last_modified": datetime(2025, 6, 1, 12)}}
+    )
+    listed = client.get("/api/v1/demonstrations", query_string={"per_page": 100}).get_json()
+
+    response = client.get("/api/v1/demonstrations/export")
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.data.decode("utf-8").splitlines()]
+    assert sorted(row["_id"] for row in rows) == sorted(item["_id"] for item in listed["demonstrations"])
+    assert "description" not in rows[0]
+
+    since = client.get(
+        "/api/v1/demonstrations/export",
+        query_string={"format": "csv", "updated_since": "2025-06-01T14:00:00+03:00"},
+    )
+    assert since.mimetype == "text/csv"
+    records = list(csv.DictReader(io.StringIO(since.data.decode("utf-8"))))
+    assert [record["_id"] for record in records] == [str(seeded_data["demo_id"])]
+    assert records[0]["last_modified"] == "2025-06-01T12:00:00Z"
+
+    assert client.get("/api/v1/demonstrations/export?format=xml").status_code == 400
+    assert client.get("/api/v1/demonstrations/export?updated_since=eilen").status_code == 400
+
+
+def test_export_updated_since_picks_up_admin_edits_and_cancellation_requests(app, admin_client, db, seeded_data):
+    from mielenosoitukset_fi.utils.demo_cancellation import request_cancellation_case
+
+    future_date = (date.today() + timedelta(days=3)).isoformat()
+    db.demonstrations.update_many(
+        {}, {"$set": {"date": future_date, "approved": True, "hide": False, "last_modified": datetime(2024, 1, 1)}}
+    )
+
+    def exported_ids():
+        response = admin_client.get(
+            "/api/v1/demonstrations/export", query_string={"updated_since": "2025-01-01T00:00:00Z"}
+        )
+        return {json.loads(line)["_id"] for line in response.data.decode("utf-8").splitlines()}
+
+    assert exported_ids() == set()
+
+    admin_client.post(
+        f"/admin/case/{seeded_data['case_id']}/update_demo/",
+        data={"name": "Renamed", "date": future_date, "description": "Updated"},
+    )
+    assert exported_ids() == {str(seeded_data["pending_demo_id"])}
+
+    with app.app_context():
+        request_cancellation_case(
+            db.demonstrations.find_one({"_id": seeded_data["demo_id"]}),
+            reason="Peruttu",
+            requester_email="alice@example.test",
+            official_contact=False,
+            source="pytest",
+        )
+    assert exported_ids() == {str(seeded_data["pending_demo_id"]), str(seeded_data["demo_id"])}
+
+
+def test_export_updated_since_sends_tombstones_for_demos_that_left(admin_client, db, seeded_data):
+    future_date = (date.today() + timedelta(days=3)).isoformat()
+    db.demonstrations.update_many(
+        {}, {"$set": {"date": future_date, "approved": True, "hide": False, "last_modified": datetime(2024, 1, 1)}}
+    )
+    rejected_id, deleted_id = str(seeded_data["demo_id"]), str(seeded_data["pending_demo_id"])
+
+    assert admin_client.post(f"/api/admin/demo/{rejected_id}/deny").status_code == 200
+    admin_client.post(
+        "/admin/demo/delete_demo", json={"demo_id": deleted_id}, headers={"Content-Type": "application/json"}
+    )
+
+    response = admin_client.get(
+        "/api/v1/demonstrations/export", query_string={"updated_since": "2025-01-01T00:00:00Z"}
+    )
+    rows = {row["_id"]: row for row in map(json.loads, response.data.decode("utf-8").splitlines())}
+    assert set(rows) == {rejected_id, deleted_id}
+    assert all(row["deleted"] is True and row["last_modified"] for row in rows.values())
+    assert rows[rejected_id]["title"] is None
+
+    full = admin_client.get("/api/v1/demonstrations/export").data.decode("utf-8").splitlines()
+    assert not any(json.loads(line)["deleted"] for line in full)
+
+    csv_export = admin_client.get(
+        "/api/v1/demonstrations/export", query_string={"format": "csv", "updated_since": "2025-01-01"}
+    )
+    records = list(csv.DictReader(io.StringIO(csv_export.data.decode("utf-8"))))
+    assert {record["_id"]: record["deleted"] for record in records} == {rejected_id: "True", deleted_id: "True"}
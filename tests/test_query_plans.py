@@ -0,0 +1,270 @@
+"""Query-plan regression suite: canonical hot-path queries must not COLLSCAN."""
+
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from mielenosoitukset_fi.admin.admin_demo_bp import _demo_control_query
+from mielenosoitukset_fi.basic_routes import _build_public_demo_query, _today_demo_query
+from mielenosoitukset_fi.utils.calendar_data import month_date_range
+from mielenosoitukset_fi.utils.database import DEMO_FILTER
+from mielenosoitukset_fi.utils.demo_identifiers import _identifier_query
+from mielenosoitukset_fi.utils.time_utils import utcnow
+
+
+def _collscan_stages(node):
+    if isinstance(node, dict):
+        if node.get("stage") == "COLLSCAN":
+            yield node
+        for value in node.values():
+            yield from _collscan_stages(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _collscan_stages(value)
+
+
+def _winning_plans(explain):
+    if isinstance(explain, dict):
+        for key, value in explain.items():
+            if key == "winningPlan":
+                yield value
+            else:
+                yield from _winning_plans(value)
+    elif isinstance(explain, list):
+        for value in explain:
+            yield from _winning_plans(value)
+
+
+def _explain(db, collection, command):
+    kind, spec = command
+    if kind == "find":
+        body = {"find": collection, "filter": spec["filter"]}
+        if spec.get("sort"):
+            body["sort"] = spec["sort"]
+    elif kind == "count":
+        body = {"count": collection, "query": spec["filter"]}
+    else:
+        body = {"aggregate": collection, "pipeline": spec["pipeline"], "cursor": {}}
+    return db.command("explain", body, verbosity="queryPlanner")
+
+
+def _admin(**overrides):
+    user = {"is_authenticated": True, "global_admin": True, "global_permissions": [], "memberships": []}
+    user.update(overrides)
+    return SimpleNamespace(**user)
+
+
+def _scoped_admin(ids):
+    # Editor, organization member and city-scoped admin at once, so every
+    # branch of demo_permission_filter is in the query.
+    return _admin(
+        global_admin=False,
+        _id=ids["user_id"],
+        memberships=[SimpleNamespace(organization_id=ids["org_id"], permissions=["LIST_DEMOS"])],
+        scoped_city_keys_for=lambda permission_name: ["helsinki"],
+    )
+
+
+CANONICAL_QUERIES = {
+    # basic_routes.py
+    "public list": lambda ids: (
+        "demonstrations",
+        ("find", {"filter": _build_public_demo_query(date.today()), "sort": {"date": 1, "start_time": 1}}),
+    ),
+    "public list count": lambda ids: (
+        "demonstrations",
+        ("count", {"filter": _build_public_demo_query(date.today())}),
+    ),
+    "city list (city page via api)": lambda ids: (
+        "demonstrations",
+        (
+            "find",
+            {
+                "filter": _build_public_demo_query(date.today(), city_query="helsinki"),
+                "sort": {"date": 1, "start_time": 1},
+            },
+        ),
+    ),
+    "tag page": lambda ids: (
+        "demonstrations",
+        ("find", {"filter": _build_public_demo_query(date.today(), tag_query="ilmasto")}),
+    ),
+    "today in city": lambda ids: (
+        "demonstrations",
+        ("find", {"filter": _today_demo_query("Helsinki"), "sort": {"start_time": 1}}),
+    ),
+    "calendar month": lambda ids: (
+        "demonstrations",
+        (
+            "find",
+            {
+                "filter": {
+                    **DEMO_FILTER,
+                    "date": dict(zip(("$gte", "$lt"), month_date_range(2026, 5))),
+                },
+                "sort": {"date": 1, "start_time": 1},
+            },
+        ),
+    ),
+    # utils.demo_identifiers.resolve_demo
+    "detail by slug": lambda ids: (
+        "demonstrations",
+        ("find", {"filter": _identifier_query("climate-march")}),
+    ),
+    "detail by running number": lambda ids: (
+        "demonstrations",
+        ("find", {"filter": _identifier_query("1")}),
+    ),
+    "detail by id or alias": lambda ids: (
+        "demonstrations",
+        ("find", {"filter": _identifier_query(str(ids["demo_id"]))}),
+    ),
+    "recurring siblings": lambda ids: (
+        "demonstrations",
+        ("find", {"filter": {"parent": ids["demo_id"]}}),
+    ),
+    # api/routes.py
+    "api list upcoming": lambda ids: (
+        "demonstrations",
+        (
+            "find",
+            {
+                "filter": {
+                    **DEMO_FILTER,
+                    "date": {
+                        "$gte": date.today().isoformat(),
+                        "$lte": (date.today() + timedelta(days=30)).isoformat(),
+                    },
+                },
+                "sort": {"date": 1},
+            },
+        ),
+    ),
+    "api list by organization": lambda ids: (
+        "demonstrations",
+        (
+            "find",
+            {
+                "filter": {
+                    **{k: v for k, v in DEMO_FILTER.items() if k != "cancelled"},
+                    "organizers": {"$elemMatch": {"organization_id": ids["org_id"]}},
+                },
+                "sort": {"date": 1},
+            },
+        ),
+    ),
+    # admin_demo_bp.demo_control
+    "admin demo control": lambda ids: (
+        "demonstrations",
+        (
+            "aggregate",
+            {
+                "pipeline": [
+                    {"$match": _demo_control_query(_admin())},
+                    {"$addFields": {"_sort_priority": {"$cond": [{"$eq": ["$approved", False]}, 0, 1]}}},
+                    {"$sort": {"_sort_priority": 1, "date": 1, "_id": 1}},
+                    {"$limit": 20},
+                ]
+            },
+        ),
+    ),
+    "admin demo control count": lambda ids: (
+        "demonstrations",
+        ("count", {"filter": _demo_control_query(_admin())}),
+    ),
+    "admin demo control scoped": lambda ids: (
+        "demonstrations",
+        ("count", {"filter": _demo_control_query(_scoped_admin(ids))}),
+    ),
+    # Supporting collections read on every page or dashboard.
+    "notifications for user": lambda ids: (
+        "notifications",
+        ("find", {"filter": {"user_id": ids["user_id"]}, "sort": {"created_at": -1}}),
+    ),
+    "demo analytics": lambda ids: ("analytics", ("find", {"filter": {"demo_id": ids["demo_id"]}})),
+    "demo analytics window": lambda ids: (
+        "d_analytics",
+        ("find", {"filter": {"demo_id": ids["demo_id"], "date": {"$gte": "2026-01-01", "$lte": "2026-12-31"}}}),
+    ),
+    "analytics last 24h": lambda ids: (
+        "d_analytics",
+        ("find", {"filter": {"date": {"$gte": "2026-05-01", "$lte": "2026-05-02"}}}),
+    ),
+    "friends attending": lambda ids: (
+        "demo_attending",
+        (
+            "aggregate",
+            {
+                "pipeline": [
+                    {
+                        "$match": {
+                            "demo_id": {"$in": [ids["demo_id"], ids["pending_demo_id"]]},
+                            "user_id": {"$in": [ids["friend_id"]]},
+                            "attending": True,
+                        }
+                    }
+                ]
+            },
+        ),
+    ),
+    "recent logins": lambda ids: (
+        "login_logs",
+        ("find", {"filter": {"timestamp": {"$gte": utcnow() - timedelta(hours=1)}}}),
+    ),
+}
+
+
+@pytest.mark.parametrize("name", sorted(CANONICAL_QUERIES))
+def test_canonical_query_uses_an_index(name, app, db, seeded_data):
+    collection, command = CANONICAL_QUERIES[name](seeded_data)
+
+    explain = _explain(db, collection, command)
+
+    plans = list(_winning_plans(explain))
+    assert plans, f"{name}: explain output has no winningPlan"
+    collscans = [stage for plan in plans for stage in _collscan_stages(plan)]
+    assert not collscans, f"{name} on {collection} falls back to COLLSCAN: {collscans}"
+
+
+def test_index_registry_is_applied_by_auto_migrations(app, db, seeded_data):
+    from mielenosoitukset_fi.utils.indexes import INDEX_REGISTRY
+
+    for collection_name, specs in INDEX_REGISTRY.items():
+        existing = [
+            [tuple(pair) for pair in info["key"]]
+            for info in db[collection_name].index_information().values()
+        ]
+        for spec in specs:
+            keys = [tuple(pair) for pair in spec["keys"]]
+            assert keys in existing, f"{collection_name} is missing index {keys}"
+
+
+
+class _FailingIndexCollection:
+    def create_index(self, keys, **options):
+        raise ValueError("E11000 duplicate key")
+
+
+def test_failed_index_creation_is_not_recorded_as_applied(app, db, monkeypatch):
+    from mielenosoitukset_fi.utils import migration_runner
+    from mielenosoitukset_fi.utils.indexes import IndexCreationError, ensure_indexes
+
+    registry = {"demonstrations": [{"keys": [("slug", 1)], "options": {"unique": True}}]}
+    failing_db = {"demonstrations": _FailingIndexCollection()}
+    monkeypatch.setattr(
+        migration_runner,
+        "MIGRATIONS",
+        [
+            {
+                "id": "004_index_registry_test",
+                "description": "test",
+                "run": lambda db: ensure_indexes(db=failing_db, registry=registry),
+            }
+        ],
+    )
+
+    with pytest.raises(IndexCreationError):
+        migration_runner.run_auto_migrations(db)
+
+    assert db.schema_migrations.find_one({"id": "004_index_registry_test"}) is None
@@ -0,0 +1,37 @@
+from mielenosoitukset_fi.utils.runtime_flags import COLLECTION, DOCUMENT_ID, PANIC, RuntimeFlags
+
+HEAVY_TITLE = "Palvelu hetkellisesti pois käytöstä"
+
+
+def test_runtime_flags_check_the_shared_version_once_per_interval(db):
+    worker = RuntimeFlags(lambda: db[COLLECTION], check_interval_ms=60_000)
+    other_worker = RuntimeFlags(lambda: db[COLLECTION], check_interval_ms=60_000)
+
+    assert worker.get(PANIC) is False
+    assert worker.get(PANIC) is False
+    assert worker.snapshot()["version_checks"] == 1
+
+    other_worker.set(PANIC, True, actor="pytest")
+    assert other_worker.get(PANIC) is True
+    # Within the interval the first worker keeps its copy without reading.
+    assert worker.get(PANIC) is False
+
+    worker.invalidate()
+    assert worker.get(PANIC) is True
+    snapshot = worker.snapshot()
+    assert snapshot["version"] == db[COLLECTION].find_one({"_id": DOCUMENT_ID})["version"]
+    assert snapshot["reloads"] == 2
+
+
+def test_panic_toggle_applies_to_public_pages_immediately(admin_client, client):
+    assert HEAVY_TITLE not in client.get("/info").get_data(as_text=True)
+
+    admin_client.post("/admin/dashboard/panic/activate")
+    try:
+        assert HEAVY_TITLE in client.get("/info").get_data(as_text=True)
+        assert admin_client.get("/admin/dashboard/panic/status").get_json() == {"panic_mode": True}
+        assert HEAVY_TITLE not in admin_client.get("/admin/dashboard").get_data(as_text=True)
+    finally:
+        admin_client.post("/admin/dashboard/panic/deactivate")
+
+    assert HEAVY_TITLE not in client.get("/info").get_data(as_text=True)
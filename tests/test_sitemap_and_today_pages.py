@@ -1,20 +1,32 @@
 import xml.etree.ElementTree as ET
 from datetime import date
+from urllib.parse import urlparse
 
 from flask import url_for
 
 
+SITEMAP_NS = {"sm": "http://www.sitemaps.org/schemas/sitemap/0.9"}
+
+
 def _sitemap_locs(response):
     root = ET.fromstring(response.data)
-    ns = {"sm": "http://www.sitemaps.org/schemas/sitemap/0.9"}
-    return {loc.text for loc in root.findall(".//sm:loc", ns)}
+    return {loc.text for loc in root.findall(".//sm:loc", SITEMAP_NS)}
 
 
-def test_sitemap_includes_public_city_org_tag_and_today_pages(app, db, seeded_data):
-    response = app.test_client().get("/sitemap.xml", base_url="https://example.test")
+def _all_sitemap_locs(client, base_url="https://example.test"):
+    index = client.get("/sitemap.xml", base_url=base_url)
+    assert index.status_code == 200
+    assert ET.fromstring(index.data).tag == f"{{{SITEMAP_NS['sm']}}}sitemapindex"
+    locs = set()
+    for shard_url in _sitemap_locs(index):
+        shard = client.get(urlparse(shard_url).path, base_url=base_url)
+        assert shard.status_code == 200
+        locs |= _sitemap_locs(shard)
+    return locs
 
-    assert response.status_code == 200
-    locs = _sitemap_locs(response)
+
+def test_sitemap_includes_public_city_org_tag_and_today_pages(app, db, seeded_data):
+    locs = _all_sitemap_locs(app.test_client())
 
     with app.test_request_context(base_url="https://example.test"):
         expected_urls = {
@@ -34,6 +46,81 @@ def test_sitemap_includes_public_city_org_tag_and_today_pages(app, db, seeded_da
     assert not any("/save_suggestion" in loc for loc in locs)
 
 
+def test_sitemap_shards_support_conditional_requests(app, db, seeded_data):
+    client = app.test_client()
+    client.get("/sitemap.xml", base_url="https://example.test")
+    first = client.get("/sitemaps/static.xml", base_url="https://example.test")
+
+    assert first.status_code == 200
+    assert first.headers["ETag"]
+    assert first.headers["Last-Modified"]
+
+    cached = client.get(
+        "/sitemaps/static.xml",
+        base_url="https://example.test",
+        headers={"If-None-Match": first.headers["ETag"]},
+    )
+    assert cached.status_code == 304
+    assert cached.data == b""
+
+
+def test_sitemap_refresh_only_rebuilds_changed_demo_months(app, db, seeded_data):
+    from mielenosoitukset_fi.utils.sitemap import refresh_sitemaps
+    from mielenosoitukset_fi.utils.time_utils import utcnow
+
+    today = date.today()
+    with app.app_context():
+        assert refresh_sitemaps(db, force=True)["full"] is True
+        assert refresh_sitemaps(db)["rebuilt"] == []
+
+        db.demonstrations.update_one(
+            {"_id": seeded_data["demo_id"]},
+            {"$set": {"date": today.isoformat(), "last_modified": utcnow(), "slug": "moved-demo"}},
+        )
+        result = refresh_sitemaps(db)
+
+    month_group = f"demos-{today.year:04d}-{today.month:02d}"
+    assert month_group in result["rebuilt"]
+    assert "orgs" not in result["rebuilt"]
+    shard = db.sitemap_shards.find_one({"_id": month_group})
+    assert any(entry["loc"].endswith("/demonstration/moved-demo") for entry in shard["entries"])
+
+
+def test_sitemap_refresh_drops_moved_and_deleted_demos_from_old_month(app, db, seeded_data):
+    from mielenosoitukset_fi.utils.sitemap import refresh_sitemaps
+    from mielenosoitukset_fi.utils.time_utils import utcnow
+
+    today = date.today()
+    next_month = date(today.year + (today.month == 12), today.month % 12 + 1, 1)
+    db.demonstrations.update_one(
+        {"_id": seeded_data["demo_id"]}, {"$set": {"date": today.isoformat(), "slug": "moving-demo"}}
+    )
+    copy = db.demonstrations.find_one({"_id": seeded_data["demo_id"]}, {"_id": 0})
+    gone_id = db.demonstrations.insert_one({**copy, "slug": "deleted-demo"}).inserted_id
+    old_group = f"demos-{today.year:04d}-{today.month:02d}"
+    new_group = f"demos-{next_month.year:04d}-{next_month.month:02d}"
+
+    def _slugs(group):
+        shard = db.sitemap_shards.find_one({"_id": group}) or {}
+        return {entry["loc"].rsplit("/", 1)[-1] for entry in shard.get("entries", [])}
+
+    with app.app_context():
+        refresh_sitemaps(db, force=True)
+        assert {"moving-demo", "deleted-demo"} <= _slugs(old_group)
+
+        db.demonstrations.update_one(
+            {"_id": seeded_data["demo_id"]},
+            {"$set": {"date": next_month.isoformat(), "last_modified": utcnow()}},
+        )
+        db.demonstrations.delete_one({"_id": gone_id})
+        result = refresh_sitemaps(db)
+
+    assert result["full"] is False
+    assert {old_group, new_group} <= set(result["rebuilt"])
+    assert not {"moving-demo", "deleted-demo"} & _slugs(old_group)
+    assert "moving-demo" in _slugs(new_group)
+
+
 def test_cities_page_links_to_today_and_future_city_views(app, seeded_data):
     response = app.test_client().get("/cities")
 
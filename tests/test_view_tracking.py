@@ -0,0 +1,184 @@
+import threading
+
+from mielenosoitukset_fi.utils.write_buffer import BatchWriter
+
+
+class _RecordingCollection:
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+        self.written = threading.Event()
+
+    def insert_many(self, documents, ordered=True):
+        if self.fail:
+            raise RuntimeError("write failed")
+        self.batches.append(list(documents))
+        self.written.set()
+
+
+def test_batch_writer_counts_overflow_and_flushes_in_batches():
+    collection = _RecordingCollection()
+    writer = BatchWriter(lambda: collection, name="test", max_batch=2, flush_interval=60, max_queue=3)
+    writer._ensure_worker = lambda: None  # keep the worker thread out of this test
+
+    results = [writer.add({"n": n}) for n in range(5)]
+    writer.flush()
+
+    assert results == [True, True, True, False, False]
+    assert collection.batches == [[{"n": 0}, {"n": 1}], [{"n": 2}]]
+    assert writer.stats() == {
+        "enqueued": 3,
+        "written": 3,
+        "dropped": 2,
+        "failed": 0,
+        "flushes": 2,
+        "pending": 0,
+    }
+
+
+def test_batch_writer_background_thread_flushes_on_interval():
+    collection = _RecordingCollection()
+    writer = BatchWriter(lambda: collection, name="test", max_batch=100, flush_interval=0.05)
+
+    writer.add({"n": 1})
+
+    assert collection.written.wait(timeout=5)
+    assert collection.batches == [[{"n": 1}]]
+
+
+def test_batch_writer_close_writes_the_batch_held_by_the_worker():
+    import time
+
+    collection = _RecordingCollection()
+    writer = BatchWriter(lambda: collection, name="test", max_batch=100, flush_interval=60)
+
+    writer.add({"n": 1})
+    deadline = time.monotonic() + 5
+    while writer.stats()["pending"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writer.stats()["pending"] == 0  # taken by the worker, not yet written
+
+    writer.close(timeout=5)
+
+    assert collection.batches == [[{"n": 1}]]
+    assert not writer._thread.is_alive()
+
+
+def test_batch_writer_counts_failed_writes():
+    writer = BatchWriter(lambda: _RecordingCollection(fail=True), name="test", flush_interval=60)
+    writer._ensure_worker = lambda: None
+
+    writer.add({"n": 1})
+    writer.flush()
+
+    assert writer.stats()["failed"] == 1
+    assert writer.stats()["written"] == 0
+
+
+def test_track_view_is_buffered_when_enabled(app, db, seeded_data, monkeypatch):
+    from mielenosoitukset_fi.utils import analytics
+
+    monkeypatch.setattr(analytics.Config, "ANALYTICS_BUFFERED_VIEWS", True)
+    monkeypatch.setattr(analytics.view_buffer, "_ensure_worker", lambda: None)
+    before = db.analytics.count_documents({"demo_id": seeded_data["demo_id"]})
+
+    response = app.test_client().post(
+        "/api/analytics/track_view", json={"demo_id": str(seeded_data["demo_id"])}
+    )
+
+    assert response.status_code == 200
+    assert db.analytics.count_documents({"demo_id": seeded_data["demo_id"]}) == before
+    analytics.view_buffer.flush()
+    assert db.analytics.count_documents({"demo_id": seeded_data["demo_id"]}) == before + 1
+
+
+def test_legacy_d_analytics_documents_are_split_into_day_buckets(db, seeded_data):
+    from mielenosoitukset_fi.utils.migrations.migration_005_analytics_buckets import (
+        migrate_analytics_buckets,
+    )
+
+    demo_id = seeded_data["demo_id"]
+    db.d_analytics.delete_many({})
+    db.d_analytics.insert_one(
+        {"_id": demo_id, "analytics": {"2026-05-01": {"00": {"05": 2}, "13": {"30": 3}}, "2026-05-02": {"23": {"59": 1}}}}
+    )
+
+    result = migrate_analytics_buckets(db=db)
+
+    assert result == {"converted": 1, "buckets": 2}
+    assert db.d_analytics.count_documents({"analytics": {"$exists": True}}) == 0
+    first = db.d_analytics.find_one({"demo_id": demo_id, "date": "2026-05-01"})
+    assert len(first["minutes"]) == 1440
+    assert first["minutes"][5] == 2 and first["minutes"][13 * 60 + 30] == 3
+    assert first["hours"][0] == 2 and first["hours"][13] == 3
+    assert first["total"] == 5
+    assert db.d_analytics.find_one({"demo_id": demo_id, "date": "2026-05-02"})["minutes"][1439] == 1
+
+
+def test_rollup_increments_existing_day_bucket(db, seeded_data):
+    from datetime import datetime, timezone
+
+    from mielenosoitukset_fi.utils import analytics_buckets
+
+    demo_id = seeded_data["demo_id"]
+    db.d_analytics.delete_many({})
+    ts = datetime(2026, 5, 1, 10, 15, tzinfo=timezone.utc)  # 13:15 in Helsinki
+    events = [{"demo_id": demo_id, "timestamp": ts}] * 2
+
+    for _ in range(2):
+        ops = analytics_buckets.increment_ops(analytics_buckets.count_events(events))
+        db.d_analytics.bulk_write(ops, ordered=True)
+
+    bucket = db.d_analytics.find_one({"demo_id": demo_id, "date": "2026-05-01"})
+    assert bucket["minutes"][13 * 60 + 15] == 4
+    assert bucket["hours"][13] == 4
+    assert bucket["total"] == 4
+    assert db.d_analytics.count_documents({"demo_id": demo_id}) == 1
+
+
+def test_admin_analytics_endpoints_read_day_buckets(admin_client, db, seeded_data):
+    demo_id = seeded_data["demo_id"]
+    db.d_analytics.delete_many({})
+
+    detail = admin_client.get(f"/admin/per_demo_analytics/{demo_id}")
+    assert detail.status_code == 200
+    # Rolled up on demand from the seeded raw events.
+    assert db.d_analytics.count_documents({"demo_id": demo_id}) >= 1
+
+    rising = admin_client.get("/admin/api/demos/nousussa")
+    assert rising.status_code == 200
+    views = {row["demo_id"]: row["views_last_24h"] for row in rising.get_json()["demos"]}
+    assert views[str(demo_id)] == 2
+
+    overall = admin_client.get("/admin/api/analytics/overall_24h?interval=60")
+    assert overall.status_code == 200
+    assert sum(overall.get_json()["data"]) == db.d_analytics.aggregate(
+        [{"$group": {"_id": None, "views": {"$sum": "$total"}}}]
+    ).next()["views"]
+
+    recommended = admin_client.get("/admin/api/demos/recommendations")
+    assert recommended.status_code == 200
+    assert str(demo_id) in [row["demo_id"] for row in recommended.get_json()]
+
+
+def test_admin_view_totals_survive_raw_event_trim(admin_client, db, seeded_data):
+    from mielenosoitukset_fi.utils import analytics_buckets
+
+    demo_id = seeded_data["demo_id"]
+    db.d_analytics.delete_many({})
+    db.d_analytics.insert_many(
+        analytics_buckets.bucket_documents(demo_id, {"2025-01-01": {600: 3}, "2025-01-02": {0: 2}})
+    )
+    # Old raw events are trimmed once rolled up; totals must not shrink.
+    db.analytics.delete_many({})
+
+    summary = admin_client.get("/admin/api/stats/summary?include_past=1")
+    assert summary.status_code == 200
+    payload = summary.get_json()
+    assert payload["summary"]["total_views"] == 5
+    assert {"id": str(demo_id), "views": 5} in [
+        {"id": row["id"], "views": row["views"]} for row in payload["analytics"]["rows"]
+    ]
+
+    overview = admin_client.get("/admin/demo_analytics")
+    assert overview.status_code == 200